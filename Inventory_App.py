@@ -1,28 +1,114 @@
+import sys
+
+if __name__ == "__main__" and len(sys.argv) > 1:
+    # A command runs headless: hand it to the CLI before paying for Tk and the window's modules
+    from smart_inventory import cli
+    _args = cli.build_parser().parse_args()
+    if _args.command is not None:
+        sys.exit(cli.run(_args))
+
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, simpledialog
-import json
 import os
-from datetime import datetime
-import shutil
 import webbrowser
-from io import StringIO
-import csv
+import queue
+import threading
+import time
+import bisect
+import math
+
+from smart_inventory import cli, operations
+from smart_inventory.analytics import StockAnalytics, needs_reorder
+from smart_inventory.backups import BackupRepository, restore_backup
+from smart_inventory.config import (BACKUP_DIR, DEFAULT_LOCATION, HISTORY_PAGE, INSTRUMENT, JOURNAL_SYNC_MS,
+                                    LOAD_BATCH, METRICS_FILE, VERIFY_STATS)
+from smart_inventory.export import ExportCancelled, export_rows, render_report_html
+from smart_inventory.importing import import_movements
+from smart_inventory.indexes import FilterIndex, SearchIndex, SortIndex, StatsTracker
+from smart_inventory.locations import Locations
+from smart_inventory.model import format_history_date
+from smart_inventory.storage import open_store, report_row
+
+LOAD_POLL_MS = 30           # how often the window picks up loaded batches
+VIRTUAL_THRESHOLD = 5000    # switch the item list to windowed mode above this many visible rows
+VIRTUAL_OVERSCAN = 8        # extra rows materialized below the viewport in windowed mode
+SEARCH_DEBOUNCE_MS = 120    # wait this long after the last keystroke before searching
+REMOTE_POLL_MS = 1000       # how often an attached GUI fetches other clients' changes
+ANALYTICS_REFRESH_MS = 3600 * 1000  # recompute demand figures as their time windows slide
+RECENT_MOVEMENTS = 5        # movements shown under the item list; "History" pages through all
+TIMED_METHODS = ("refresh_list", "render_window", "update_stats", "on_item_select", "change_qty",
+                 "update_item", "load_inventory", "finish_loading", "rebuild_indexes", "refresh_analytics",
+                 "pull_remote", "sync_store", "save_snapshot", "print_table")   # with INVENTORY_INSTRUMENT=1
+
+def data_errors():
+    """What a store raises about its files; sqlite3.Error only once the SQLite backend has imported it"""
+    sqlite3 = sys.modules.get("sqlite3")
+    return (OSError, ValueError) if sqlite3 is None else (OSError, ValueError, sqlite3.Error)
+
+def longest_ordered_run(names, rank):
+    """Return the largest set of `names` whose `rank` values are already increasing"""
+    tails = []      # tails[k] = index into names ending the best run of length k+1
+    prev = [-1] * len(names)
+    for i, name in enumerate(names):
+        r = rank[name]
+        lo, hi = 0, len(tails)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if rank[names[tails[mid]]] < r:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo:
+            prev[i] = tails[lo - 1]
+        if lo == len(tails):
+            tails.append(i)
+        else:
+            tails[lo] = i
 
-INVENTORY_FILE = 'inventory.json'
-BACKUP_DIR = 'backups'
+    keep = set()
+    i = tails[-1] if tails else -1
+    while i != -1:
+        keep.add(names[i])
+        i = prev[i]
+    return keep
 
 class InventoryApp:
-    def __init__(self, root):
+    def __init__(self, root, store=None, location=DEFAULT_LOCATION, backend=None):
         self.root = root
         self.root.title("SmartInventory Pro - Peta's Edition")
         self.root.geometry("1000x860")
         self.root.minsize(1000, 700)
 
+        self.metrics = None
+        if INSTRUMENT:
+            # Before any widget exists, so every Tcl command and every binding goes through the hooks
+            from smart_inventory.instrument import Instruments
+            self.metrics = Instruments(root.after_idle)
+            self.metrics.count_tk(root)
+            self.metrics.attach(self, TIMED_METHODS)
+
         self.dark_mode = tk.BooleanVar(value=False)
         self.style = ttk.Style()
-        self.inventory = self.load_inventory()
+        self.location = location
+        self.locations = None       # a window attached to a server works on that one inventory
+        if store is None or not store.SHARED:
+            self.locations = Locations(backend)
+            store = self.locations.open(location, store)
+        self.store = store
+        self._sync_job = None
+        self.inventory = {}
+        self.loading = False
+        self.rebuild_indexes()
         self.selected_item = None
         self.active_filter = "all"
+        self.sort_column = "name"
+        self.sort_descending = False
+        self._rows = {}          # name -> (qty, low, price, demand) currently shown in the tree
+        self._row_order = []     # names in the order they appear in the tree
+        self._view_names = []    # every name passing the current filter/search, in order
+        self._view_offset = 0    # index of the first visible row in windowed mode
+        self._search_job = None
+        self.virtual = False
 
         os.makedirs(BACKUP_DIR, exist_ok=True)
 
@@ -58,6 +144,15 @@ class InventoryApp:
         ttk.Checkbutton(top, text="Dark Mode", variable=self.dark_mode,
                         command=self.toggle_theme).pack(side=tk.RIGHT)
 
+        if self.locations is not None:
+            ttk.Button(top, text="New Location", command=self.add_location).pack(side=tk.RIGHT, padx=(6, 24))
+            self.location_var = tk.StringVar(value=location)
+            self.location_box = ttk.Combobox(top, textvariable=self.location_var, values=self.locations.names(),
+                                             state="readonly", width=18)
+            self.location_box.pack(side=tk.RIGHT)
+            self.location_box.bind("<<ComboboxSelected>>", lambda e: self.switch_location(self.location_var.get()))
+            ttk.Label(top, text="Location:").pack(side=tk.RIGHT, padx=(0, 6))
+
         # FILTER BAR
         filter_bar = ttk.Frame(scrollable_frame)
         filter_bar.pack(fill=tk.X, pady=(0, 16))
@@ -66,7 +161,8 @@ class InventoryApp:
             ("All", "all"),
             ("Low Stock", "low"),
             ("Out of Stock", "zero"),
-            ("Recently Updated", "recent")
+            ("Recently Updated", "recent"),
+            ("Reorder Soon", "reorder")
         ]:
             ttk.Button(filter_bar, text=text, width=14,
                        command=lambda m=mode: self.apply_filter(m)).pack(side=tk.LEFT, padx=3)
@@ -74,27 +170,32 @@ class InventoryApp:
         ttk.Label(filter_bar, text="Search:").pack(side=tk.LEFT, padx=(30, 6))
         self.search_var = tk.StringVar()
         ttk.Entry(filter_bar, textvariable=self.search_var, width=28).pack(side=tk.LEFT)
-        self.search_var.trace("w", lambda *args: self.refresh_list())
+        self.search_var.trace("w", lambda *args: self.on_search_change())
 
         # TREEVIEW
         tree_frame = ttk.Frame(scrollable_frame)
         tree_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 16))
 
-        columns = ("name", "qty", "low", "price", "total", "status")
+        columns = ("name", "qty", "low", "price", "total", "cover", "status")
         self.tree = ttk.Treeview(tree_frame, columns=columns, show="headings", height=16)
         
-        for col, txt, w in zip(columns, ["Item Name", "Qty", "Low @", "Price", "Total Value", "Status"],
-                               [340, 80, 80, 110, 130, 110]):
-            self.tree.heading(col, text=txt)
+        self._headings = dict(zip(columns, ["Item Name", "Qty", "Low @", "Price", "Total Value",
+                                            "Days Left", "Status"]))
+        for col, w in zip(columns, [340, 80, 80, 110, 130, 90, 110]):
+            self.tree.heading(col, text=self._headings[col], command=lambda c=col: self.sort_by(c))
             self.tree.column(col, width=w, anchor="center" if col != "name" else "w")
 
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
-        tree_scroll = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        tree_scroll.pack(side=tk.RIGHT, fill=tk.Y)
-        self.tree.configure(yscrollcommand=tree_scroll.set)
+        self.tree_scroll = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.configure(yscrollcommand=self.tree_scroll.set)
 
         self.tree.bind("<<TreeviewSelect>>", self.on_item_select)
+        for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(seq, self.on_virtual_wheel)
+        for seq in ("<Up>", "<Down>", "<Prior>", "<Next>", "<Home>", "<End>"):
+            self.tree.bind(seq, self.on_virtual_key)
 
         # EDIT PANEL
         edit = ttk.LabelFrame(scrollable_frame, text=" Selected Item ", padding="16 20")
@@ -134,13 +235,17 @@ class InventoryApp:
         ttk.Button(btn_frame, text="Add New Item", command=self.add_item).pack(side=tk.LEFT, padx=6)
         ttk.Button(btn_frame, text="Update Item", command=self.update_item).pack(side=tk.LEFT, padx=6)
         ttk.Button(btn_frame, text="Delete Item", command=self.remove_item).pack(side=tk.LEFT, padx=6)
+        ttk.Button(btn_frame, text="History", command=self.show_history).pack(side=tk.LEFT, padx=6)
+        if self.locations is not None:
+            ttk.Button(btn_frame, text="Transfer", command=self.transfer_item).pack(side=tk.LEFT, padx=6)
         ttk.Button(btn_frame, text="Print", command=self.print_table).pack(side=tk.LEFT, padx=6)
         ttk.Button(btn_frame, text="Report", command=self.generate_report).pack(side=tk.LEFT, padx=6)
         ttk.Button(btn_frame, text="Backup", command=self.backup_inventory).pack(side=tk.LEFT, padx=6)
         ttk.Button(btn_frame, text="Restore", command=self.restore_inventory).pack(side=tk.LEFT, padx=6)
+        ttk.Button(btn_frame, text="Import", command=self.import_file).pack(side=tk.LEFT, padx=6)
 
         # HISTORY
-        hist_frame = ttk.LabelFrame(scrollable_frame, text="Recent Movements (last 5)", padding=12)
+        hist_frame = ttk.LabelFrame(scrollable_frame, text=f"Recent Movements (last {RECENT_MOVEMENTS})", padding=12)
         hist_frame.pack(fill=tk.BOTH, pady=(0, 8), expand=True)
 
         self.history = tk.Text(hist_frame, height=7, state=tk.DISABLED, wrap=tk.WORD)
@@ -150,12 +255,25 @@ class InventoryApp:
         status_frame = ttk.Frame(scrollable_frame)
         status_frame.pack(fill=tk.X, pady=(8, 0))
 
+        self.progress = ttk.Progressbar(status_frame, mode="determinate", maximum=100, length=220)
+        self.cancel_button = ttk.Button(status_frame, text="Cancel", command=self.cancel_export)
+        self._export = None
+
+        if self.metrics:
+            self.metrics_var = tk.StringVar(value=" F8 profile · F9 save metrics ")
+            ttk.Label(status_frame, textvariable=self.metrics_var, relief="sunken", padding=6).pack(side=tk.RIGHT)
+            self.metrics.on_frame = self.show_frame_cost
+            root.bind("<F8>", lambda e: self.toggle_profile())
+            root.bind("<F9>", lambda e: self.dump_metrics())
+
         self.status_var = tk.StringVar(value=" Ready – Select an item or add new")
         ttk.Label(status_frame, textvariable=self.status_var, relief="sunken", anchor="w", padding=6).pack(fill=tk.X)
 
         self.apply_theme()
         self.refresh_list()
         self.update_stats()
+        self.start_loading()
+        self.root.after(ANALYTICS_REFRESH_MS, self.refresh_analytics)
 
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
 
@@ -224,56 +342,397 @@ class InventoryApp:
     # CORE LOGIC
     # ──────────────────────────────────────────────
     def load_inventory(self):
-        if os.path.exists(INVENTORY_FILE):
-            try:
-                with open(INVENTORY_FILE, 'r') as f:
-                    data = json.load(f)
-                    for item in data.values():
-                        item.setdefault("history", [])
-                        item.setdefault("low_threshold", 5)
-                    return data
-            except:
-                return {}
-        return {}
+        return self.store.load()
+
+    def start_loading(self):
+        """Read the inventory on a worker thread and merge it here in batches"""
+        self.loading = True
+        self._load_started = time.perf_counter()
+        self._load_queue = queue.Queue(maxsize=4)     # bounded, so the reader can't run far ahead
+        self.progress["value"] = 0
+        self.progress.pack(side=tk.RIGHT, padx=(8, 0))
+        self.status_var.set(" Loading inventory…")
+        threading.Thread(target=self.load_worker, args=(self.store, self._load_queue), daemon=True).start()
+        self.root.after(LOAD_POLL_MS, self.poll_loading)
+
+    @staticmethod
+    def load_worker(store, results):
+        try:
+            for batch, fraction in store.iter_load(LOAD_BATCH):
+                results.put(("batch", batch, fraction))
+            results.put(("done", None, 1.0))
+        except Exception as e:
+            results.put(("error", e, 1.0))
 
-    def refresh_list(self, *args):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+    def poll_loading(self):
+        deadline = time.perf_counter() + 0.05
+        try:
+            while time.perf_counter() < deadline:
+                kind, payload, fraction = self._load_queue.get_nowait()
+                if kind != "batch":
+                    self.finish_loading(payload)
+                    return
+                self.inventory.update(payload)
+                self.progress["value"] = fraction * 100
+                self.status_var.set(f" Loading inventory… {len(self.inventory):,} items")
+        except queue.Empty:
+            pass
+        self.root.after(LOAD_POLL_MS, self.poll_loading)
+
+    def finish_loading(self, error=None):
+        if error is not None:
+            self.inventory = {}
+        self.store.load_error = error       # a failed load must never be saved over the file
+        self.inventory = self.store.finish_load(self.inventory)
+        self.loading = False
+        if self.metrics:
+            self.metrics.record("load_inventory", time.perf_counter() - self._load_started)
+        self.progress.pack_forget()
+        self.rebuild_indexes()
+        if self.locations is not None and error is None:
+            self.locations.attach(self.location, self.inventory, self.stats)
+        self.refresh_list()
+        self.update_stats()
+        if error is not None:
+            self.status_var.set(f" Could not load inventory: {error} – the file is left untouched")
+        else:
+            self.status_var.set(f" Ready – {len(self.inventory):,} items loaded")
+        if self.store.SHARED:
+            self.root.after(REMOTE_POLL_MS, self.pull_remote)
 
-        search = self.search_var.get().lower().strip()
+    def still_loading(self):
+        if self.loading:
+            messagebox.showinfo("Please wait", "The inventory is still loading.")
+        return self.loading
 
-        for name, d in sorted(self.inventory.items()):
-            qty = d["quantity"]
-            low = d.get("low_threshold", 5)
-            price = d["price"]
-            status = "LOW" if qty <= low else ""
+    def schedule_sync(self):
+        if self._sync_job is None:
+            self._sync_job = self.root.after(JOURNAL_SYNC_MS, self.sync_store)
 
-            if self.active_filter == "low" and qty > low: continue
-            if self.active_filter == "zero" and qty != 0: continue
-            if self.active_filter == "recent":
-                if not d["history"]: continue
-                last = datetime.strptime(d["history"][-1]["date"], "%Y-%m-%d %H:%M:%S")
-                if (datetime.now() - last).days > 7: continue
+    def sync_store(self):
+        self._sync_job = None
+        try:
+            self.store.sync()
+            if self.locations is not None:
+                self.locations.save()       # this location's totals, for the other locations' windows
+        except data_errors() as e:
+            self.status_var.set(f" Could not save changes: {e}")
+
+    def pull_remote(self):
+        # Attached to a server: fold in what other clients changed
+        try:
+            names = self.store.pull_changes()
+        except (OSError, ValueError) as e:
+            self.status_var.set(f" Server unreachable: {e}")
+            names = ()
+        for name in names:
+            if name in self.inventory:
+                self.reindex_item(name)
+            else:
+                self.unindex_item(name)
+        if names:
+            self.refresh_list()
+            self.update_stats()
+            if self.selected_item in names:
+                if self.selected_item in self.inventory:
+                    self.on_item_select(None)
+                else:
+                    self.clear_edit_fields()
+        if self.store.conflicts:
+            self.status_var.set(f" {len(self.store.conflicts)} change(s) lost to newer edits from "
+                                f"other clients: {', '.join(self.store.conflicts[:5])}")
+            self.store.conflicts.clear()
+        self.root.after(REMOTE_POLL_MS, self.pull_remote)
+
+    def save_snapshot(self):
+        if self._sync_job is not None:
+            self.root.after_cancel(self._sync_job)
+            self._sync_job = None
+        self.store.save()
 
-            if search and search not in name.lower():
-                continue
+    def refresh_list(self, *args):
+        hits = self.search_index.search(self.search_var.get())
+        members = self.filter_members(self.active_filter)
 
-            tags = ("lowstock",) if status == "LOW" else ()
-            self.tree.insert("", "end", iid=name,
-                             values=(name, qty, low, f"${price:.2f}", f"${qty*price:.2f}", status),
-                             tags=tags)
+        if hits is None or members is None:
+            subset = members if hits is None else hits
+        else:
+            subset = hits & members if len(hits) < len(members) else members & hits
 
+        if self.sort_column != "name":
+            names = self.sort_index(self.sort_column).ordered(subset)
+        elif subset is None:
+            names = list(self._sorted_names)
+        else:
+            names = sorted(subset)
+        if self.sort_descending:
+            names.reverse()     # the same order read backwards, no sorting
+
+        self._view_names = names
+        self.set_virtual(len(names) > VIRTUAL_THRESHOLD)
+        if self.virtual:
+            self.render_window()
+        else:
+            self.sync_rows(names)
         self.tree.tag_configure("lowstock", foreground="#d32f2f" if not self.dark_mode.get() else "#ff7777")
 
+    def sync_rows(self, names):
+        """Make the treeview show exactly `names`, in order, touching only rows that changed"""
+        wanted = {name: i for i, name in enumerate(names)}
+
+        stale = [name for name in self._row_order if name not in wanted]
+        if stale:
+            self.tree.delete(*stale)
+            for name in stale:
+                del self._rows[name]
+
+        # Rows that stay keep their relative order unless the ordering itself changed.
+        # Anything outside the longest already-ordered run gets detached and re-placed below.
+        survivors = [name for name in self._row_order if name in wanted]
+        keep = longest_ordered_run(survivors, wanted)
+        if len(keep) != len(survivors):
+            self.tree.detach(*[name for name in survivors if name not in keep])
+
+        for i, name in enumerate(names):
+            d = self.inventory[name]
+            raw = (d.quantity, d.low_threshold, d.price, self.analytics.get(name))
+            if name not in self._rows:
+                self.tree.insert("", i, iid=name, values=self.row_values(name, *raw),
+                                 tags=("lowstock",) if raw[0] <= raw[1] else ())
+            else:
+                if name not in keep:
+                    self.tree.move(name, "", i)
+                if self._rows[name] != raw:
+                    self.tree.item(name, values=self.row_values(name, *raw),
+                                   tags=("lowstock",) if raw[0] <= raw[1] else ())
+            self._rows[name] = raw
+
+        self._row_order = list(names)
+
+    # ──────────────────────────────────────────────
+    # WINDOWED LIST
+    # ──────────────────────────────────────────────
+    def set_virtual(self, enabled):
+        """Switch between one Tk row per item and a window of rows over self._view_names"""
+        if enabled == self.virtual:
+            return
+        self.virtual = enabled
+        if enabled:
+            self.tree_scroll.configure(command=self.on_virtual_scroll)
+            self.tree.configure(yscrollcommand="")
+        else:
+            self.tree_scroll.configure(command=self.tree.yview)
+            self.tree.configure(yscrollcommand=self.tree_scroll.set)
+            self._view_offset = 0
+
+    def page_size(self):
+        return int(self.tree.cget("height"))
+
+    def render_window(self):
+        total = len(self._view_names)
+        page = self.page_size()
+        self._view_offset = max(0, min(self._view_offset, total - page))
+        start = self._view_offset
+        self.sync_rows(self._view_names[start:start + page + VIRTUAL_OVERSCAN])
+        self.tree.yview_moveto(0)
+
+        if self.selected_item in self._rows and self.selected_item not in self.tree.selection():
+            self.tree.selection_set(self.selected_item)
+
+        if total:
+            self.tree_scroll.set(start / total, min(1.0, (start + page) / total))
+        else:
+            self.tree_scroll.set(0.0, 1.0)
+
+    def scroll_window(self, offset):
+        if offset != self._view_offset:
+            self._view_offset = offset
+            self.render_window()
+
+    def on_virtual_scroll(self, *args):
+        total = len(self._view_names)
+        page = self.page_size()
+        if args[0] == "moveto":
+            self.scroll_window(int(float(args[1]) * total))
+        elif args[0] == "scroll":
+            step = page if args[2] == "pages" else 1
+            self.scroll_window(self._view_offset + int(args[1]) * step)
+
+    def on_virtual_wheel(self, event):
+        if not self.virtual:
+            return
+        if event.num == 4 or getattr(event, "delta", 0) > 0:
+            self.scroll_window(self._view_offset - 3)
+        else:
+            self.scroll_window(self._view_offset + 3)
+        return "break"
+
+    def on_virtual_key(self, event):
+        """Move the selection through the whole filtered list, not just the rendered window"""
+        if not self.virtual or not self._view_names:
+            return
+        page = self.page_size()
+        last = len(self._view_names) - 1
+        try:
+            pos = self._view_names.index(self.selected_item)
+        except ValueError:
+            pos = self._view_offset - 1
+
+        pos = {
+            "Up": pos - 1, "Down": pos + 1,
+            "Prior": pos - page, "Next": pos + page,
+            "Home": 0, "End": last,
+        }[event.keysym]
+        pos = max(0, min(pos, last))
+
+        if pos < self._view_offset:
+            self._view_offset = pos
+        elif pos >= self._view_offset + page:
+            self._view_offset = pos - page + 1
+        self.render_window()
+
+        name = self._view_names[pos]
+        self.tree.selection_set(name)
+        self.tree.focus(name)
+        return "break"
+
+    @staticmethod
+    def row_values(name, qty, low, price, demand):
+        due = demand is not None and demand.rate > 0 and qty <= demand.reorder_at
+        status = "LOW" if qty <= low else "REORDER" if due else ""
+        if demand is None or not demand.rate:
+            cover = "—"
+        else:
+            cover = f"{demand.cover:,.0f}" if demand.cover >= 1 else "<1"
+        return (name, qty, low, f"${price:.2f}", f"${qty*price:.2f}", cover, status)
+
+    def filter_members(self, mode):
+        if mode == "reorder":
+            return self.analytics.reorder
+        return self.filter_index.members(mode)
+
+    def sort_by(self, column):
+        """Heading click: sort by `column`, or flip the direction if it already is"""
+        if column == self.sort_column:
+            self.sort_descending = not self.sort_descending
+        else:
+            self.sort_column, self.sort_descending = column, False
+        for col, text in self._headings.items():
+            arrow = (" ▼" if self.sort_descending else " ▲") if col == self.sort_column else ""
+            self.tree.heading(col, text=text + arrow)
+        self._view_offset = 0
+        self.refresh_list()
+
+    def sort_index(self, column):
+        """The cached order for `column`, built on first use and kept up to date by reindex_item"""
+        index = self._sort_indexes.get(column)
+        if index is None:
+            index = self._sort_indexes[column] = SortIndex(self.sort_key(column), self.inventory)
+        return index
+
+    def sort_key(self, column):
+        inventory, analytics = self.inventory, self.analytics
+        if column == "qty":
+            return lambda name: inventory[name].quantity
+        if column == "low":
+            return lambda name: inventory[name].low_threshold
+        if column == "price":
+            return lambda name: inventory[name].price
+        if column == "total":
+            return lambda name: inventory[name].quantity * inventory[name].price
+        if column == "cover":
+            return lambda name: analytics.get(name).cover if name in analytics.demand else math.inf
+
+        def status(name):
+            # LOW first, then REORDER, then the rest
+            d = inventory[name]
+            if d.quantity <= d.low_threshold:
+                return 0
+            figures = analytics.get(name)
+            return 1 if figures is not None and needs_reorder(d, figures) else 2
+        return status
+
     def apply_filter(self, mode):
         self.active_filter = mode
+        self._view_offset = 0
         self.refresh_list()
 
+    def on_search_change(self):
+        # Debounce keystrokes: only the last query typed within the window gets run
+        if self._search_job is not None:
+            self.root.after_cancel(self._search_job)
+        self._search_job = self.root.after(SEARCH_DEBOUNCE_MS, self.run_search)
+
+    def run_search(self):
+        self._search_job = None
+        self._view_offset = 0
+        self.refresh_list()
+
+    def rebuild_indexes(self):
+        self._sorted_names = sorted(self.inventory)
+        self.search_index = SearchIndex(self._sorted_names)
+        self.filter_index = FilterIndex(self.inventory)
+        self.stats = StatsTracker(self.inventory)
+        self.analytics = StockAnalytics(self.inventory)
+        self._sort_indexes = {}
+        if self.locations is not None and self.locations.loaded(self.location):
+            self.locations.attach(self.location, self.inventory, self.stats)
+        self.root.after_idle(self.build_search_index, self.search_index)
+
+    def build_search_index(self, index):
+        # Index in slices between events so a big catalog never freezes the window
+        if index is self.search_index and not index.build_some():
+            self.root.after(1, self.build_search_index, index)
+
+    def refresh_analytics(self):
+        # Demand is measured up to "now", so recompute everything once in a while
+        if not self.loading:
+            self.analytics.compute()
+            self._sort_indexes.pop("cover", None)
+            self._sort_indexes.pop("status", None)
+            self.refresh_list()
+        self.root.after(ANALYTICS_REFRESH_MS, self.refresh_analytics)
+
+    def item_changed(self, name):
+        """An operation changed the item (and told the store): catch up the indexes"""
+        self.reindex_item(name)
+        self.schedule_sync()
+
+    def reindex_item(self, name):
+        """Bring the indexes up to date for an item the store already knows about"""
+        d = self.inventory[name]
+        if name not in self.search_index.lowered:
+            bisect.insort(self._sorted_names, name)
+            self.search_index.add(name)
+        self.filter_index.update(name, d)
+        self.stats.update(name, d)
+        self.analytics.update(name)
+        for index in self._sort_indexes.values():
+            index.update(name)
+        ts = d.history.last_ts()
+        if ts is not None:
+            self.filter_index.touch(name, ts)
+
+    def unindex_item(self, name):
+        i = bisect.bisect_left(self._sorted_names, name)
+        if i < len(self._sorted_names) and self._sorted_names[i] == name:
+            del self._sorted_names[i]
+        self.search_index.discard(name)
+        self.filter_index.discard(name)
+        self.stats.discard(name)
+        self.analytics.discard(name)
+        for index in self._sort_indexes.values():
+            index.discard(name)
+
     # ──────────────────────────────────────────────
     # ITEM ACTIONS
     # ──────────────────────────────────────────────
     def on_item_select(self, event):
         sel = self.tree.selection()
+        if not sel and self.virtual and self.selected_item in self.inventory \
+                and self.selected_item not in self._rows:
+            # Selection only scrolled out of the rendered window
+            return
         if not sel:
             self.clear_edit_fields()
             self.history.config(state="normal")
@@ -287,19 +746,19 @@ class InventoryApp:
         self.selected_item = name
         self.name_label.config(text=name)
         self.qty_entry.delete(0, "end")
-        self.qty_entry.insert(0, str(d["quantity"]))
+        self.qty_entry.insert(0, str(d.quantity))
         self.price_entry.delete(0, "end")
-        self.price_entry.insert(0, f"{d['price']:.2f}")
+        self.price_entry.insert(0, f"{d.price:.2f}")
         self.low_entry.delete(0, "end")
-        self.low_entry.insert(0, str(d.get("low_threshold", 5)))
+        self.low_entry.insert(0, str(d.low_threshold))
 
         self.history.config(state="normal")
         self.history.delete("1.0", "end")
-        for entry in reversed(d.get("history", [])[-5:]):
-            sign = "+" if entry["change"] >= 0 else ""
-            line = f"{entry['date']} {sign}{entry['change']} → {entry['new_qty']}"
-            if entry.get("note"):
-                line += f" ({entry['note']})"
+        for ts, change, new_qty, note in reversed(d.history.last(RECENT_MOVEMENTS)):
+            sign = "+" if change >= 0 else ""
+            line = f"{format_history_date(ts)} {sign}{change} → {new_qty}"
+            if note:
+                line += f" ({note})"
             self.history.insert("end", line + "\n")
         self.history.config(state="disabled")
 
@@ -316,13 +775,13 @@ class InventoryApp:
             messagebox.showwarning("No selection", "Please select an item first.")
             return
 
-        d = self.inventory[self.selected_item]
-        new_qty = max(0, d["quantity"] + delta)
-        change = new_qty - d["quantity"]
-        d["quantity"] = new_qty
-
         note = self.note_entry.get().strip()
-        self.add_history(self.selected_item, change, new_qty, note)
+        try:
+            _, new_qty = operations.adjust_quantity(self.inventory, self.store, self.selected_item, delta, note)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self.item_changed(self.selected_item)
 
         self.qty_entry.delete(0, "end")
         self.qty_entry.insert(0, str(new_qty))
@@ -332,17 +791,18 @@ class InventoryApp:
         self.on_item_select(None)
 
     def add_item(self):
+        if self.still_loading():
+            return
         name = simpledialog.askstring("New Item", "Enter item name:")
-        if not name or name.strip() == "" or name in self.inventory:
+        name = (name or "").strip()
+        if not name:
+            return
+        if name in self.inventory:
+            messagebox.showwarning("New Item", f"{name} already exists.")
             return
 
-        self.inventory[name.strip()] = {
-            "quantity": 0,
-            "price": 0.0,
-            "low_threshold": 5,
-            "history": []
-        }
-        self.add_history(name.strip(), 0, 0, "Item created")
+        operations.create_item(self.inventory, self.store, name)
+        self.item_changed(name)
         self.refresh_list()
         self.update_stats()
 
@@ -351,24 +811,16 @@ class InventoryApp:
             messagebox.showwarning("Warning", "No item selected.")
             return
 
+        note = self.note_entry.get().strip()
         try:
             qty = int(self.qty_entry.get())
             price = float(self.price_entry.get())
             low = int(self.low_entry.get())
+            operations.update_item(self.inventory, self.store, self.selected_item, qty, price, low, note)
         except ValueError:
             messagebox.showerror("Error", "Invalid number format.")
             return
-
-        d = self.inventory[self.selected_item]
-        change = qty - d["quantity"]
-
-        d["quantity"] = qty
-        d["price"] = price
-        d["low_threshold"] = low
-
-        if change != 0:
-            note = self.note_entry.get().strip() or "Manual update"
-            self.add_history(self.selected_item, change, qty, note)
+        self.item_changed(self.selected_item)
 
         self.refresh_list()
         self.update_stats()
@@ -380,157 +832,392 @@ class InventoryApp:
 
         item_name = self.selected_item
         if messagebox.askyesno("Confirm Delete", f"Delete {item_name}? (1 item)"):
-            del self.inventory[item_name]
+            operations.delete_item(self.inventory, self.store, item_name)
+            self.unindex_item(item_name)
+            self.schedule_sync()
             self.selected_item = None
             self.refresh_list()
             self.update_stats()
             self.clear_edit_fields()
 
-    def add_history(self, name, change, new_qty, note=""):
-        if name not in self.inventory:
+    def show_history(self):
+        """Page through the selected item's full movement history, newest first"""
+        if not self.selected_item:
             return
-        entry = {
-            "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "change": change,
-            "new_qty": new_qty,
-            "note": note.strip()
-        }
-        self.inventory[name]["history"].append(entry)
-        self.inventory[name]["history"] = self.inventory[name]["history"][-20:]
+        name = self.selected_item
+        win = tk.Toplevel(self.root)
+        win.title(f"History – {name}")
+        win.geometry("720x480")
+        tree = ttk.Treeview(win, columns=("date", "change", "qty", "note"), show="headings")
+        for col, text, width in (("date", "Date", 150), ("change", "Change", 80),
+                                 ("qty", "New Qty", 80), ("note", "Note", 380)):
+            tree.heading(col, text=text)
+            tree.column(col, width=width, anchor="w" if col in ("date", "note") else "e")
+        tree.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
+        nav = ttk.Frame(win)
+        nav.pack(fill=tk.X, padx=8, pady=(0, 8))
+        newer = ttk.Button(nav, text="◀ Newer")
+        older = ttk.Button(nav, text="Older ▶")
+        page_label = ttk.Label(nav)
+        newer.pack(side=tk.LEFT)
+        older.pack(side=tk.LEFT, padx=6)
+        page_label.pack(side=tk.LEFT, padx=6)
+
+        def show(offset):
+            try:
+                # One extra row tells whether there is an older page
+                rows = self.store.movements(name, offset=offset, limit=HISTORY_PAGE + 1)
+            except self.store.LOAD_ERRORS as e:
+                messagebox.showerror("History", f"Could not read the history:\n{e}", parent=win)
+                return
+            tree.delete(*tree.get_children())
+            for _, ts, change, new_qty, note in rows[:HISTORY_PAGE]:
+                tree.insert("", "end", values=(format_history_date(ts), f"{change:+d}", new_qty, note))
+            page_label.config(text=f"Movements {offset + 1:,}–{offset + len(rows[:HISTORY_PAGE]):,}"
+                                   if rows else "No movements recorded")
+            newer.config(state="normal" if offset else "disabled",
+                         command=lambda: show(max(0, offset - HISTORY_PAGE)))
+            older.config(state="normal" if len(rows) > HISTORY_PAGE else "disabled",
+                         command=lambda: show(offset + HISTORY_PAGE))
+        show(0)
 
     def update_stats(self):
-        total = sum(d["quantity"] * d["price"] for d in self.inventory.values())
-        low_count = sum(1 for d in self.inventory.values() if d["quantity"] <= d.get("low_threshold", 5))
-        self.stats_label.config(text=f"Total Value: ${total:,.2f}    Low Stock Items: {low_count}")
+        if VERIFY_STATS:
+            self.stats.verify(self.inventory)
+        text = (f"Total Value: ${self.stats.total_value:,.2f}    "
+                f"Low Stock Items: {self.stats.low_count}    "
+                f"Out of Stock: {self.stats.zero_count}")
+        if self.locations is not None and len(self.locations.entries) > 1:
+            combined, _ = self.locations.combined()     # per-location totals; loads nothing
+            text += f"\nAll {len(self.locations.entries)} locations: ${combined['value']:,.2f}"
+        self.stats_label.config(text=text)
 
     def backup_inventory(self):
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_path = os.path.join(BACKUP_DIR, f"backup_{timestamp}.json")
+        if self.still_loading():
+            return
         try:
-            shutil.copy(INVENTORY_FILE, backup_path)
-            messagebox.showinfo("Backup", f"Backup saved:\n{os.path.basename(backup_path)}")
+            self.store.check_loaded()       # an empty stand-in would only push real backups out
+            backup = BackupRepository(self.backup_dir()).create(self.inventory)
+            messagebox.showinfo("Backup", f"Backup saved: {backup['name']}\n\n"
+                                          f"{backup['items']:,} items, {backup['new_chunks']} of "
+                                          f"{len(backup['chunks'])} chunks new "
+                                          f"({backup['bytes_written'] / 1024:,.0f} KB written)")
         except Exception as e:
             messagebox.showerror("Backup Failed", str(e))
 
     def restore_inventory(self):
-        file = filedialog.askopenfilename(initialdir=BACKUP_DIR, filetypes=[("JSON files", "*.json")])
+        if self.still_loading():
+            return
+        file = filedialog.askopenfilename(initialdir=os.path.join(self.backup_dir(), "manifests"),
+                                          filetypes=[("Backups", "*.json")])
         if file:
             try:
-                shutil.copy(file, INVENTORY_FILE)
+                restore_backup(self.store, file, current=self.inventory)
                 self.inventory = self.load_inventory()
+                self.rebuild_indexes()
                 self.refresh_list()
                 self.update_stats()
                 messagebox.showinfo("Restore", "Inventory restored successfully")
             except Exception as e:
                 messagebox.showerror("Restore Failed", str(e))
 
+    def import_file(self):
+        if self.still_loading():
+            return
+        file = filedialog.askopenfilename(
+            title="Import Stock Movements",
+            filetypes=[("Movement files", "*.csv *.jsonl *.ndjson"), ("All files", "*.*")]
+        )
+        if not file:
+            return
+
+        try:
+            result = import_movements(file, self.inventory, self.store)
+        except data_errors() as e:
+            messagebox.showerror("Import Failed", str(e))
+            return
+
+        for name in result.touched:
+            self.reindex_item(name)
+        self.refresh_list()
+        self.update_stats()
+        self.on_item_select(None)
+
+        self.status_var.set(" " + result.summary())
+        message = result.summary()
+        if result.errors:
+            shown = "\n".join(f"Line {line}: {error}" for line, error in result.errors[:15])
+            more = len(result.errors) - 15
+            message += f"\n\n{shown}" + (f"\n… and {more:,} more" if more > 0 else "")
+            messagebox.showwarning("Import", message)
+        else:
+            messagebox.showinfo("Import", message)
+
     def generate_report(self):
+        if self.still_loading():
+            return
+        if self._export is not None:
+            messagebox.showinfo("Export", "An export is already running.")
+            return
         visible_only = messagebox.askyesno("Export Options",
                                            "Export only currently visible/filtered items?\n\n"
                                            "Yes = Filtered view\nNo = All items")
 
         file = filedialog.asksaveasfilename(
             defaultextension=".csv",
-            filetypes=[("CSV files", "*.csv")],
+            filetypes=[("CSV files", "*.csv"), ("Compressed CSV", "*.csv.gz"),
+                       ("NDJSON files", "*.ndjson"), ("Compressed NDJSON", "*.ndjson.gz"),
+                       ("Parquet files", "*.parquet")],
             title="Export Inventory"
         )
         if not file:
             return
 
         try:
-            with open(file, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(["Name", "Qty", "Low Threshold", "Price", "Total"])
-
-                items = self.get_visible_items() if visible_only else self.inventory.items()
-
-                for name, d in sorted(items):
-                    qty = d["quantity"]
-                    price = d["price"]
-                    writer.writerow([
-                        name,
-                        qty,
-                        d.get("low_threshold", 5),
-                        f"{price:.2f}",
-                        f"{qty * price:.2f}"
-                    ])
-            messagebox.showinfo("Success", f"Exported to:\n{os.path.basename(file)}")
-        except Exception as e:
+            if visible_only and self.active_filter == "reorder":
+                # Demand figures live in the window only; export the rows on screen
+                rows = [report_row(name, self.inventory[name]) for name in self._view_names]
+                total = len(rows)
+            elif visible_only:
+                total, rows = self.store.snapshot_rows(self.active_filter, self.search_var.get())
+            else:
+                total, rows = self.store.snapshot_rows()
+        except data_errors() as e:
             messagebox.showerror("Export Failed", str(e))
+            return
+
+        # Write on a worker thread from the snapshot; the window only shows progress
+        self._export = threading.Event()
+        self._export_started = time.perf_counter()
+        results = queue.Queue()
+        threading.Thread(target=self.export_worker, args=(rows, total, file, self._export, results),
+                         daemon=True).start()
+        self.progress["value"] = 0
+        self.cancel_button.pack(side=tk.RIGHT, padx=(8, 0))
+        self.progress.pack(side=tk.RIGHT, padx=(8, 0))
+        self.status_var.set(f" Exporting {total:,} items…")
+        self.root.after(LOAD_POLL_MS, self.poll_export, file, results)
+
+    @staticmethod
+    def export_worker(rows, total, file, cancel, results):
+        try:
+            count = export_rows(rows, total, file, lambda done, n: results.put(("progress", done, n)), cancel)
+            results.put(("done", count, total))
+        except ExportCancelled:
+            results.put(("cancelled", 0, total))
+        except Exception as e:
+            results.put(("error", e, total))
+
+    def poll_export(self, file, results):
+        try:
+            while True:
+                kind, value, total = results.get_nowait()
+                if kind == "progress":
+                    self.progress["value"] = 100 * value / (total or 1)
+                    self.status_var.set(f" Exporting… {value:,} of {total:,} items")
+                    continue
+                self._export = None
+                self.progress.pack_forget()
+                self.cancel_button.pack_forget()
+                if kind == "done":
+                    if self.metrics:
+                        self.metrics.record("export", time.perf_counter() - self._export_started)
+                    self.status_var.set(f" Exported {value:,} items to {os.path.basename(file)}")
+                    messagebox.showinfo("Success", f"Exported to:\n{os.path.basename(file)}")
+                elif kind == "cancelled":
+                    self.status_var.set(" Export cancelled")
+                else:
+                    self.status_var.set(" Export failed")
+                    messagebox.showerror("Export Failed", str(value))
+                return
+        except queue.Empty:
+            pass
+        self.root.after(LOAD_POLL_MS, self.poll_export, file, results)
+
+    def cancel_export(self):
+        if self._export is not None:
+            self._export.set()
 
     def get_visible_items(self):
         """Return dict of currently visible items in the treeview"""
         visible = {}
-        for iid in self.tree.get_children():
-            name = iid
+        for name in self._view_names:
             if name in self.inventory:
                 visible[name] = self.inventory[name]
         return visible.items()
     
     def print_table(self):
-        # Simple HTML table for printing current visible items
-        now_str = datetime.now().strftime("%Y-%m-%d %H:%M")
-
-        html = f"""
-        <html>
-        <head><title>Inventory Print</title>
-        <style>
-            body {{ font-family: Arial, sans-serif; margin: 40px; }}
-            table {{ width: 100%; border-collapse: collapse; }}
-            th, td {{ border: 1px solid #ddd; padding: 8px; text-align: left; }}
-            th {{ background-color: #f2f2f2; }}
-            h1 {{ text-align: center; }}
-        </style>
-        </head>
-        <body>
-        <h1>Inventory Report</h1>
-        <p>Generated on: {now_str}</p>
-        <table>
-            <tr>
-                <th>Item Name</th>
-                <th>Qty</th>
-                <th>Low @</th>
-                <th>Price</th>
-                <th>Total Value</th>
-                <th>Status</th>
-            </tr>
-        """
-
-        for iid in self.tree.get_children():
-            values = self.tree.item(iid, "values")
-            html += f"""
-            <tr>
-                <td>{values[0]}</td>
-                <td>{values[1]}</td>
-                <td>{values[2]}</td>
-                <td>{values[3]}</td>
-                <td>{values[4]}</td>
-                <td>{values[5]}</td>
-            </tr>
-            """
-
-        html += """
-        </table>
-        </body>
-        </html>
-        """
-
-        with open("inventory_print.html", "w", encoding="utf-8") as f:
-            f.write(html)
-
-        webbrowser.open("inventory_print.html")
+        # Printable HTML of the current view, straight from the model
+        inventory = self.inventory
+        rows = ((name, d.quantity, d.low_threshold, d.price)
+                for name in self._view_names for d in (inventory[name],))
+        try:
+            paths = render_report_html(rows, len(self._view_names))
+        except OSError as e:
+            messagebox.showerror("Print Failed", str(e))
+            return
+        if len(paths) > 1:
+            self.status_var.set(f" Printable report written as {len(paths)} pages")
+        webbrowser.open(os.path.abspath(paths[0]))
+
+    # ──────────────────────────────────────────────
+    # LOCATIONS
+    # ──────────────────────────────────────────────
+    def backup_dir(self):
+        if self.locations is None:
+            return BACKUP_DIR
+        return os.path.join(self.locations.directory(self.location), BACKUP_DIR)
+
+    def add_location(self):
+        if self.still_loading():
+            return
+        name = simpledialog.askstring("New Location", "Name of the new location:")
+        if not name:
+            return
+        try:
+            self.locations.add(name)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("New Location", str(e))
+            return
+        self.location_box.config(values=self.locations.names())
+        self.switch_location(name.strip())
+
+    def switch_location(self, name):
+        """Show location `name` in this window; its items are loaded on first use only"""
+        if name == self.location:
+            return
+        if self.loading or self._export is not None:
+            self.location_var.set(self.location)
+            messagebox.showinfo("Please wait", "Wait for the inventory to load or the export to finish.")
+            return
+        if self._sync_job is not None:
+            self.root.after_cancel(self._sync_job)
+        self.sync_store()
+        try:
+            store = self.locations.open(name)
+        except data_errors() as e:
+            self.location_var.set(self.location)
+            messagebox.showerror("Location", f"Could not open {name}:\n{e}")
+            return
+        self.location, self.store = name, store
+        self.location_var.set(name)
+        self._view_offset = 0
+        loaded = self.locations.loaded(name)
+        self.inventory = self.locations.load(name) if loaded else {}
+        self.rebuild_indexes()
+        self.refresh_list()
+        self.update_stats()
+        self.on_item_select(None)
+        if loaded:
+            self.status_var.set(f" {name} – {len(self.inventory):,} items")
+        else:
+            self.start_loading()
+
+    def transfer_item(self):
+        if not self.selected_item or self.still_loading():
+            return
+        name = self.selected_item
+        others = [loc for loc in self.locations.names() if loc != self.location]
+        if not others:
+            messagebox.showinfo("Transfer", "There is no other location yet – add one with New Location.")
+            return
+        dest = simpledialog.askstring("Transfer", f"Move {name} to which location?\n\n" + "\n".join(others),
+                                      initialvalue=others[0])
+        if not dest:
+            return
+        if dest not in others:
+            messagebox.showerror("Transfer", f"No other location named {dest!r}.")
+            return
+        have = self.inventory[name].quantity
+        if not have:
+            messagebox.showinfo("Transfer", f"There is no {name} here to move.")
+            return
+        qty = simpledialog.askinteger("Transfer", f"How many {name} to {dest}? ({have} here)",
+                                      minvalue=1, maxvalue=have)
+        if not qty:
+            return
+
+        note = self.note_entry.get().strip()
+        try:
+            dest_inventory = self.locations.load(dest)
+            dest_store = self.locations.open(dest)
+            src_qty, dst_qty = operations.transfer_stock((self.location, self.inventory, self.store),
+                                                         (dest, dest_inventory, dest_store), name, qty, note)
+            dest_store.sync()
+        except data_errors() as e:
+            messagebox.showerror("Transfer Failed", str(e))
+            return
+        self.locations.changed(dest, name)
+        self.item_changed(name)
+
+        self.refresh_list()
+        self.update_stats()
+        self.on_item_select(None)
+        self.status_var.set(f" {name}: {qty} moved to {dest} – {src_qty} left here, {dst_qty} there")
+
+    # ──────────────────────────────────────────────
+    # INSTRUMENTATION (INVENTORY_INSTRUMENT=1)
+    # ──────────────────────────────────────────────
+    def show_frame_cost(self, frame):
+        slowest = ", ".join(f"{name} {ms:.1f}" for name, ms in list(frame["operations"].items())[:3])
+        recording = "● profiling · " if self.metrics.profiling else ""
+        self.metrics_var.set(f" {recording}last frame {frame['ms']:.1f} ms ({slowest}) · "
+                             f"{frame['tk_calls']:,} Tk calls ")
+
+    def toggle_profile(self):
+        if self.metrics.profiling:
+            self.metrics.stop_profile()
+            self.status_var.set(" Profile captured – F9 saves it with the metrics")
+        else:
+            self.metrics.start_profile()
+            self.status_var.set(" Profiling… press F8 again to stop")
+
+    def dump_metrics(self):
+        path = METRICS_FILE.format(stamp=time.strftime("%Y%m%d-%H%M%S"))
+        try:
+            self.metrics.dump(path)
+        except OSError as e:
+            messagebox.showerror("Metrics", f"Could not save metrics:\n{e}")
+            return
+        self.status_var.set(f" Metrics saved to {os.path.abspath(path)}")
 
     def on_closing(self):
-        if messagebox.askyesno("Quit", "Do you want to save changes before closing?"):
-            try:
-                with open(INVENTORY_FILE, 'w') as f:
-                    json.dump(self.inventory, f, indent=4)
-                print("Inventory saved automatically")
-            except Exception as e:
-                messagebox.showerror("Save Error", f"Could not save inventory:\n{e}")
+        # Every change is already in the store; bring the files fully up to date on the way out
+        try:
+            # Never fold a half-loaded, or unreadable, inventory over the saved one
+            if not self.loading and self.store.load_error is None:
+                self.save_snapshot()
+            if self.locations is not None:
+                self.locations.save_loaded(skip=self.location)
+                self.locations.close()
+            else:
+                self.store.close()
+            print("Inventory saved automatically")
+        except Exception as e:
+            messagebox.showerror("Save Error", f"Could not save inventory:\n{e}")
         self.root.destroy()
 
-if __name__ == "__main__":
+def main(argv=None):
+    args = cli.build_parser().parse_args(argv)
+    if args.command is not None:
+        return cli.run(args)     # same commands as python -m smart_inventory
+
+    if args.server and args.location:
+        print("--location needs local storage, not --server", file=sys.stderr)
+        return 2
+    if args.location and args.location not in Locations().entries:
+        print(f"No such location: {args.location!r}", file=sys.stderr)
+        return 2
     root = tk.Tk()
-    app = InventoryApp(root)
+    try:
+        InventoryApp(root, open_store(server=args.server) if args.server else None,
+                     args.location or DEFAULT_LOCATION, args.backend)
+    except data_errors() as e:
+        messagebox.showerror("SmartInventory Pro", f"Could not open the inventory:\n{e}")
+        root.destroy()
+        return 1
     root.mainloop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
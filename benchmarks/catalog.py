@@ -0,0 +1,88 @@
+"""Generate synthetic inventories with realistic stock movement histories.
+
+    python benchmarks/catalog.py <items> [--out inventory.json] [--seed 1] [--days 90]
+
+Demand follows a long tail: a few items are picked many times a day, most
+only now and then (Pareto-distributed pick rates). Each item's movements are
+simulated over the last `days` days: picks of a few units at Poisson arrival
+times, and a restock whenever the quantity reaches the low threshold, which is
+set to about a week of demand. Prices are log-normal. The same seed always
+gives the same catalog, so benchmark runs are comparable.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from smart_inventory.model import Item
+from smart_inventory.storage import write_json_snapshot
+
+KINDS = ["Bolt", "Nut", "Washer", "Screw", "Bearing", "Gasket", "Hose", "Valve", "Fuse", "Cable",
+         "Bracket", "Spring", "Filter", "Seal", "Pin", "Clamp", "Relay", "Switch", "Sensor", "Belt"]
+MATERIALS = ["steel", "brass", "nylon", "zinc", "copper", "rubber", "stainless", "aluminium"]
+SIZES = ["M3", "M4", "M5", "M6", "M8", "M10", "M12", "1/4\"", "3/8\"", "1/2\"", "10mm", "25mm"]
+PICK_NOTES = ["", "", "", "Sold", "Order", "Job card", "Scan"]
+MAX_EVENTS = 60         # movements simulated per item; only the newest are kept on the item anyway
+
+
+def item_name(rng, i):
+    return f"{rng.choice(KINDS)} {rng.choice(MATERIALS)} {rng.choice(SIZES)} #{i:07d}"
+
+
+def make_item(rng, now, days):
+    rate = min(0.03 * rng.paretovariate(1.2), 200.0)       # picks per day
+    pick_size = rng.choice([1, 1, 1, 2, 5, 10])
+    low = max(1, round(rate * pick_size * 7))
+    qty = low * 3
+    d = Item(quantity=qty, price=round(rng.lognormvariate(2.3, 1.2), 2), low_threshold=low)
+
+    events = min(MAX_EVENTS, int(rate * days) + rng.randint(0, 2))
+    # The newest `events` arrivals of a Poisson process, walked back from now
+    times = []
+    ts = now
+    for _ in range(events):
+        ts -= rng.expovariate(rate) * 86400 if rate > 0 else 86400
+        times.append(int(max(ts, now - days * 86400)))
+    for ts in reversed(times):
+        if qty <= low and rng.random() < 0.9:
+            change = low * rng.choice([2, 3, 4])
+            note = "Restock"
+        else:
+            change = -min(qty, rng.randint(1, pick_size))
+            note = rng.choice(PICK_NOTES)
+        qty += change
+        d.history.append(ts, change, qty, note)
+    d.quantity = qty
+    if rng.random() < 0.03:
+        d.quantity = 0          # some items sold out with the restock still pending
+    return d
+
+
+def make_catalog(items, seed=1, days=90, now=None):
+    """Return {name: Item} with `items` items, the same for the same seed"""
+    rng = random.Random(seed)
+    now = int(time.time()) if now is None else now
+    return {item_name(rng, i): make_item(rng, now, days) for i in range(items)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("items", type=int)
+    parser.add_argument("--out", default="inventory.json")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--days", type=int, default=90)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    catalog = make_catalog(args.items, args.seed, args.days)
+    movements = sum(len(d.history) for d in catalog.values())
+    write_json_snapshot(catalog, args.out)
+    print(f"{len(catalog):,} items, {movements:,} movements kept -> {args.out} "
+          f"({os.path.getsize(args.out) / 1e6:.1f} MB, {time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
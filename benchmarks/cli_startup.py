@@ -0,0 +1,72 @@
+"""Measure how long the command line takes to start, and what it imports.
+
+    python benchmarks/cli_startup.py [runs]
+
+Each command runs against a small scratch inventory in a temporary directory;
+the best of `runs` wall-clock times is reported next to a bare interpreter and
+the GUI module, along with the slowest imports from -X importtime.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+COMMANDS = {
+    "python -c pass": ["-c", "pass"],
+    "import smart_inventory": ["-c", "import smart_inventory"],
+    "stats": ["-m", "smart_inventory", "stats"],
+    "query --limit 10": ["-m", "smart_inventory", "query", "--limit", "10"],
+    "query (sqlite)": ["-m", "smart_inventory", "--backend", "sqlite", "query", "--limit", "10"],
+    "import Inventory_App (GUI)": ["-c", "import Inventory_App"],
+}
+
+
+def best_time(args, env, cwd, runs):
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, env=env, cwd=cwd, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def slowest_imports(args, env, cwd, count=8):
+    """Top-level imports by cumulative time, from -X importtime"""
+    result = subprocess.run([sys.executable, "-X", "importtime"] + args, env=env, cwd=cwd,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):       # nested imports are indented
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    env = dict(os.environ, PYTHONPATH=os.path.abspath(ROOT))
+    with tempfile.TemporaryDirectory() as cwd:
+        with open(os.path.join(cwd, "stock.csv"), "w") as f:
+            f.write("name,quantity\n" + "".join(f"SKU-{i:05d},{i % 40}\n" for i in range(1000)))
+        for backend in ("json", "sqlite"):
+            subprocess.run([sys.executable, "-m", "smart_inventory", "--backend", backend,
+                            "import", "stock.csv", "--create"],
+                           env=env, cwd=cwd, check=True, stdout=subprocess.DEVNULL)
+
+        for label, args in COMMANDS.items():
+            print(f"  {label:<28} {best_time(args, env, cwd, runs) * 1000:7.1f} ms")
+
+        for label in ("stats", "import Inventory_App (GUI)"):
+            print(f"\nslowest imports for {label}:")
+            for micros, name in slowest_imports(COMMANDS[label], env, cwd):
+                print(f"  {name:<28} {micros / 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
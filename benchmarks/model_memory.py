@@ -0,0 +1,66 @@
+"""Compare the memory held by the Item model with the old dict-of-dicts representation.
+
+    python benchmarks/model_memory.py [items] [history entries per item]
+"""
+import json
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from smart_inventory.config import HISTORY_LIMIT
+from smart_inventory.model import Item
+
+NOTES = ["", "Manual update", "Restock", "Sold", "Damaged", "Item created"]
+
+
+def make_raw(items, history, seed=1):
+    rng = random.Random(seed)
+    raw = {}
+    for i in range(items):
+        qty = rng.randint(0, 500)
+        entries = []
+        for h in range(history):
+            change = rng.randint(-20, 20)
+            entries.append({
+                "date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} "
+                        f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}",
+                "change": change,
+                "new_qty": max(0, qty + change),
+                "note": rng.choice(NOTES),
+            })
+        raw[f"SKU-{i:07d} part"] = {"quantity": qty, "price": round(rng.uniform(0.5, 900), 2),
+                                    "low_threshold": 5, "history": entries}
+    return raw
+
+
+def measure(build):
+    tracemalloc.start()
+    model = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return model, size
+
+
+def main():
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    history = min(int(sys.argv[2]) if len(sys.argv) > 2 else HISTORY_LIMIT, HISTORY_LIMIT)
+
+    # Both measurements build from the same JSON text so neither shares strings with the other
+    text = json.dumps(make_raw(items, history))
+
+    old, old_size = measure(lambda: json.loads(text))
+    del old
+    # The dicts from json.loads are dropped once converted, so this counts what the model keeps
+    new, new_size = measure(lambda: {name: Item.from_dict(d) for name, d in json.loads(text).items()})
+
+    print(f"{items:,} items x {history} history entries")
+    print(f"  dict of dicts : {old_size / 1e6:8.1f} MB  ({old_size / items:,.0f} B/item)")
+    print(f"  Item model    : {new_size / 1e6:8.1f} MB  ({new_size / items:,.0f} B/item)")
+    print(f"  ratio         : {old_size / new_size:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
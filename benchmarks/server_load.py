@@ -0,0 +1,128 @@
+"""Load-test the API server with many concurrent scanners pushing quantity deltas.
+
+    python benchmarks/server_load.py [--clients 200] [--requests 50] [--items 1000]
+                                     [--batch 1] [--backend json|sqlite]
+
+Starts `python -m smart_inventory serve` on a scratch catalog in a temporary
+directory, then opens one keep-alive connection per simulated scanner. Each
+scanner sends `--requests` requests of `--batch` random deltas (a plain
+POST /items/<name>/adjust when --batch is 1, POST /batch otherwise). Prints
+throughput and latency percentiles, then checks every item's final quantity
+against the sum of the deltas sent.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import quote
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+START_QTY = 100_000     # high enough that no delta is ever clamped at zero
+
+
+async def call(reader, writer, method, path, body=None):
+    data = b"" if body is None else json.dumps(body).encode()
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = 0
+    for line in head.split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":", 1)[1])
+    payload = json.loads(await reader.readexactly(length))
+    if status != 200:
+        raise RuntimeError(f"{method} {path}: {status} {payload}")
+    return payload
+
+
+async def scanner(port, names, requests, batch, expected, latencies, seed):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        for _ in range(requests):
+            deltas = [(rng.choice(names), rng.randint(-3, 3) or 1) for _ in range(batch)]
+            start = time.perf_counter()
+            if batch == 1:
+                name, change = deltas[0]
+                await call(reader, writer, "POST", f"/items/{quote(name, safe='')}/adjust",
+                           {"change": change, "note": "scan"})
+            else:
+                await call(reader, writer, "POST", "/batch",
+                           {"ops": [{"op": "adjust", "name": n, "change": c, "note": "scan"} for n, c in deltas]})
+            latencies.append(time.perf_counter() - start)
+            for name, change in deltas:
+                expected[name] += change
+    finally:
+        writer.close()
+
+
+async def run(port, args, names):
+    expected = dict.fromkeys(names, START_QTY)
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(scanner(port, names, args.requests, args.batch, expected, latencies, seed)
+                           for seed in range(args.clients)))
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    listing = await call(reader, writer, "GET", "/items")
+    writer.close()
+    actual = {row["name"]: row["quantity"] for row in listing["items"]}
+    mismatched = [n for n in names if actual.get(n) != expected[n]]
+    return elapsed, sorted(latencies), mismatched
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=50, help="requests per client")
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--batch", type=int, default=1, help="deltas per request")
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONPATH=os.path.abspath(ROOT))
+    names = [f"SKU-{i:06d}" for i in range(args.items)]
+    port = free_port()
+    with tempfile.TemporaryDirectory() as cwd:
+        with open(os.path.join(cwd, "stock.csv"), "w") as f:
+            f.write("name,quantity\n" + "".join(f"{n},{START_QTY}\n" for n in names))
+        cli = [sys.executable, "-m", "smart_inventory", "--backend", args.backend]
+        subprocess.run(cli + ["import", "stock.csv", "--create"], env=env, cwd=cwd, check=True,
+                       stdout=subprocess.DEVNULL)
+        server = subprocess.Popen(cli + ["serve", "--port", str(port)], env=env, cwd=cwd,
+                                  stdout=subprocess.PIPE, text=True)
+        try:
+            server.stdout.readline()        # "Serving ..." once it is listening
+            elapsed, latencies, mismatched = asyncio.run(run(port, args, names))
+        finally:
+            server.send_signal(signal.SIGINT)
+            server.wait(timeout=60)
+
+    requests = len(latencies)
+    pct = lambda p: latencies[min(requests - 1, int(p / 100 * requests))] * 1000
+    print(f"{args.clients} clients x {args.requests} requests x {args.batch} deltas, "
+          f"{args.items:,} items, {args.backend} backend")
+    print(f"  {requests / elapsed:10,.0f} requests/s   {requests * args.batch / elapsed:10,.0f} deltas/s"
+          f"   ({elapsed:.2f}s)")
+    print(f"  latency ms: p50 {pct(50):.2f}   p95 {pct(95):.2f}   p99 {pct(99):.2f}   max {latencies[-1] * 1000:.2f}")
+    print(f"  final quantities: {'all match' if not mismatched else f'{len(mismatched)} MISMATCHED'}")
+    return 1 if mismatched else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
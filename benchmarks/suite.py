@@ -0,0 +1,446 @@
+"""Time the inventory's hot paths on synthetic catalogs and report them as JSON.
+
+    python benchmarks/suite.py [--items 1000,10000,100000] [--repeat 3] [--out results.json]
+                               [--baseline old.json] [--tolerance 1.25]
+                               [--display auto|tk|stub] [--cases load,refresh_list] [--no-memory]
+
+For each catalog size a synthetic inventory (see catalog.py) is written to a
+temporary directory. The suite then times loading it from JSON and from
+SQLite, starting the window until the list is usable, refresh_list under each
+filter, a search and a sort, one quantity change, update_stats, rebuilding the
+indexes, the demand analytics, generate_report to each export format and
+print_table. Report times run until the window has noticed the export finished,
+so they include its progress polling, as a user would see them.
+
+The window runs under real Tk when a display is available; `xvfb-run` provides
+a virtual one. Otherwise it runs on widget_stub, where the counts of widget
+calls stand in for the cost of drawing. Each case reports the best and the
+median of `--repeat` timed runs. Its peak memory (tracemalloc) comes from one
+extra run, so tracing does not slow the timed ones.
+
+A summary table goes to stderr and the JSON to stdout (or to --out). With
+--baseline, each case is compared with an earlier result file, and the exit
+status is 1 if any case got slower than --tolerance times its baseline time.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from catalog import make_catalog
+from smart_inventory.analytics import load_numpy
+from smart_inventory.sqlite_store import SqliteStore
+from smart_inventory.storage import JsonStore, write_json_snapshot
+
+try:
+    import resource
+except ImportError:     # Windows
+    resource = None
+
+SEARCH = "brass m8"
+WAIT_TIMEOUT = 900      # seconds to wait for the window to finish something before giving up
+CASES = []
+
+
+def case(name, setup=None, window=True):
+    """Register a timed case; `setup` runs untimed before each run"""
+    def register(run):
+        CASES.append((name, setup, run, window))
+        return run
+    return register
+
+
+class Replies:
+    """Scripted answers for the dialogs a case opens; any other dialog returns None"""
+
+    def __init__(self, **replies):
+        self.replies = replies
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.replies.get(name)
+
+
+class Bench:
+    """One catalog size: its scratch directory, the Tk root and the open window"""
+
+    def __init__(self, items, seed, tk, app_module, stub):
+        self.items = items
+        self.seed = seed
+        self.tk = tk
+        self.app_module = app_module
+        self.stub = stub
+        self.root = tk.Tk()
+        self.window = None
+        self.app = None
+
+    def pump(self, done):
+        """Run the event loop until done() is true"""
+        deadline = time.perf_counter() + WAIT_TIMEOUT
+        while not done():
+            if time.perf_counter() > deadline:
+                raise RuntimeError("timed out waiting for the window")
+            if self.stub is None:
+                self.root.update()
+                time.sleep(0.001)
+            elif not self.stub.run_pending():
+                due = self.stub.next_due()
+                time.sleep(0.001 if due is None else min(max(due - time.monotonic(), 0), 0.01))
+
+    def settle(self):
+        """Finish the work a case left queued (a journal sync, search index slices)"""
+        app = self.app
+        if app._sync_job is not None:
+            self.root.after_cancel(app._sync_job)
+            app.sync_store()
+        self.pump(lambda: app.search_index.ready)
+        if self.stub is None:
+            self.root.update()
+
+    def open_window(self):
+        if self.window is not None:
+            self.app.store.close()
+            self.window.destroy()
+        self.window = self.tk.Toplevel(self.root)
+        self.app = self.app_module.InventoryApp(self.window, JsonStore())
+        self.pump(lambda: not self.app.loading and self.app.search_index.ready)
+
+    def reset_view(self):
+        """All items, no search, sorted by name, scrolled to the top"""
+        app = self.app
+        set_search(app, "")
+        app.active_filter = "all"
+        app.sort_column, app.sort_descending = "name", False
+        app._view_offset = 0
+        app.refresh_list()
+
+    def close(self):
+        if self.app is not None:
+            self.app.store.close()
+        self.root.destroy()
+
+
+def set_search(app, text):
+    app.search_var.set(text)
+    if app._search_job is not None:    # typing schedules a debounced search; run it now instead
+        app.root.after_cancel(app._search_job)
+    app.run_search()
+
+
+def widget_calls(bench):
+    return None if bench.stub is None else sum(bench.stub.CALLS.values())
+
+
+# ── cases ──
+@case("load_inventory.json", window=False)
+def load_json(bench):
+    store = JsonStore()
+    store.load()
+    store.close()
+
+
+@case("load_inventory.sqlite", window=False)
+def load_sqlite(bench):
+    store = SqliteStore()
+    store.load()
+    store.close()
+
+
+@case("window.start")
+def start_window(bench):
+    bench.open_window()
+
+
+def show(mode):
+    def setup(bench):
+        bench.reset_view()
+        bench.app.apply_filter("zero" if mode == "all" else "all")
+    return setup
+
+
+for mode in ("all", "low", "zero", "recent", "reorder"):
+    case(f"refresh_list.{mode}", show(mode))(lambda bench, mode=mode: bench.app.apply_filter(mode))
+
+
+@case("refresh_list.search", lambda bench: bench.reset_view())
+def search(bench):
+    set_search(bench.app, SEARCH)
+
+
+def unsorted(bench):
+    bench.reset_view()
+    bench.app._sort_indexes.clear()
+
+
+@case("refresh_list.sort_total", unsorted)
+def sort_total(bench):
+    bench.app.sort_by("total")      # builds the sort index for the column
+
+
+def sorted_by_total(bench):
+    bench.reset_view()
+    bench.app.sort_by("total")
+
+
+@case("refresh_list.sort_flip", sorted_by_total)
+def sort_flip(bench):
+    bench.app.sort_by("total")      # same column again: descending
+
+
+def select_first(bench):
+    bench.reset_view()
+    app = bench.app
+    app.tree.selection_set(app._view_names[0])
+    app.on_item_select(None)
+
+
+@case("change_qty", select_first)
+def change_qty(bench):
+    bench.app.change_qty(1)
+
+
+@case("update_stats")
+def update_stats(bench):
+    bench.app.update_stats()
+
+
+@case("rebuild_indexes")
+def rebuild_indexes(bench):
+    bench.app.rebuild_indexes()
+
+
+@case("analytics.compute")
+def analytics(bench):
+    bench.app.analytics.compute()
+
+
+def report(ext):
+    def run(bench):
+        app, module = bench.app, bench.app_module
+        path = os.path.abspath("report" + ext)
+        dialogs = module.messagebox, module.filedialog
+        module.messagebox = Replies(askyesno=False)
+        module.filedialog = Replies(asksaveasfilename=path)
+        try:
+            app.generate_report()
+            bench.pump(lambda: app._export is None)
+        finally:
+            module.messagebox, module.filedialog = dialogs
+        if not os.path.exists(path):
+            raise RuntimeError(f"generate_report wrote no {path}: {app.status_var.get()}")
+    return run
+
+
+for ext in (".csv", ".csv.gz", ".ndjson", ".ndjson.gz"):
+    case("generate_report" + ext, lambda bench: bench.reset_view())(report(ext))
+
+
+@case("print_table", lambda bench: bench.reset_view())
+def print_table(bench):
+    module = bench.app_module
+    browser = module.webbrowser
+    module.webbrowser = types.SimpleNamespace(open=lambda url: True)
+    try:
+        bench.app.print_table()
+    finally:
+        module.webbrowser = browser
+
+
+@case("save_snapshot")
+def save_snapshot(bench):
+    bench.app.save_snapshot()
+
+
+# ── running ──
+def measure(bench, setup, run, repeat, memory):
+    times = []
+    calls = None
+    for _ in range(repeat):
+        if setup:
+            setup(bench)
+        before = widget_calls(bench)
+        start = time.perf_counter()
+        run(bench)
+        times.append(time.perf_counter() - start)
+        if before is not None:
+            calls = widget_calls(bench) - before
+        if bench.app is not None:
+            bench.settle()
+    result = {"best": min(times), "median": statistics.median(times), "runs": times, "widget_calls": calls}
+    if memory:
+        if setup:
+            setup(bench)
+        tracemalloc.start()
+        run(bench)
+        result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        if bench.app is not None:
+            bench.settle()
+    return result
+
+
+def prepare(items, seed):
+    """Write the catalog to inventory.json and inventory.db in the current directory"""
+    timings = {}
+    start = time.perf_counter()
+    catalog = make_catalog(items, seed)
+    timings["catalog.generate"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    write_json_snapshot(catalog, "inventory.json")
+    del catalog
+    store = JsonStore()
+    store.load()        # the first load also starts the history log
+    store.close()
+    timings["catalog.write_json"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    SqliteStore().close()       # a fresh database imports inventory.json
+    timings["catalog.import_sqlite"] = time.perf_counter() - start
+    return timings
+
+
+def run_size(items, args, tk, app_module, stub):
+    results = []
+    home = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            for name, seconds in prepare(items, args.seed).items():
+                results.append({"case": name, "items": items, "best": seconds, "median": seconds,
+                                "runs": [seconds], "widget_calls": None})
+                report_line(results[-1])
+            bench = Bench(items, args.seed, tk, app_module, stub)
+            try:
+                for name, setup, run, window in CASES:
+                    if args.cases and not name.startswith(tuple(args.cases)):
+                        continue
+                    if window and bench.app is None:
+                        bench.open_window()
+                    result = measure(bench, setup, run, args.repeat, args.memory)
+                    results.append({"case": name, "items": items, **result})
+                    report_line(results[-1])
+            finally:
+                bench.close()
+        finally:
+            os.chdir(home)
+    return results
+
+
+def report_line(result):
+    peak = result.get("peak_bytes")
+    calls = result.get("widget_calls")
+    print(f"{result['items']:>9,}  {result['case']:<28} {result['best'] * 1000:10.1f} ms "
+          f"{result['median'] * 1000:10.1f} ms"
+          + (f" {peak / 1e6:9.1f} MB" if peak is not None else " " * 13)
+          + (f" {calls:>9,} calls" if calls is not None else ""), file=sys.stderr)
+
+
+def open_display(mode):
+    """Return (tkinter, widget_stub or None): real Tk if it can open a window, else the stub"""
+    if mode != "stub":
+        try:
+            import tkinter
+            tkinter.Tk().destroy()
+            return tkinter, None
+        except ImportError as e:
+            error = e
+        except tkinter.TclError as e:
+            error = e
+        if mode == "tk":
+            sys.exit(f"Cannot open a Tk window ({error}); try xvfb-run or --display stub")
+    import widget_stub
+    for name in [m for m in sys.modules if m == "tkinter" or m.startswith("tkinter.")]:
+        del sys.modules[name]
+    return widget_stub.install(), widget_stub
+
+
+def compare(results, baseline, tolerance):
+    """Print each case's time against the baseline; return how many got slower than `tolerance`"""
+    before = {(r["items"], r["case"]): r["best"] for r in baseline["results"]}
+    slower = 0
+    print(f"\n{'items':>9}  {'case':<28} {'baseline':>13} {'now':>13} {'ratio':>7}", file=sys.stderr)
+    for r in results:
+        old = before.get((r["items"], r["case"]))
+        if not old:
+            continue
+        ratio = r["best"] / old
+        flag = ""
+        if ratio > tolerance:
+            flag, slower = "  slower", slower + 1
+        elif ratio < 1 / tolerance:
+            flag = "  faster"
+        print(f"{r['items']:>9,}  {r['case']:<28} {old * 1000:10.1f} ms {r['best'] * 1000:10.1f} ms "
+              f"{ratio:6.2f}x{flag}", file=sys.stderr)
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", default="1000,10000,100000",
+                        help="comma-separated catalog sizes (up to 1000000)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--cases", type=lambda s: s.split(","),
+                        help="only the cases whose names start with one of these prefixes")
+    parser.add_argument("--display", choices=["auto", "tk", "stub"], default="auto")
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="skip the tracemalloc run of each case")
+    parser.add_argument("--out", help="write the JSON here instead of to stdout")
+    parser.add_argument("--baseline", help="an earlier --out file to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.25)
+    args = parser.parse_args()
+
+    tk, stub = open_display(args.display)
+    import Inventory_App
+
+    numpy = load_numpy()
+    output = {
+        "version": 1,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "numpy": numpy.__version__ if numpy else None,
+            "display": "stub" if stub else "tk",
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "results": [],
+    }
+    print(f"{'items':>9}  {'case':<28} {'best':>13} {'median':>13} {'peak':>12}", file=sys.stderr)
+    for items in (int(n) for n in args.items.split(",")):
+        output["results"] += run_size(items, args, tk, Inventory_App, stub)
+    if resource is not None:
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        output["meta"]["max_rss_bytes"] = rss if sys.platform == "darwin" else rss * 1024
+
+    text = json.dumps(output, indent=1)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(output["results"], baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""A stand-in for tkinter, so the window's code can be timed without a display.
+
+    import widget_stub
+    widget_stub.install()       # before Inventory_App is imported
+    import Inventory_App
+
+Every widget accepts any option and any method call. The Treeview keeps its
+rows, so inserts, moves and deletes still cost their bookkeeping. CALLS counts
+each widget method call by name, which approximates the Tcl round trips a
+real display would make. Timers run when run_pending() is called once their
+delay has passed, like Tk's event loop would run them.
+"""
+import itertools
+import sys
+import time
+import types
+from collections import Counter
+
+CALLS = Counter()
+CONSTANTS = ["BOTH", "X", "Y", "LEFT", "RIGHT", "TOP", "BOTTOM", "VERTICAL", "HORIZONTAL",
+             "DISABLED", "NORMAL", "WORD", "END", "N", "S", "E", "W"]
+
+_timers = []                # (due, id, function, args)
+_timer_ids = itertools.count(1)
+
+
+class Widget:
+    def __init__(self, master=None, **options):
+        self.master = master
+        self.options = options
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            CALLS[name] += 1
+        return call
+
+    def configure(self, *style, **options):
+        CALLS["configure"] += 1
+        if not style:
+            self.options.update(options)
+
+    config = configure
+
+    def cget(self, key):
+        CALLS["cget"] += 1
+        return self.options.get(key)
+
+    def __getitem__(self, key):
+        return self.cget(key)
+
+    def __setitem__(self, key, value):
+        self.configure(**{key: value})
+
+    def after(self, ms, func=None, *args):
+        CALLS["after"] += 1
+        job = next(_timer_ids)
+        _timers.append((time.monotonic() + ms / 1000, job, func, args))
+        return job
+
+    def after_idle(self, func, *args):
+        return self.after(0, func, *args)
+
+    def after_cancel(self, job):
+        _timers[:] = [t for t in _timers if t[1] != job]
+
+
+class Entry(Widget):
+    def __init__(self, master=None, **options):
+        super().__init__(master, **options)
+        self.text = ""
+
+    def get(self):
+        CALLS["get"] += 1
+        return self.text
+
+    def insert(self, index, text):
+        CALLS["insert"] += 1
+        self.text += text
+
+    def delete(self, first, last=None):
+        CALLS["delete"] += 1
+        self.text = ""
+
+
+class Treeview(Widget):
+    def __init__(self, master=None, **options):
+        super().__init__(master, **options)
+        self.rows = {}
+        self._selection = ()
+
+    def insert(self, parent, index, iid=None, **options):
+        CALLS["insert"] += 1
+        self.rows[iid] = options
+        return iid
+
+    def item(self, iid, **options):
+        CALLS["item"] += 1
+        self.rows[iid].update(options)
+        return self.rows[iid]
+
+    def delete(self, *iids):
+        CALLS["delete"] += 1
+        for iid in iids:
+            del self.rows[iid]
+
+    def get_children(self, item=""):
+        CALLS["get_children"] += 1
+        return tuple(self.rows)
+
+    def selection(self):
+        CALLS["selection"] += 1
+        return self._selection
+
+    def selection_set(self, *items):
+        CALLS["selection_set"] += 1
+        self._selection = tuple(i for i in items if i in self.rows)
+
+
+class Variable:
+    default = None
+
+    def __init__(self, master=None, value=None):
+        self._value = self.default if value is None else value
+        self._traces = []
+
+    def get(self):
+        return self._value
+
+    def set(self, value):
+        self._value = value
+        for callback in self._traces:
+            callback("", "", "w")
+
+    def trace(self, mode, callback):
+        self._traces.append(callback)
+
+    def trace_add(self, mode, callback):
+        self._traces.append(callback)
+
+
+class StringVar(Variable):
+    default = ""
+
+
+class BooleanVar(Variable):
+    default = False
+
+
+def run_pending():
+    """Run the timers that are due, oldest first; return how many ran"""
+    now = time.monotonic()
+    due = sorted((t for t in _timers if t[0] <= now), key=lambda t: t[:2])
+    for timer in due:
+        if timer in _timers:        # an earlier one may have cancelled it
+            _timers.remove(timer)
+            if timer[2] is not None:
+                timer[2](*timer[3])
+    return len(due)
+
+
+def next_due():
+    """When the next timer is due (time.monotonic() seconds), or None"""
+    return min((t[0] for t in _timers), default=None)
+
+
+def make_module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    return module
+
+
+def dialog_module(name):
+    """messagebox and friends: every dialog returns None at once (cancelled / no answer)"""
+    module = make_module(name)
+    module.__getattr__ = lambda attr: (lambda *args, **kwargs: None)
+    return module
+
+
+def install():
+    """Put the stub modules in sys.modules in place of tkinter; return the stub tkinter"""
+    widget = {name: type(name, (Widget,), {}) for name in [
+        "Tk", "Toplevel", "Canvas", "Text", "Button", "Checkbutton", "Combobox", "Frame", "Label",
+        "LabelFrame", "Progressbar", "Scrollbar", "Style"]}
+    ttk = make_module("tkinter.ttk", Entry=Entry, Treeview=Treeview, **widget)
+    tkinter = make_module("tkinter", ttk=ttk, StringVar=StringVar, BooleanVar=BooleanVar,
+                          TclError=RuntimeError, **widget, **{c: c.lower() for c in CONSTANTS})
+    modules = {"tkinter": tkinter, "tkinter.ttk": ttk}
+    for name in ("messagebox", "filedialog", "simpledialog"):
+        modules["tkinter." + name] = dialog_module("tkinter." + name)
+        setattr(tkinter, name, modules["tkinter." + name])
+    sys.modules.update(modules)
+    return tkinter
@@ -0,0 +1,37 @@
+"""SmartInventory Pro core: the inventory model, storage, import/export and operations.
+
+Nothing here imports tkinter, so it runs headless (see `python -m smart_inventory`).
+Public names are loaded on first use, so importing the package is cheap and a
+script only pays for the parts it touches.
+"""
+import importlib
+
+_EXPORTS = {
+    "Item": "model", "History": "model", "NoteTable": "model", "items_from_json": "model",
+    "SearchIndex": "indexes", "FilterIndex": "indexes", "StatsTracker": "indexes",
+    "matches_filter": "indexes",
+    "InventoryStore": "storage", "JsonStore": "storage", "InventoryJournal": "storage",
+    "open_store": "storage", "write_json_snapshot": "storage", "LoadError": "storage",
+    "SqliteStore": "sqlite_store",
+    "export_rows": "export", "ExportCancelled": "export", "render_report_html": "export",
+    "import_movements": "importing", "ImportResult": "importing",
+    "record_movement": "operations", "create_item": "operations", "adjust_quantity": "operations",
+    "update_item": "operations", "delete_item": "operations", "transfer_stock": "operations",
+    "Locations": "locations",
+    "BackupRepository": "backups", "restore_backup": "backups",
+    "Instruments": "instrument", "LatencyHistogram": "instrument",
+    "RemoteStore": "remote", "InventoryService": "server", "serve": "server",
+}
+
+__all__ = sorted(_EXPORTS)
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,160 @@
+"""Demand analytics: consumption rates, days of cover and reorder points.
+
+Every negative quantity change counts as consumption. Each item is looked at
+over the last ANALYTICS_DAYS days, or from its oldest kept movement if that is
+more recent (a new item, or one whose kept history does not reach back that far):
+
+    rate         units consumed per day, averaged over that window
+    recent_rate  the same over the last ANALYTICS_SHORT_DAYS days (short moving average)
+    cover        days the current quantity lasts at `rate` (inf if nothing is consumed)
+    reorder_at   rate * REORDER_LEAD_DAYS plus REORDER_SERVICE_Z standard deviations of
+                 daily consumption over the lead time, rounded up
+
+With numpy installed the whole catalog is computed in one vectorized pass over
+the items' history arrays; otherwise item by item in Python, with the same results.
+"""
+import math
+import time
+from array import array
+from collections import namedtuple
+from itertools import compress, starmap
+
+from .config import ANALYTICS_DAYS, ANALYTICS_SHORT_DAYS, REORDER_LEAD_DAYS, REORDER_SERVICE_Z
+
+DAY = 86400
+
+Demand = namedtuple("Demand", "rate recent_rate cover reorder_at")
+
+def load_numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+def window_start(history, now):
+    start = now - ANALYTICS_DAYS * DAY
+    if len(history):
+        start = max(start, min(history.raw()[0::4]))    # nothing is known from before that
+    return start
+
+def safety_stock(sd):
+    return REORDER_SERVICE_Z * sd * math.sqrt(REORDER_LEAD_DAYS)
+
+def item_demand(d, now):
+    """Demand figures for one item, computed in plain Python"""
+    start = window_start(d.history, now)
+    short_start = max(now - ANALYTICS_SHORT_DAYS * DAY, start)
+    days = max(math.ceil((now - start) / DAY), 1)
+    short_days = max(math.ceil((now - short_start) / DAY), 1)
+    consumed = recent = 0
+    daily = [0] * days
+    raw = d.history.raw()
+    for i in range(0, len(raw), 4):
+        ts, change = raw[i], raw[i + 1]
+        if change >= 0 or ts < start:
+            continue
+        consumed -= change
+        if ts >= short_start:
+            recent -= change
+        daily[min((ts - start) // DAY, days - 1)] -= change
+    if not consumed:
+        return Demand(0.0, 0.0, math.inf, 0)
+    rate = consumed / days
+    sd = math.sqrt(max(sum(x * x for x in daily) / days - rate * rate, 0.0))
+    reorder_at = math.ceil(round(rate * REORDER_LEAD_DAYS + safety_stock(sd), 6))
+    return Demand(rate, recent / short_days, d.quantity / rate, reorder_at)
+
+def catalog_demand(np, items, now):
+    """Demand figures for every item in `items` in one vectorized pass.
+
+    Returns (list of Demand, list of flags telling which items are due for reordering).
+    """
+    n = len(items)
+    counts = np.fromiter((len(d.history) for d in items), np.int64, n)
+    quantity = np.fromiter((d.quantity for d in items), np.float64, n)
+    flat = array("q")
+    for d in items:
+        flat.extend(d.history.raw())
+    entries = np.frombuffer(flat, np.int64).reshape(-1, 4)
+    ts, change = entries[:, 0], entries[:, 1]
+    owner = np.repeat(np.arange(n), counts)
+
+    start = np.full(n, now - ANALYTICS_DAYS * DAY, np.int64)
+    nonempty = counts > 0
+    if nonempty.any():
+        # Oldest kept movement per item; each item's entries are contiguous in `ts`
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        start[nonempty] = np.maximum(start[nonempty], np.minimum.reduceat(ts, offsets[nonempty]))
+    short_start = np.maximum(now - ANALYTICS_SHORT_DAYS * DAY, start)
+    days = np.maximum(np.ceil((now - start) / DAY), 1).astype(np.int64)
+    short_days = np.maximum(np.ceil((now - short_start) / DAY), 1).astype(np.int64)
+
+    used = (change < 0) & (ts >= start[owner])
+    o, t, amount = owner[used], ts[used], -change[used].astype(np.float64)
+    consumed = np.bincount(o, amount, n)
+    is_recent = t >= short_start[o]
+    recent = np.bincount(o[is_recent], amount[is_recent], n)
+    width = int(days.max()) if n else 1
+    day = np.minimum((t - start[o]) // DAY, days[o] - 1)
+    daily = np.bincount(o * width + day, amount, n * width).reshape(n, width)
+
+    rate = consumed / days
+    sd = np.sqrt(np.maximum((daily * daily).sum(axis=1) / days - rate * rate, 0.0))
+    active = consumed > 0
+    reorder_at = np.where(active, np.ceil(np.round(rate * REORDER_LEAD_DAYS + safety_stock(sd), 6)), 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cover = np.where(active, quantity / rate, math.inf)
+    recent_rate = np.where(active, recent / short_days, 0.0)
+    figures = list(starmap(Demand, zip(rate.tolist(), recent_rate.tolist(), cover.tolist(),
+                                       reorder_at.astype(np.int64).tolist())))
+    return figures, (active & (quantity <= reorder_at)).tolist()
+
+class StockAnalytics:
+    """Cached demand figures for the whole inventory.
+
+    compute() recalculates everything (vectorized when numpy is available);
+    update() recalculates a single item after it changed, against the same
+    `now`, so a stream of movements costs one item each. `reorder` holds the
+    items whose quantity is at or below their reorder point.
+    """
+
+    def __init__(self, inventory, now=None, use_numpy=None):
+        self.inventory = inventory
+        self.numpy = load_numpy() if use_numpy in (None, True) else None
+        if use_numpy and self.numpy is None:
+            raise ValueError("Vectorized analytics need the optional numpy package")
+        self.demand = {}
+        self.reorder = set()
+        self.now = None
+        self.compute(now)
+
+    def compute(self, now=None):
+        self.now = int(time.time()) if now is None else int(now)
+        names = list(self.inventory)
+        items = [self.inventory[name] for name in names]
+        if self.numpy is not None and items:
+            figures, due = catalog_demand(self.numpy, items, self.now)
+        else:
+            figures = [item_demand(d, self.now) for d in items]
+            due = [needs_reorder(d, f) for d, f in zip(items, figures)]
+        self.demand = dict(zip(names, figures))
+        self.reorder = set(compress(names, due))
+
+    def update(self, name):
+        d = self.inventory[name]
+        figures = self.demand[name] = item_demand(d, self.now)
+        if needs_reorder(d, figures):
+            self.reorder.add(name)
+        else:
+            self.reorder.discard(name)
+
+    def discard(self, name):
+        self.demand.pop(name, None)
+        self.reorder.discard(name)
+
+    def get(self, name):
+        return self.demand.get(name)
+
+def needs_reorder(d, figures):
+    return figures.rate > 0 and d.quantity <= figures.reorder_at
@@ -0,0 +1,251 @@
+"""Deduplicated, compressed backups of the live inventory.
+
+A backup is a manifest listing chunks. Items are taken in name order and cut
+into chunks wherever an item's name hashes to a boundary (about BACKUP_CHUNK_ITEMS
+items apart), so editing, adding or removing an item changes only the chunk it
+falls in. Each chunk is stored once, zlib-compressed, under the SHA-256 of its
+uncompressed bytes; later backups reuse every chunk that did not change.
+
+    backups/
+        chunks/3f/3fa4….z          chunk content, named by checksum
+        manifests/20260118-093015-482113.json
+
+Manifests carry their own checksum and chunk checksums are checked on every
+read, so corruption is reported instead of restored.
+"""
+import hashlib
+import json
+import os
+import zlib
+from datetime import datetime
+
+from .config import (BACKUP_CHUNK_ITEMS, BACKUP_DIR, BACKUP_KEEP_DAILY, BACKUP_KEEP_LAST,
+                     BACKUP_KEEP_WEEKLY)
+from .model import Item, items_from_json
+
+MANIFEST_FORMAT = 1
+MAX_CHUNK_ITEMS = 4 * BACKUP_CHUNK_ITEMS     # cut anyway if no boundary turns up
+
+class BackupError(ValueError):
+    pass
+
+def chunk_names(inventory):
+    """Yield lists of item names, in name order, cut at content-defined boundaries"""
+    chunk = []
+    for name in sorted(inventory):
+        chunk.append(name)
+        if zlib.crc32(name.encode()) % BACKUP_CHUNK_ITEMS == 0 or len(chunk) >= MAX_CHUNK_ITEMS:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def encode_chunk(inventory, names):
+    return json.dumps([[name, inventory[name].to_dict()] for name in names],
+                      separators=(",", ":"), ensure_ascii=False).encode()
+
+def manifest_checksum(manifest):
+    body = {k: v for k, v in manifest.items() if k != "checksum"}
+    return hashlib.sha256(json.dumps(body, sort_keys=True).encode()).hexdigest()
+
+def keep_set(created, last=BACKUP_KEEP_LAST, daily=BACKUP_KEEP_DAILY, weekly=BACKUP_KEEP_WEEKLY):
+    """Indexes of the backups a retention policy keeps, given creation times newest first.
+
+    The newest `last` backups, the newest backup of each of the last `daily`
+    days that have one, and of each of the last `weekly` ISO weeks.
+    """
+    keep = set(range(min(last, len(created))))
+    days, weeks = {}, {}
+    for i, when in enumerate(created):
+        days.setdefault(when.date(), i)
+        weeks.setdefault(when.isocalendar()[:2], i)
+    keep.update(list(days.values())[:daily])
+    keep.update(list(weeks.values())[:weekly])
+    return keep
+
+class BackupRepository:
+    """Backups kept under `root` as manifests plus shared, content-addressed chunks"""
+
+    def __init__(self, root=BACKUP_DIR):
+        self.root = root
+        self.chunk_dir = os.path.join(root, "chunks")
+        self.manifest_dir = os.path.join(root, "manifests")
+
+    def chunk_path(self, chunk_id):
+        return os.path.join(self.chunk_dir, chunk_id[:2], chunk_id + ".z")
+
+    def manifest_path(self, name):
+        """Path of backup `name`, which may also be given as the path of its manifest"""
+        if os.path.isfile(name):
+            return name
+        return os.path.join(self.manifest_dir, name if name.endswith(".json") else name + ".json")
+
+    @staticmethod
+    def _write(path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    # ── backup ──
+    def create(self, inventory, prune=True):
+        """Back up `inventory` (the live model); returns the manifest with write statistics"""
+        created = datetime.now()
+        chunks = []
+        new_chunks = written = raw = 0
+        for names in chunk_names(inventory):
+            data = encode_chunk(inventory, names)
+            chunk_id = hashlib.sha256(data).hexdigest()
+            path = self.chunk_path(chunk_id)
+            if not os.path.exists(path):
+                packed = zlib.compress(data, 6)
+                self._write(path, packed)
+                new_chunks += 1
+                written += len(packed)
+            raw += len(data)
+            chunks.append({"id": chunk_id, "items": len(names), "size": len(data)})
+
+        manifest = {"format": MANIFEST_FORMAT, "name": created.strftime("%Y%m%d-%H%M%S-%f"),
+                    "created": created.isoformat(timespec="seconds"), "items": len(inventory),
+                    "chunks": chunks}
+        manifest["checksum"] = manifest_checksum(manifest)
+        self._write(self.manifest_path(manifest["name"]), json.dumps(manifest, indent=1).encode())
+        if prune:
+            self.prune()
+        return dict(manifest, new_chunks=new_chunks, bytes_written=written, bytes_raw=raw)
+
+    # ── listing ──
+    def load_manifest(self, name):
+        with open(self.manifest_path(name), "rb") as f:
+            try:
+                manifest = json.load(f)
+            except ValueError as e:
+                raise BackupError(f"{name}: unreadable manifest ({e})")
+        if manifest.get("format") != MANIFEST_FORMAT or manifest.get("checksum") != manifest_checksum(manifest):
+            raise BackupError(f"{name}: manifest checksum does not match")
+        return manifest
+
+    def manifests(self):
+        """Manifest names, newest first"""
+        try:
+            names = [n[:-5] for n in os.listdir(self.manifest_dir) if n.endswith(".json")]
+        except FileNotFoundError:
+            return []
+        return sorted(names, reverse=True)
+
+    def find(self, at):
+        """Name of the newest backup taken at or before datetime `at`"""
+        stamp = at.strftime("%Y%m%d-%H%M%S-%f")
+        for name in self.manifests():
+            if name <= stamp:
+                return name
+        raise BackupError(f"No backup at or before {at:%Y-%m-%d %H:%M:%S}")
+
+    # ── restore ──
+    def read_chunk(self, chunk_id):
+        try:
+            with open(self.chunk_path(chunk_id), "rb") as f:
+                data = zlib.decompress(f.read())
+        except zlib.error as e:
+            raise BackupError(f"chunk {chunk_id[:12]} is damaged ({e})")
+        if hashlib.sha256(data).hexdigest() != chunk_id:
+            raise BackupError(f"chunk {chunk_id[:12]} fails its checksum")
+        return data
+
+    def restore(self, name, current=None):
+        """Rebuild the inventory of backup `name`; returns (items, chunks decoded, chunks reused).
+
+        Chunks that are identical in `current` (the live model) are taken from
+        it instead of being read, decompressed and parsed.
+        """
+        manifest = self.load_manifest(name)
+        live = {}
+        if current:
+            for names in chunk_names(current):
+                live[hashlib.sha256(encode_chunk(current, names)).hexdigest()] = names
+
+        data = {}
+        decoded = reused = 0
+        for chunk in manifest["chunks"]:
+            names = live.get(chunk["id"])
+            if names is not None:
+                for n in names:
+                    data[n] = current[n]
+                reused += 1
+                continue
+            for n, d in json.loads(self.read_chunk(chunk["id"])):
+                data[n] = Item.from_dict(d)
+            decoded += 1
+        if len(data) != manifest["items"]:
+            raise BackupError(f"{name}: expected {manifest['items']} items, rebuilt {len(data)}")
+        return data, decoded, reused
+
+    # ── upkeep ──
+    def verify(self, name=None):
+        """Check manifests and every chunk they use; returns a list of problems"""
+        problems = []
+        checked = set()
+        for manifest_name in [name] if name else self.manifests():
+            try:
+                manifest = self.load_manifest(manifest_name)
+            except (OSError, BackupError) as e:
+                problems.append(str(e))
+                continue
+            for chunk in manifest["chunks"]:
+                if chunk["id"] in checked:
+                    continue
+                checked.add(chunk["id"])
+                try:
+                    self.read_chunk(chunk["id"])
+                except (OSError, BackupError) as e:
+                    problems.append(f"{manifest_name}: {e}")
+        return problems
+
+    def prune(self, last=BACKUP_KEEP_LAST, daily=BACKUP_KEEP_DAILY, weekly=BACKUP_KEEP_WEEKLY):
+        """Apply the retention policy, then delete chunks no remaining backup uses.
+
+        Returns (manifests removed, chunks removed).
+        """
+        names = self.manifests()
+        created = [datetime.strptime(n, "%Y%m%d-%H%M%S-%f") for n in names]
+        keep = keep_set(created, last, daily, weekly)
+        removed = [n for i, n in enumerate(names) if i not in keep]
+        for n in removed:
+            os.remove(self.manifest_path(n))
+
+        used = set()
+        for n in self.manifests():
+            try:
+                used.update(c["id"] for c in self.load_manifest(n)["chunks"])
+            except BackupError:
+                return removed, 0       # never sweep while a manifest is unreadable
+        swept = 0
+        for sub in os.listdir(self.chunk_dir) if os.path.isdir(self.chunk_dir) else ():
+            folder = os.path.join(self.chunk_dir, sub)
+            for file in os.listdir(folder):
+                if file.endswith(".z") and file[:-2] not in used:
+                    os.remove(os.path.join(folder, file))
+                    swept += 1
+        return removed, swept
+
+def restore_backup(store, path, current=None, repository=None):
+    """Replace everything in the store with a backup: a manifest name/path or a plain JSON file.
+
+    Returns the number of items restored.
+    """
+    if repository is None:
+        folder = os.path.dirname(os.path.abspath(path))
+        # A manifest picked from disk belongs to the repository it sits in
+        is_manifest = os.path.isfile(path) and os.path.basename(folder) == "manifests"
+        repository = BackupRepository(os.path.dirname(folder) if is_manifest else BACKUP_DIR)
+    with open(repository.manifest_path(path), "rb") as f:
+        head = json.load(f)
+    if head.get("format") == MANIFEST_FORMAT and "chunks" in head:
+        data, _, _ = repository.restore(path, current)
+    else:
+        data = items_from_json(head)        # a whole-inventory JSON file, like older backups
+    store.replace_all(data)
+    return len(data)
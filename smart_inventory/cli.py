@@ -0,0 +1,427 @@
+"""Command line interface: python -m smart_inventory <command> ...
+
+Each command imports only the modules it needs, so a quick query does not pay
+for the exporters, the importer or sqlite3 when the JSON backend is in use.
+"""
+import argparse
+import os
+import sys
+
+from .config import DEFAULT_LOCATION, LOCATIONS_FILE
+
+FILTERS = ("all", "low", "zero", "recent")
+SORT_KEYS = ("name", "quantity", "low_threshold", "price", "total")
+
+def build_parser(prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="SmartInventory Pro")
+    parser.add_argument("--backend", choices=["json", "sqlite"], default=None,
+                        help="storage backend (default: $INVENTORY_BACKEND or json)")
+    parser.add_argument("--server", default=None, metavar="URL",
+                        help="work on the inventory of a running `serve` instead of local files")
+    parser.add_argument("--location", default=None,
+                        help="work on this location's stock (default: the first one; see `locations`)")
+    commands = parser.add_subparsers(dest="command")
+
+    query = commands.add_parser("query", help="list items matching a filter and search")
+    query.add_argument("--filter", choices=FILTERS, default="all")
+    query.add_argument("--search", default="", help="every word must appear in the item name")
+    query.add_argument("--sort", choices=SORT_KEYS, default="name")
+    query.add_argument("--desc", action="store_true", help="sort descending")
+    query.add_argument("--limit", type=int, default=None)
+    query.add_argument("--format", choices=["table", "csv", "json"], default="table")
+
+    adjust = commands.add_parser("adjust", help="change one item's quantity by a delta")
+    adjust.add_argument("name")
+    adjust.add_argument("change", type=int)
+    adjust.add_argument("--note", default="")
+    adjust.add_argument("--create", action="store_true", help="create the item if it does not exist")
+
+    imp = commands.add_parser("import", help="apply a CSV/JSONL file of stock movements")
+    imp.add_argument("file")
+    imp.add_argument("--create", action="store_true", help="create items that do not exist yet")
+
+    export = commands.add_parser("export", help="write a report (.csv, .ndjson, .gz, .parquet)")
+    export.add_argument("file")
+    export.add_argument("--filter", choices=FILTERS, default="all")
+    export.add_argument("--search", default="")
+
+    history = commands.add_parser("history", help="list recorded stock movements, newest first")
+    history.add_argument("name", nargs="?", help="only this item's movements")
+    history.add_argument("--since", help="from this date/time on, e.g. 2026-01-12 or '2026-01-12 08:00'")
+    history.add_argument("--until", help="before this date/time")
+    history.add_argument("--days", type=float, help="the last DAYS days (instead of --since)")
+    history.add_argument("--offset", type=int, default=0, help="skip this many movements (paging)")
+    history.add_argument("--limit", type=int, default=50, help="at most this many (0: no limit)")
+    history.add_argument("--format", choices=["table", "csv", "json"], default="table")
+
+    analytics = commands.add_parser("analytics", help="consumption rates, days of cover and reorder points")
+    analytics.add_argument("--reorder", action="store_true", help="only items at or below their reorder point")
+    analytics.add_argument("--sort", choices=["cover", "rate", "name"], default="cover")
+    analytics.add_argument("--limit", type=int, default=None)
+    analytics.add_argument("--format", choices=["table", "csv", "json"], default="table")
+
+    stats = commands.add_parser("stats", help="print inventory totals")
+    stats.add_argument("--json", action="store_true")
+
+    backup = commands.add_parser("backup", help="back up the inventory (deduplicated, compressed)")
+    backup.add_argument("--dir", default=None, help="backup directory (default: backups)")
+    action = backup.add_mutually_exclusive_group()
+    action.add_argument("--list", action="store_true", help="list backups instead")
+    action.add_argument("--verify", action="store_true", help="check every backup's checksums instead")
+    action.add_argument("--prune", action="store_true", help="only apply the retention policy")
+
+    restore = commands.add_parser("restore", help="replace the inventory with a backup")
+    which = restore.add_mutually_exclusive_group(required=True)
+    which.add_argument("name", nargs="?", help="backup name (see backup --list) or a JSON file")
+    which.add_argument("--at", help="newest backup taken at or before this time, e.g. '2026-01-18 09:30'")
+    restore.add_argument("--dir", default=None, help="backup directory (default: backups)")
+
+    locations = commands.add_parser("locations", help="list the locations with their totals, or add one")
+    locations.add_argument("--add", metavar="NAME", help="add a new, empty location")
+    locations.add_argument("--refresh", action="store_true",
+                           help="load every location (in parallel) and recount, instead of the saved totals")
+    locations.add_argument("--json", action="store_true")
+
+    transfer = commands.add_parser("transfer", help="move stock from --location to another location")
+    transfer.add_argument("name")
+    transfer.add_argument("quantity", type=int)
+    transfer.add_argument("--to", required=True, metavar="LOCATION")
+    transfer.add_argument("--note", default="")
+
+    stock = commands.add_parser("stock", help="an item's quantity at every location, and the total")
+    stock.add_argument("names", nargs="*", help="these items (default: all)")
+    stock.add_argument("--format", choices=["table", "csv", "json"], default="table")
+
+    serve = commands.add_parser("serve", help="share the inventory through a local HTTP/JSON API")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    return parser
+
+def cmd_query(args, store):
+    store.prepare_queries()
+    rows = store.report_rows(args.filter, args.search, args.sort, args.desc)
+    if args.limit is not None:
+        import itertools
+        rows = itertools.islice(rows, args.limit)
+    out = sys.stdout
+    if args.format == "json":
+        import json
+        for name, qty, low, price, total in rows:
+            out.write(json.dumps({"name": name, "quantity": qty, "low_threshold": low,
+                                  "price": price, "total": round(total, 2)}) + "\n")
+    elif args.format == "csv":
+        import csv
+        writer = csv.writer(out)
+        writer.writerow(["Name", "Qty", "Low Threshold", "Price", "Total"])
+        writer.writerows((name, qty, low, f"{price:.2f}", f"{total:.2f}") for name, qty, low, price, total in rows)
+    else:
+        for name, qty, low, price, total in rows:
+            status = "LOW" if qty <= low else ""
+            out.write(f"{name:<30} {qty:>8} {low:>6} {price:>10.2f} {total:>12.2f} {status}\n")
+    return 0
+
+def cmd_adjust(args, store):
+    from .operations import adjust_quantity, check_range, create_item
+    inventory = store.load(strict=True)
+    name = args.name.strip()        # as create_item() stores it
+    if name not in inventory:
+        if not args.create:
+            print(f"No such item: {name}", file=sys.stderr)
+            return 1
+        check_range(args.change, "Change")      # before anything is created
+        create_item(inventory, store, name)
+    change, new_qty = adjust_quantity(inventory, store, name, args.change, args.note)
+    store.sync()        # journalled; compacting is left to close()
+    remember_totals(args, store, inventory)
+    print(f"{name}: {change:+d} -> {new_qty}")
+    return 0
+
+def cmd_import(args, store):
+    from .importing import import_movements
+    inventory = store.load(strict=True)
+    result = import_movements(args.file, inventory, store, create_missing=args.create)
+    store.sync()
+    remember_totals(args, store, inventory)
+    for line, error in result.errors:
+        print(f"{args.file}:{line}: {error}", file=sys.stderr)
+    print(result.summary())
+    return 1 if result.errors else 0
+
+def cmd_export(args, store):
+    from .export import export_rows
+    store.prepare_queries()
+    total, rows = store.snapshot_rows(args.filter, args.search)
+    count = export_rows(rows, total, args.file)
+    print(f"Exported {count:,} items to {args.file}")
+    return 0
+
+def cmd_history(args, store):
+    import time
+    from datetime import datetime
+    from .model import format_history_date
+    since = until = None
+    if args.days is not None:
+        since = int(time.time() - args.days * 86400)
+    elif args.since:
+        since = int(datetime.fromisoformat(args.since).timestamp())
+    if args.until:
+        until = int(datetime.fromisoformat(args.until).timestamp())
+    rows = store.movements(args.name, since, until, args.offset, args.limit or None)
+    out = sys.stdout
+    if args.format == "json":
+        import json
+        for name, ts, change, new_qty, note in rows:
+            out.write(json.dumps({"name": name, "date": format_history_date(ts), "change": change,
+                                  "new_qty": new_qty, "note": note}) + "\n")
+    elif args.format == "csv":
+        import csv
+        writer = csv.writer(out)
+        writer.writerow(["Date", "Name", "Change", "New Qty", "Note"])
+        writer.writerows((format_history_date(ts), name, change, new_qty, note)
+                         for name, ts, change, new_qty, note in rows)
+    else:
+        for name, ts, change, new_qty, note in rows:
+            out.write(f"{format_history_date(ts)}  {name:<30} {change:>+8} {new_qty:>8}  {note}\n")
+    return 0
+
+def cmd_analytics(args, store):
+    import math
+    from .analytics import StockAnalytics
+    inventory = store.load(strict=True)
+    analytics = StockAnalytics(inventory)
+    names = analytics.reorder if args.reorder else inventory
+    key = {"cover": lambda n: (analytics.demand[n].cover, n),
+           "rate": lambda n: (-analytics.demand[n].rate, n), "name": None}[args.sort]
+    names = sorted(names, key=key)[:args.limit]
+    out = sys.stdout
+    if args.format == "json":
+        import json
+        for name in names:
+            f = analytics.demand[name]
+            out.write(json.dumps({"name": name, "quantity": inventory[name].quantity,
+                                  "rate": round(f.rate, 3), "recent_rate": round(f.recent_rate, 3),
+                                  "cover_days": None if math.isinf(f.cover) else round(f.cover, 1),
+                                  "reorder_at": f.reorder_at}) + "\n")
+    elif args.format == "csv":
+        import csv
+        writer = csv.writer(out)
+        writer.writerow(["Name", "Qty", "Per Day", "Per Day (short)", "Days Left", "Reorder At"])
+        for name in names:
+            f = analytics.demand[name]
+            writer.writerow([name, inventory[name].quantity, f"{f.rate:.3f}", f"{f.recent_rate:.3f}",
+                             "" if math.isinf(f.cover) else f"{f.cover:.1f}", f.reorder_at])
+    else:
+        for name in names:
+            f = analytics.demand[name]
+            cover = "-" if math.isinf(f.cover) else f"{f.cover:.1f}"
+            out.write(f"{name:<30} {inventory[name].quantity:>8} {f.rate:>9.2f}/d {f.recent_rate:>9.2f}/d "
+                      f"{cover:>8} d  reorder at {f.reorder_at}\n")
+    return 0
+
+def cmd_stats(args, store):
+    from .indexes import StatsTracker
+    inventory = store.load(strict=True)
+    stats = StatsTracker(inventory)
+    figures = {"items": len(inventory), "total_value": round(stats.total_value, 2),
+               "low_stock": stats.low_count, "out_of_stock": stats.zero_count}
+    if args.json:
+        import json
+        print(json.dumps(figures))
+    else:
+        print(f"Items: {len(inventory):,}    Total Value: ${stats.total_value:,.2f}    "
+              f"Low Stock Items: {stats.low_count}    Out of Stock: {stats.zero_count}")
+    return 0
+
+def backup_repository(args):
+    from .backups import BackupRepository
+    from .config import BACKUP_DIR
+    return BackupRepository(args.dir or os.path.join(location_dir(args) or "", BACKUP_DIR))
+
+def cmd_backup(args, store):
+    repository = backup_repository(args)
+    if args.list:
+        for name in repository.manifests():
+            manifest = repository.load_manifest(name)
+            print(f"{name}  {manifest['created']}  {manifest['items']:>9,} items  "
+                  f"{len(manifest['chunks']):>6,} chunks")
+        return 0
+    if args.verify:
+        problems = repository.verify()
+        for problem in problems:
+            print(problem, file=sys.stderr)
+        print(f"{len(repository.manifests())} backups checked, {len(problems)} problems")
+        return 1 if problems else 0
+    if args.prune:
+        removed, swept = repository.prune()
+        print(f"Removed {len(removed)} backups and {swept} unused chunks")
+        return 0
+    backup = repository.create(store.load(strict=True))
+    print(f"Backup saved: {backup['name']} ({backup['items']:,} items, {backup['new_chunks']} of "
+          f"{len(backup['chunks'])} chunks new, {backup['bytes_written']:,} bytes written)")
+    return 0
+
+def cmd_restore(args, store):
+    from datetime import datetime
+    from .backups import restore_backup
+    repository = backup_repository(args)
+    name = args.name or repository.find(datetime.fromisoformat(args.at))
+    count = restore_backup(store, name, current=store.load(strict=True), repository=repository)
+    remember_totals(args, store)
+    print(f"Restored {count:,} items from {name}")
+    return 0
+
+def open_locations(args, store):
+    """The location registry, with `store` as the shard of --location"""
+    from .locations import Locations
+    if store.SHARED:
+        raise ValueError("locations need local storage, not --server")
+    locations = Locations(args.backend)
+    locations.open(args.location or DEFAULT_LOCATION, store)
+    return locations
+
+def remember_totals(args, store, inventory=None):
+    """Keep the location's totals in locations.json current after changing its stock"""
+    if store.SHARED or not os.path.exists(LOCATIONS_FILE):
+        return
+    locations = open_locations(args, store)
+    if inventory is None:
+        inventory = store.load(strict=True)
+    locations.attach(args.location or DEFAULT_LOCATION, inventory)
+    locations.save()
+
+def cmd_locations(args, store):
+    locations = open_locations(args, store)
+    if args.add:
+        if not os.path.exists(LOCATIONS_FILE):
+            locations.load(args.location or DEFAULT_LOCATION)     # so the registry starts with its totals
+        folder = locations.add(args.add)
+        locations.close(keep=args.location or DEFAULT_LOCATION)
+        print(f"Added location {args.add!r} in {folder}")
+        return 0
+    if args.refresh:
+        locations.load_all()
+    locations.close(keep=args.location or DEFAULT_LOCATION)
+    rows = {name: locations.totals(name) for name in locations.names()}
+    combined, unknown = locations.combined()
+    if args.json:
+        import json
+        print(json.dumps({"locations": rows, "all": combined}))
+        return 0
+    for name, totals in [*rows.items(), ("All locations", combined)]:
+        if totals is None:
+            print(f"{name:<24} (not counted yet; see --refresh)")
+        else:
+            print(f"{name:<24} {totals['items']:>9,} items  ${totals['value']:>14,.2f}  "
+                  f"{totals['low']:>7,} low  {totals['zero']:>7,} out of stock")
+    if unknown:
+        print(f"Not included: {', '.join(unknown)}", file=sys.stderr)
+    return 0
+
+def cmd_transfer(args, store):
+    from .operations import transfer_stock
+    locations = open_locations(args, store)
+    source = args.location or DEFAULT_LOCATION
+    inventories = locations.load_all([source, args.to])
+    if args.name not in inventories[source]:
+        print(f"No such item at {source}: {args.name}", file=sys.stderr)
+        return 1
+    src_qty, dst_qty = transfer_stock((source, inventories[source], store),
+                                      (args.to, inventories[args.to], locations.open(args.to)),
+                                      args.name, args.quantity, args.note)
+    for name in (source, args.to):
+        locations.changed(name, args.name)
+        locations.open(name).sync()
+    locations.close(keep=source)
+    print(f"{args.name}: {args.quantity} moved, {src_qty} left at {source}, {dst_qty} at {args.to}")
+    return 0
+
+def cmd_stock(args, store):
+    locations = open_locations(args, store)
+    names = locations.names()
+    inventories = locations.load_all(names)
+    locations.close(keep=args.location or DEFAULT_LOCATION)
+    items = args.names or sorted(set().union(*inventories.values()))
+    rows = [(item, [inventories[n][item].quantity if item in inventories[n] else 0 for n in names])
+            for item in items]
+    out = sys.stdout
+    if args.format == "json":
+        import json
+        for item, quantities in rows:
+            out.write(json.dumps({"name": item, "locations": dict(zip(names, quantities)),
+                                  "total": sum(quantities)}) + "\n")
+    elif args.format == "csv":
+        import csv
+        writer = csv.writer(out)
+        writer.writerow(["Name", *names, "Total"])
+        writer.writerows([item, *quantities, sum(quantities)] for item, quantities in rows)
+    else:
+        out.write(f"{'Name':<30}" + "".join(f" {n[:12]:>12}" for n in names) + f" {'Total':>12}\n")
+        for item, quantities in rows:
+            out.write(f"{item:<30}" + "".join(f" {q:>12}" for q in quantities) + f" {sum(quantities):>12}\n")
+    return 0
+
+def cmd_serve(args, store):
+    from .server import serve
+    if store.SHARED:
+        print("serve needs local storage, not --server", file=sys.stderr)
+        return 2
+    serve(store, args.host, args.port)
+    return 0
+
+COMMANDS = {
+    "query": cmd_query, "adjust": cmd_adjust, "import": cmd_import,
+    "export": cmd_export, "history": cmd_history, "analytics": cmd_analytics, "stats": cmd_stats,
+    "backup": cmd_backup, "restore": cmd_restore, "locations": cmd_locations, "transfer": cmd_transfer,
+    "stock": cmd_stock, "serve": cmd_serve,
+}
+
+def location_dir(args):
+    """The folder of --location's files, or None for the first location"""
+    if not args.location or args.location == DEFAULT_LOCATION:
+        return None
+    if args.server:
+        raise ValueError("--location needs local storage, not --server")
+    from .locations import Locations
+    folder = Locations(args.backend).directory(args.location)
+    return None if folder == "." else folder
+
+DATA_ERRORS = (OSError, ValueError, ArithmeticError)
+
+def storage_error(e):
+    """Whether `e` is an error of the input or the data rather than a bug.
+
+    csv and sqlite3 errors are only checked once a command has imported them,
+    so the check costs nothing on the commands that do not.
+    """
+    if isinstance(e, DATA_ERRORS):
+        return True
+    return any(module is not None and isinstance(e, module.Error)
+               for module in (sys.modules.get("csv"), sys.modules.get("sqlite3")))
+
+def run(args):
+    """Run a parsed command against the configured store; unreadable data exits with status 1"""
+    from .storage import open_store
+    try:
+        store = open_store(args.backend, args.server, location_dir(args))
+    except Exception as e:
+        if not storage_error(e):
+            raise
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    try:
+        return COMMANDS[args.command](args, store)
+    except Exception as e:
+        if not storage_error(e):
+            raise
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        store.close()
+
+def main(argv=None):
+    parser = build_parser("smart_inventory")
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return 2
+    return run(args)
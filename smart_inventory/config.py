@@ -0,0 +1,32 @@
+import os
+
+INVENTORY_FILE = 'inventory.json'
+JOURNAL_FILE = 'inventory.journal'
+HISTORY_FILE = 'inventory.history'
+DATABASE_FILE = 'inventory.db'
+BACKUP_DIR = 'backups'
+LOCATIONS_FILE = 'locations.json'   # the stock rooms and each one's totals as last saved
+LOCATIONS_DIR = 'locations'         # every location but the first keeps its files in a folder here
+DEFAULT_LOCATION = 'Main'           # the first location: the files in the working directory
+BACKUP_CHUNK_ITEMS = 256    # average items per backup chunk (the unit of deduplication)
+BACKUP_KEEP_LAST = 10       # retention: always keep this many newest backups,
+BACKUP_KEEP_DAILY = 7       # plus the newest of each of this many days,
+BACKUP_KEEP_WEEKLY = 4      # plus the newest of each of this many weeks
+PRINT_FILE = 'inventory_print.html'
+STORAGE_BACKEND = os.environ.get("INVENTORY_BACKEND", "json")   # "json" or "sqlite"
+JOURNAL_SYNC_MS = 500       # fsync the journal / commit the database at most this often
+JOURNAL_COMPACT_AT = 5000   # fold the journal into inventory.json after this many records
+LOAD_BATCH = 5000           # items handed over by the loader at a time
+EXPORT_CHUNK = 5000         # rows written (and progress reported) at a time when exporting
+PRINT_PAGE_ROWS = 2000      # rows on each page of the printable report
+RECENT_DAYS = 7             # "Recently Updated" shows items touched within this many days
+ANALYTICS_DAYS = 30         # consumption rates are averaged over this many days,
+ANALYTICS_SHORT_DAYS = 7    # and over this many for the short moving average
+REORDER_LEAD_DAYS = 7       # days a reorder takes to arrive
+REORDER_SERVICE_Z = 1.65    # safety stock in standard deviations of daily demand (1.65: ~95%)
+VERIFY_STATS = os.environ.get("INVENTORY_VERIFY_STATS") == "1"   # cross-check running totals
+HISTORY_LIMIT = 20          # movements kept on each item (all of them go to the history log)
+HISTORY_PAGE = 50           # movements per page when browsing the full history
+INSTRUMENT = os.environ.get("INVENTORY_INSTRUMENT") == "1"   # time the window's hot paths (F8/F9)
+METRICS_WINDOW = 1000       # latest timings per operation kept for the latency histograms
+METRICS_FILE = 'inventory_metrics-{stamp}.json'
@@ -0,0 +1,170 @@
+"""Report exports (CSV, NDJSON, Parquet) and the printable HTML report."""
+import csv
+import glob
+import gzip
+import html
+import itertools
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from io import StringIO
+from string import Template
+
+from .config import EXPORT_CHUNK, PRINT_FILE, PRINT_PAGE_ROWS
+
+class ExportCancelled(Exception):
+    pass
+
+@contextmanager
+def open_export(path, fmt, compress):
+    """Yield a function that writes a list of report rows to `path` in format `fmt`"""
+    if fmt == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Parquet export needs the optional pyarrow package")
+        schema = pa.schema([("name", pa.string()), ("quantity", pa.int64()), ("low_threshold", pa.int64()),
+                            ("price", pa.float64()), ("total", pa.float64())])
+        writer = pq.ParquetWriter(path, schema)
+
+        def write(chunk):
+            # One row group per chunk
+            columns = [pa.array(column, type=field.type) for column, field in zip(zip(*chunk), schema)]
+            writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+        try:
+            yield write
+        finally:
+            writer.close()
+        return
+
+    if compress:
+        f = gzip.open(path, 'wt', newline='', encoding='utf-8', compresslevel=6)
+    else:
+        f = open(path, 'w', newline='', encoding='utf-8', buffering=1 << 20)
+    with f:
+        if fmt == "ndjson":
+            def write(chunk):
+                f.write("".join(
+                    json.dumps({"name": name, "quantity": qty, "low_threshold": low,
+                                "price": price, "total": round(total, 2)}) + "\n"
+                    for name, qty, low, price, total in chunk))
+        else:
+            writer = csv.writer(f)
+            writer.writerow(["Name", "Qty", "Low Threshold", "Price", "Total"])
+
+            def write(chunk):
+                writer.writerows((name, qty, low, f"{price:.2f}", f"{total:.2f}")
+                                 for name, qty, low, price, total in chunk)
+        yield write
+
+def export_rows(rows, total, path, progress=None, cancel=None):
+    """Write report rows to `path`, choosing the format from its extension.
+
+    .csv or .ndjson/.jsonl, each optionally followed by .gz, or .parquet (needs
+    pyarrow). Rows go out EXPORT_CHUNK at a time into a temporary file that
+    replaces `path` only once complete. `progress(done, total)` is called after
+    each chunk and the `cancel` event is checked between chunks, raising
+    ExportCancelled. Returns the number of rows written.
+    """
+    lower = path.lower()
+    compress = lower.endswith(".gz")
+    base = lower[:-3] if compress else lower
+    fmt = "parquet" if base.endswith(".parquet") else "ndjson" if base.endswith((".ndjson", ".jsonl")) else "csv"
+
+    tmp = path + ".part"
+    done = 0
+    rows = iter(rows)
+    try:
+        with open_export(tmp, fmt, compress) as write:
+            while True:
+                if cancel is not None and cancel.is_set():
+                    raise ExportCancelled()
+                chunk = list(itertools.islice(rows, EXPORT_CHUNK))
+                if not chunk:
+                    break
+                write(chunk)
+                done += len(chunk)
+                if progress:
+                    progress(done, total)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return done
+
+PRINT_PAGE = Template("""<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>$title</title>
+<style>
+    body { font-family: Arial, sans-serif; margin: 40px; }
+    table { width: 100%; border-collapse: collapse; }
+    th, td { border: 1px solid #ddd; padding: 8px; text-align: left; }
+    th { background-color: #f2f2f2; }
+    h1 { text-align: center; }
+    .low { color: #c0392b; font-weight: bold; }
+    nav { margin: 16px 0; }
+    @media print { nav { display: none; } }
+</style>
+</head>
+<body>
+<h1>$title</h1>
+<p>Generated on: $generated &middot; $count items &middot; page $page of $pages</p>
+$nav
+<table>
+<tr><th>Item Name</th><th>Qty</th><th>Low @</th><th>Price</th><th>Total Value</th><th>Status</th></tr>
+""")
+PRINT_NAV = Template('<nav>$prev Page $page of $pages $next</nav>\n')
+PRINT_FOOT = Template('</table>\n$nav</body>\n</html>\n')
+# Bound once; str.format is far cheaper per row than Template.substitute
+PRINT_ROW = '<tr><td>{}</td><td>{}</td><td>{}</td><td>${:.2f}</td><td>${:.2f}</td><td>{}</td></tr>\n'.format
+PRINT_LOW = '<span class="low">LOW</span>'
+
+def print_page_path(path, page):
+    """inventory_print.html, inventory_print_2.html, ..."""
+    if page == 1:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}_{page}{ext}"
+
+def render_report_html(rows, count, path=PRINT_FILE, title="Inventory Report", page_rows=PRINT_PAGE_ROWS):
+    """Write (name, qty, low, price) rows as HTML pages of `page_rows` rows each.
+
+    Pages link to their neighbours. Each page is built in a StringIO and written
+    in one go, so memory stays bounded by a page. Pages left over from a longer
+    report are removed. Returns the list of page paths.
+    """
+    pages = max(1, -(-count // page_rows))
+    generated = datetime.now().strftime("%Y-%m-%d %H:%M")
+    title = html.escape(title)
+    escape = html.escape
+
+    def link(page, label):
+        return f'<a href="{escape(os.path.basename(print_page_path(path, page)))}">{label}</a>'
+
+    rows = iter(rows)
+    paths = []
+    for page in range(1, pages + 1):
+        nav = "" if pages == 1 else PRINT_NAV.substitute(
+            page=page, pages=pages,
+            prev=link(page - 1, "&laquo; Previous") if page > 1 else "",
+            next=link(page + 1, "Next &raquo;") if page < pages else "")
+        buf = StringIO()
+        buf.write(PRINT_PAGE.substitute(title=title, generated=generated, count=f"{count:,}",
+                                        page=page, pages=pages, nav=nav))
+        buf.writelines(PRINT_ROW(escape(name), qty, low, price, qty * price, PRINT_LOW if qty <= low else "")
+                       for name, qty, low, price in itertools.islice(rows, page_rows))
+        buf.write(PRINT_FOOT.substitute(nav=nav))
+        page_path = print_page_path(path, page)
+        with open(page_path, "w", encoding="utf-8") as f:
+            f.write(buf.getvalue())
+        paths.append(page_path)
+
+    root, ext = os.path.splitext(path)
+    for stale in glob.glob(f"{glob.escape(root)}_*{ext}"):
+        suffix = stale[len(root) + 1:len(stale) - len(ext)]
+        if suffix.isdigit() and int(suffix) > pages:
+            os.remove(stale)
+    return paths
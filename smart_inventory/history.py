@@ -0,0 +1,174 @@
+"""The full movement history: an append-only log kept apart from the item records.
+
+Items only carry their last HISTORY_LIMIT movements, which is all the window
+needs. Every movement ever recorded also goes to this log, one JSON line each
+([ts, name, change, new_qty, note]), and is never rewritten, so it stays
+usable as an audit trail for reconciliation.
+"""
+import json
+import os
+from array import array
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+
+from .config import HISTORY_PAGE
+
+class MovementLog:
+    """Append-only movement file with an index by item and by time.
+
+    The index (line offsets ordered by timestamp, overall and per item) is
+    built by reading the file once, on the first query, and kept current by
+    append(); range queries and pages then only read the lines they return.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.dirty = False
+        self.batching = False
+        self._file = None
+        self._reader = None
+        self._times = None      # every timestamp, ascending
+        self._offsets = None    # line offsets in the same order
+        self._by_item = None    # name -> (timestamps, offsets) of that item
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def _open(self):
+        if self._file is None:
+            self._drop_torn_line()
+            self._file = open(self.path, 'ab')
+        return self._file
+
+    def _drop_torn_line(self):
+        """Cut a final line left incomplete by a crash, so appends start on a clean line"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r+b') as f:
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(0, size - 1))
+            if size == 0 or f.read(1) == b"\n":
+                return
+            f.seek(0)
+            good = sum(len(line) for line in f if line.endswith(b"\n"))
+            f.truncate(good)
+
+    def append(self, name, ts, change, new_qty, note=""):
+        f = self._open()
+        offset = f.tell()
+        f.write(json.dumps([int(ts), name, change, new_qty, note], separators=(",", ":"),
+                           ensure_ascii=False).encode() + b"\n")
+        if not self.batching:
+            f.flush()
+        if self._by_item is not None:
+            self._index(name, int(ts), offset)
+        self.dirty = True
+
+    @contextmanager
+    def batch(self):
+        """Buffer appends and write them out together at the end"""
+        self.batching = True
+        try:
+            yield
+        finally:
+            self.batching = False
+            if self._file is not None:
+                self._file.flush()
+
+    def seed(self, entries):
+        """Start the log from `entries` of (name, ts, change, new_qty, note), e.g. when upgrading"""
+        with self.batch():
+            for entry in sorted(entries, key=lambda e: e[1]):
+                self.append(*entry)
+        self.sync()
+
+    def sync(self):
+        if self._file is not None:
+            self._file.flush()
+            if self.dirty:
+                os.fsync(self._file.fileno())
+        self.dirty = False
+
+    def close(self):
+        self.sync()
+        for f in (self._file, self._reader):
+            if f is not None:
+                f.close()
+        self._file = self._reader = None
+
+    # ── index ──
+    @staticmethod
+    def _insert(times, offsets, ts, offset):
+        if times and ts < times[-1]:
+            i = bisect_right(times, ts)     # late arrival: keep time order, after equal times
+            times.insert(i, ts)
+            offsets.insert(i, offset)
+        else:
+            times.append(ts)
+            offsets.append(offset)
+
+    def _index(self, name, ts, offset):
+        self._insert(self._times, self._offsets, ts, offset)
+        item = self._by_item.get(name)
+        if item is None:
+            item = self._by_item[name] = (array("q"), array("q"))
+        self._insert(*item, ts, offset)
+
+    def _build(self):
+        if self._by_item is not None:
+            return
+        self._times, self._offsets, self._by_item = array("q"), array("q"), {}
+        for offset, (ts, name, *_) in self._scan():
+            self._index(name, ts, offset)
+
+    def _scan(self):
+        """Yield (offset, entry) for every complete line, in the order written"""
+        if self._file is not None:
+            self._file.flush()
+        if not os.path.exists(self.path):
+            return
+        offset = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                yield offset, json.loads(line)
+                offset += len(line)
+
+    def _read(self, offset):
+        if self._reader is None:
+            self._reader = open(self.path, 'rb')
+        self._reader.seek(offset)
+        ts, name, change, new_qty, note = json.loads(self._reader.readline())
+        return name, ts, change, new_qty, note
+
+    # ── queries ──
+    def __iter__(self):
+        """Every movement as (name, ts, change, new_qty, note), in the order recorded"""
+        for _, (ts, name, change, new_qty, note) in self._scan():
+            yield name, ts, change, new_qty, note
+
+    def query(self, name=None, since=None, until=None, offset=0, limit=HISTORY_PAGE):
+        """Movements newest first as (name, ts, change, new_qty, note).
+
+        Optionally only those of item `name` and those with since <= ts < until
+        (epoch seconds); `offset` and `limit` page through the result.
+        """
+        self._build()
+        if self._file is not None:
+            self._file.flush()
+        if name is None:
+            times, offsets = self._times, self._offsets
+        else:
+            times, offsets = self._by_item.get(name, ((), ()))
+        lo = 0 if since is None else bisect_left(times, since)
+        hi = (len(times) if until is None else bisect_left(times, until)) - offset
+        start = lo if limit is None else max(lo, hi - limit)
+        return [self._read(offsets[i]) for i in range(hi - 1, start - 1, -1)]
+
+    def count(self, name=None, since=None, until=None):
+        self._build()
+        times = self._times if name is None else self._by_item.get(name, ((),))[0]
+        lo = 0 if since is None else bisect_left(times, since)
+        hi = len(times) if until is None else bisect_left(times, until)
+        return max(0, hi - lo)
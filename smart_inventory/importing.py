@@ -0,0 +1,135 @@
+"""Bulk import of stock movements from CSV or JSONL files."""
+import csv
+import json
+import time
+
+from . import operations
+from .model import INT64_MAX, INT64_MIN
+
+class ImportResult:
+    """Outcome of a bulk movement import"""
+
+    def __init__(self):
+        self.lines = 0
+        self.applied = 0
+        self.created = 0
+        self.errors = []        # (line number, message)
+        self.touched = set()
+        self.seconds = 0.0
+
+    @property
+    def rate(self):
+        return self.lines / self.seconds if self.seconds else 0.0
+
+    def summary(self):
+        return (f"{self.applied:,} of {self.lines:,} movements applied to {len(self.touched):,} items "
+                f"({self.created:,} new) in {self.seconds:.2f}s – {self.rate:,.0f} lines/s, "
+                f"{len(self.errors):,} errors")
+
+def read_movements(path):
+    """Yield (line number, record dict) from a CSV file with a header row or a JSONL file"""
+    if path.lower().endswith((".jsonl", ".ndjson")):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield line_no, e
+                    continue
+                yield line_no, record if isinstance(record, dict) else ValueError("not a JSON object")
+    else:
+        with open(path, 'r', newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, {k.strip().lower(): v for k, v in record.items() if k}
+
+def parse_movement(record):
+    """Return (name, change, quantity, note) from one record; exactly one of change/quantity is set"""
+    name = str(record.get("name") or "").strip()
+    if not name:
+        raise ValueError("missing name")
+
+    def whole(key):
+        value = record.get(key)
+        if value is None or (isinstance(value, str) and not value.strip()):
+            return None
+        number = None
+        if isinstance(value, (int, str)):
+            try:
+                number = int(value)     # exact, so values next to the bounds are not rounded by float
+            except ValueError:
+                pass
+        if number is None:
+            try:
+                number = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"{key} is not a number: {value!r}")
+            if not number.is_integer():
+                raise ValueError(f"{key} must be a whole number: {value!r}")
+        if not INT64_MIN <= number <= INT64_MAX:
+            raise ValueError(f"{key} is out of range: {value!r}")
+        return int(number)
+
+    change, quantity = whole("change"), whole("quantity")
+    if (change is None) == (quantity is None):
+        raise ValueError("give exactly one of change or quantity")
+    if quantity is not None and quantity < 0:
+        raise ValueError("quantity cannot be negative")
+    return name, change, quantity, str(record.get("note") or "").strip()
+
+def import_movements(path, inventory, store, create_missing=False):
+    """Validate every line of `path`, then apply the valid ones to `inventory` and `store` in one batch.
+
+    Quantities never go below zero, as with the ± buttons. Lines that fail
+    validation, or would take a quantity past the 64-bit range, are skipped
+    and reported in the result with their line number. The changes are made
+    on copies of the items, which replace them only once the store has taken
+    the whole batch, so a failing store leaves `inventory` as it was.
+    """
+    result = ImportResult()
+    start = time.perf_counter()
+
+    movements = []      # (name, delta, note), with the quantities worked out up front
+    quantities = {}     # name -> quantity after the movements planned so far
+    for line_no, record in read_movements(path):
+        result.lines += 1
+        try:
+            if isinstance(record, Exception):
+                raise ValueError(f"unreadable line: {record}")
+            name, change, quantity, note = parse_movement(record)
+            current = quantities.get(name)
+            if current is None:
+                if name in inventory:
+                    current = inventory[name].quantity
+                elif create_missing:
+                    current = 0
+                else:
+                    raise ValueError(f"unknown item {name!r}")
+            new_qty = max(0, current + change) if quantity is None else quantity
+            if new_qty > INT64_MAX:
+                raise ValueError(f"quantity of {name!r} would be out of range")
+        except ValueError as e:
+            result.errors.append((line_no, str(e)))
+            continue
+        quantities[name] = new_qty
+        movements.append((name, new_qty - current, note))
+
+    staged = {}
+    with store.batch():
+        for name, delta, note in movements:
+            if name not in staged:
+                if name in inventory:
+                    staged[name] = inventory[name].copy()
+                else:
+                    operations.create_item(staged, store, name)
+                    result.created += 1
+            operations.adjust_quantity(staged, store, name, delta, note or "Bulk import")
+            result.applied += 1
+    inventory.update(staged)
+    result.touched.update(staged)
+    store.sync()
+
+    result.seconds = time.perf_counter() - start
+    return result
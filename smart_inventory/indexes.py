@@ -0,0 +1,300 @@
+"""In-memory indexes kept alongside the inventory: search, filters and running stats."""
+import math
+from bisect import bisect_left
+from datetime import datetime
+
+from .config import RECENT_DAYS
+
+class SearchIndex:
+    """Lowercased item names plus a trigram index, kept up to date as items come and go.
+
+    A query is split on whitespace and every token must appear somewhere in the
+    name. Tokens of three or more characters are answered from the trigram
+    postings; shorter ones are checked against the candidates that remain. The
+    last result is cached so that typing more characters only narrows it.
+    Postings for an existing catalog are built a chunk at a time by
+    build_some(); until that finishes, queries fall back to a plain scan.
+    """
+
+    GRAM = 3
+
+    def __init__(self, names=()):
+        self.lowered = {name: name.lower() for name in names}
+        self.grams = {}
+        self._pending = list(self.lowered)
+        self.ready = not self._pending
+        self._tokens = None
+        self._hits = None
+
+    def _grams(self, text):
+        return {text[i:i + self.GRAM] for i in range(len(text) - self.GRAM + 1)}
+
+    def build_some(self, count=5000):
+        """Index up to `count` of the names still pending; return True once everything is indexed"""
+        grams, lowered, n = self.grams, self.lowered, self.GRAM
+        batch = self._pending[-count:]
+        del self._pending[-count:]
+        for name in batch:
+            low = lowered.get(name)
+            if low is None:
+                continue
+            for i in range(len(low) - n + 1):
+                gram = low[i:i + n]
+                bucket = grams.get(gram)
+                if bucket is None:
+                    grams[gram] = {name}
+                else:
+                    bucket.add(name)
+        self.ready = not self._pending
+        return self.ready
+
+    def add(self, name):
+        if name in self.lowered:
+            return
+        low = name.lower()
+        self.lowered[name] = low
+        for gram in self._grams(low):
+            self.grams.setdefault(gram, set()).add(name)
+        if self._tokens and all(t in low for t in self._tokens):
+            self._hits.add(name)
+
+    def discard(self, name):
+        low = self.lowered.pop(name, None)
+        if low is None:
+            return
+        for gram in self._grams(low):
+            bucket = self.grams.get(gram)
+            if bucket is None:
+                continue
+            bucket.discard(name)
+            if not bucket:
+                del self.grams[gram]
+        if self._hits is not None:
+            self._hits.discard(name)
+
+    def search(self, query):
+        """Return the set of names matching `query`, or None when the query is empty"""
+        tokens = tuple(sorted(set(query.lower().split()), key=len, reverse=True))
+        if not tokens:
+            return None
+        if tokens == self._tokens:
+            return self._hits
+
+        if self._tokens and len(self._hits) * 4 < len(self.lowered) \
+                and all(any(old in t for t in tokens) for old in self._tokens):
+            # Every old token is contained in a new one, so the new hits are a subset
+            candidates = self._hits
+        else:
+            candidates = None
+            for token in tokens if self.ready else ():
+                if len(token) < self.GRAM:
+                    break
+                buckets = sorted((self.grams.get(g, ()) for g in self._grams(token)), key=len)
+                candidates = set(buckets[0]) if candidates is None else candidates & buckets[0]
+                for bucket in buckets[1:]:
+                    if not candidates:
+                        break
+                    candidates &= bucket
+                if not candidates:
+                    break
+
+        lowered = self.lowered
+        if candidates is None:
+            hits = {name for name, low in lowered.items() if tokens[0] in low}
+            rest = tokens[1:]
+        else:
+            hits, rest = candidates, tokens
+        for token in rest:
+            hits = {name for name in hits if token in lowered[name]}
+        self._tokens, self._hits = tokens, hits
+        return hits
+
+class FilterIndex:
+    """Live membership for the Low Stock / Out of Stock / Recently Updated filters.
+
+    Membership is updated whenever an item changes, so switching filters costs
+    the size of the result rather than a pass over the catalog. Last-update
+    times are kept as epoch seconds, parsed once at load, in a dict ordered
+    oldest to newest so the recent filter can stop at the first stale entry.
+    """
+
+    def __init__(self, inventory=None):
+        self.low = set()
+        self.zero = set()
+        self.last_update = {}
+        stamps = []
+        for name, d in (inventory or {}).items():
+            self.update(name, d)
+            ts = d.history.last_ts()
+            if ts is not None:
+                stamps.append((ts, name))
+        for ts, name in sorted(stamps):
+            self.last_update[name] = ts
+
+    def update(self, name, d):
+        qty = d.quantity
+        if qty <= d.low_threshold:
+            self.low.add(name)
+        else:
+            self.low.discard(name)
+        if qty == 0:
+            self.zero.add(name)
+        else:
+            self.zero.discard(name)
+
+    def touch(self, name, ts):
+        """Record the time of the item's last movement, keeping last_update in time order"""
+        last_update = self.last_update
+        if last_update.get(name) == ts:
+            return      # no new movement (a price or threshold edit, say)
+        last_update.pop(name, None)
+        if not last_update or ts >= last_update[next(reversed(last_update))]:
+            last_update[name] = ts
+        else:
+            # Older than the newest entry: recent() stops at the first stale one, so re-sort
+            last_update[name] = ts
+            self.last_update = dict(sorted(last_update.items(), key=lambda entry: entry[1]))
+
+    def discard(self, name):
+        self.low.discard(name)
+        self.zero.discard(name)
+        self.last_update.pop(name, None)
+
+    def recent(self, now=None):
+        # Same cut-off as before: anything less than RECENT_DAYS + 1 whole days old
+        cutoff = (now or datetime.now()).timestamp() - (RECENT_DAYS + 1) * 86400
+        names = set()
+        for name in reversed(self.last_update):
+            if self.last_update[name] <= cutoff:
+                break
+            names.add(name)
+        return names
+
+    def members(self, mode):
+        """Return the names passing filter `mode`, or None when it lets everything through"""
+        if mode == "low":
+            return self.low
+        if mode == "zero":
+            return self.zero
+        if mode == "recent":
+            return self.recent()
+        return None
+
+class SortIndex:
+    """Item names kept in order of one column, repositioned by bisect as items change.
+
+    Entries are (value, name) pairs, so ties fall back to name order and every
+    entry is unique; `values` caches each item's current sort value. Descending
+    order is the same list read backwards, so flipping direction never sorts.
+    """
+
+    def __init__(self, key, names=()):
+        self.key = key          # name -> sort value
+        self.values = {name: key(name) for name in names}
+        self.entries = sorted((value, name) for name, value in self.values.items())
+        self.names = [name for _, name in self.entries]
+
+    def update(self, name):
+        value = self.key(name)
+        old = self.values.get(name)
+        if old is not None:
+            if old == value:
+                return
+            self._remove(old, name)
+        self.values[name] = value
+        i = bisect_left(self.entries, (value, name))
+        self.entries.insert(i, (value, name))
+        self.names.insert(i, name)
+
+    def _remove(self, value, name):
+        i = bisect_left(self.entries, (value, name))
+        del self.entries[i]
+        del self.names[i]
+
+    def discard(self, name):
+        if name in self.values:
+            self._remove(self.values.pop(name), name)
+
+    def ordered(self, subset=None):
+        """A new list of the names in `subset` (all names if None), in order"""
+        if subset is None:
+            return list(self.names)
+        if len(subset) * 8 < len(self.names):
+            values = self.values
+            return sorted(subset, key=lambda name: (values[name], name))
+        return [name for name in self.names if name in subset]
+
+class StatsTracker:
+    """Running totals for the stats bar, adjusted by a delta whenever one item changes.
+
+    The total value is kept with compensated (Neumaier) summation so it does
+    not drift under long runs of edits; verify() recomputes everything from
+    scratch and raises AssertionError if the running figures disagree.
+    """
+
+    def __init__(self, inventory=None):
+        self._items = {}        # name -> (value, status, zero)
+        self._sum = 0.0
+        self._comp = 0.0
+        self.low_count = 0
+        self.zero_count = 0
+        self.status_counts = {"OK": 0, "LOW": 0}
+        for name, d in (inventory or {}).items():
+            self.update(name, d)
+
+    @property
+    def total_value(self):
+        return self._sum + self._comp
+
+    def _add_value(self, x):
+        t = self._sum + x
+        if abs(self._sum) >= abs(x):
+            self._comp += (self._sum - t) + x
+        else:
+            self._comp += (x - t) + self._sum
+        self._sum = t
+
+    def _apply(self, contribution, sign):
+        value, status, zero = contribution
+        self._add_value(sign * value)
+        self.status_counts[status] += sign
+        if status == "LOW":
+            self.low_count += sign
+        if zero:
+            self.zero_count += sign
+
+    def update(self, name, d):
+        qty = d.quantity
+        contribution = (qty * d.price, "LOW" if qty <= d.low_threshold else "OK", qty == 0)
+        old = self._items.get(name)
+        if old == contribution:
+            return
+        if old is not None:
+            self._apply(old, -1)
+        self._apply(contribution, 1)
+        self._items[name] = contribution
+
+    def discard(self, name):
+        old = self._items.pop(name, None)
+        if old is not None:
+            self._apply(old, -1)
+
+    def verify(self, inventory):
+        fresh = StatsTracker(inventory)
+        expected = math.fsum(d.quantity * d.price for d in inventory.values())
+        if not math.isclose(self.total_value, expected, rel_tol=1e-9, abs_tol=1e-6):
+            raise AssertionError(f"running total {self.total_value!r} != recomputed {expected!r}")
+        for attr in ("low_count", "zero_count", "status_counts"):
+            if getattr(self, attr) != getattr(fresh, attr):
+                raise AssertionError(f"{attr}: running {getattr(self, attr)} != recomputed {getattr(fresh, attr)}")
+
+def matches_filter(d, mode, cutoff):
+    qty = d.quantity
+    if mode == "low":
+        return qty <= d.low_threshold
+    if mode == "zero":
+        return qty == 0
+    if mode == "recent":
+        ts = d.history.last_ts()
+        return ts is not None and ts > cutoff
+    return True
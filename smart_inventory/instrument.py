@@ -0,0 +1,215 @@
+"""Opt-in timing of the window's hot paths, for finding out why it stutters.
+
+Instruments wraps chosen methods so each call is timed into a rolling
+latency histogram, counts the Tcl commands the window sends, and groups
+everything done between two idle points into a "frame": the work behind one
+click or keystroke. A cProfile capture can be started and stopped at any
+time, and dump() writes it all to a JSON file that can go with a bug report.
+"""
+import cProfile
+import functools
+import json
+import os
+import platform
+import pstats
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+from datetime import datetime
+
+from .config import METRICS_WINDOW
+
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+PROFILE_TOP = 40        # functions listed in a dump, by cumulative time
+
+class LatencyHistogram:
+    """The last `window` durations of one operation, counted in log-scale buckets"""
+
+    def __init__(self, window=METRICS_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0          # every sample ever, not just the window
+        self.total = 0.0
+
+    @staticmethod
+    def bucket(seconds):
+        return bisect_left(BUCKETS_MS, seconds * 1000)
+
+    def add(self, seconds):
+        if len(self.samples) == self.samples.maxlen:
+            self.buckets[self.bucket(self.samples[0])] -= 1
+        self.samples.append(seconds)
+        self.buckets[self.bucket(seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def percentile(self, p):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    def summary(self):
+        labels = [f"<={b}ms" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+        return {
+            "count": self.count,
+            "mean_ms": 1000 * self.total / self.count if self.count else 0.0,
+            "window": len(self.samples),
+            "p50_ms": 1000 * self.percentile(50),
+            "p95_ms": 1000 * self.percentile(95),
+            "p99_ms": 1000 * self.percentile(99),
+            "max_ms": 1000 * max(self.samples, default=0.0),
+            "buckets": dict(zip(labels, self.buckets)),
+        }
+
+class CountingTk:
+    """Stands in for a Tk root's interpreter and counts the Tcl commands sent through it"""
+
+    ROUND_TRIPS = {"eval", "getvar", "setvar", "globalgetvar", "globalsetvar", "createcommand"}
+
+    def __init__(self, tk, counts):
+        self._tk = tk
+        self._counts = counts
+
+    def call(self, *args):
+        command = args[0] if len(args) == 1 and isinstance(args[0], tuple) else args
+        if len(command) > 1 and str(command[0]).startswith("."):
+            self._counts[str(command[1])] += 1      # widget path: count the widget command
+        elif command:
+            self._counts[str(command[0])] += 1
+        return self._tk.call(*args)
+
+    def __getattr__(self, name):
+        attr = getattr(self._tk, name)
+        if name not in self.ROUND_TRIPS:
+            return attr
+
+        def counted(*args):
+            self._counts[name] += 1
+            return attr(*args)
+        return counted
+
+class Instruments:
+    """Latency histograms, Tcl command counts and frame costs for one window.
+
+    `schedule(callback)` must run the callback once the event loop is idle
+    (root.after_idle); that closes the current frame. `on_frame(frame)` is
+    then called with the frame's summary, e.g. to show it in a status bar.
+    """
+
+    def __init__(self, schedule, window=METRICS_WINDOW):
+        self.schedule = schedule
+        self.window = window
+        self.histograms = {}
+        self.frames = LatencyHistogram(window)
+        self.tk_calls = Counter()
+        self.last_frame = None
+        self.on_frame = None
+        self.profiler = None
+        self.profiling = False
+        self.started = time.time()
+        self._depth = 0
+        self._frame_ops = {}        # operation -> seconds spent in it during the current frame
+        self._frame_time = 0.0      # time in outermost operations during the current frame
+        self._frame_calls = 0       # Tcl commands counted before the frame started
+        self._frame_open = False
+
+    def count_tk(self, root):
+        """Count every Tcl command of widgets created on `root` from now on"""
+        tk = getattr(root, "tk", None)
+        if hasattr(tk, "call"):
+            root.tk = CountingTk(tk, self.tk_calls)
+
+    def attach(self, obj, names):
+        """Time the methods `names` of `obj` (on the instance, so bindings made later see them)"""
+        for name in names:
+            setattr(obj, name, self.timed(name, getattr(obj, name)))
+
+    def timed(self, name, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not self._frame_open:
+                self._frame_open = True
+                self.schedule(self.end_frame)
+                self._frame_calls = self.tk_total()
+            self._depth += 1
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                self._depth -= 1
+                self.record(name, elapsed)
+                self._frame_ops[name] = self._frame_ops.get(name, 0.0) + elapsed
+                if not self._depth:
+                    self._frame_time += elapsed
+        return wrapper
+
+    def record(self, name, seconds):
+        """Add a duration to the histogram of `name` (also for spans that are not timed calls)"""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram(self.window)
+        histogram.add(seconds)
+
+    def tk_total(self):
+        return sum(self.tk_calls.values())
+
+    def end_frame(self):
+        self.last_frame = {
+            "ms": 1000 * self._frame_time,
+            "operations": {name: 1000 * s for name, s in
+                           sorted(self._frame_ops.items(), key=lambda op: -op[1])},
+            "tk_calls": self.tk_total() - self._frame_calls,
+        }
+        self.frames.add(self._frame_time)
+        self._frame_ops, self._frame_time, self._frame_open = {}, 0.0, False
+        if self.on_frame is not None:
+            self.on_frame(self.last_frame)
+
+    # ── profiling ──
+    def start_profile(self):
+        """Start a new cProfile capture of everything the window does"""
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+        self.profiling = True
+
+    def stop_profile(self):
+        if self.profiling:
+            self.profiler.disable()
+            self.profiling = False
+
+    def profile_summary(self, top=PROFILE_TOP):
+        if self.profiler is None:
+            return None
+        rows = []
+        for (file, line, func), (_, calls, own, cumulative, _) in pstats.Stats(self.profiler).stats.items():
+            rows.append({"function": f"{os.path.basename(file)}:{line}({func})", "calls": calls,
+                         "own_s": own, "cumulative_s": cumulative})
+        rows.sort(key=lambda r: -r["cumulative_s"])
+        return rows[:top]
+
+    # ── reporting ──
+    def snapshot(self):
+        return {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "uptime_s": time.time() - self.started,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "operations": {name: h.summary() for name, h in sorted(self.histograms.items())},
+            "frames": self.frames.summary(),
+            "last_frame": self.last_frame,
+            "tk_calls": dict(self.tk_calls.most_common()),
+            "profile": self.profile_summary(),
+        }
+
+    def dump(self, path):
+        """Write the metrics to `path`, and the last profile capture next to it as .prof"""
+        self.stop_profile()
+        data = self.snapshot()
+        if self.profiler is not None:
+            data["profile_file"] = os.path.splitext(path)[0] + ".prof"
+            self.profiler.dump_stats(data["profile_file"])
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=1)
+        return path
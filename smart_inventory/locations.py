@@ -0,0 +1,167 @@
+"""Several stock rooms in one installation: the inventory sharded by location.
+
+The first location (DEFAULT_LOCATION) is the inventory in the working
+directory, as before locations existed. Every other location keeps the same
+files in its own folder under LOCATIONS_DIR, so each shard loads, saves and
+backs up on its own, and only the shards that are needed get loaded.
+
+locations.json lists the locations together with each shard's totals as last
+saved (items, value, low and out-of-stock counts). Figures across all
+locations add those per-shard totals up, taking live ones for shards that are
+loaded; no shard is loaded just to count it.
+"""
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import DEFAULT_LOCATION, LOCATIONS_DIR, LOCATIONS_FILE
+from .indexes import StatsTracker
+from .storage import open_store
+
+TOTALS = ("items", "value", "low", "zero")
+
+class Shard:
+    """One location's store, and once loaded its items and the stats kept over them"""
+
+    def __init__(self, store):
+        self.store = store
+        self.inventory = None
+        self.stats = None
+
+class Locations:
+    """The registry of locations and the shards opened from it"""
+
+    def __init__(self, backend=None, path=LOCATIONS_FILE):
+        self.backend = backend
+        self.path = path
+        self.entries = {DEFAULT_LOCATION: {"dir": "."}}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.entries = {entry.pop("name"): entry for entry in json.load(f)["locations"]}
+        self.shards = {}
+
+    def names(self):
+        return list(self.entries)
+
+    def directory(self, name):
+        entry = self.entries.get(name)
+        if entry is None:
+            raise ValueError(f"No such location: {name!r}")
+        return entry["dir"]
+
+    def add(self, name):
+        """Register a new, empty location; returns its folder"""
+        name = name.strip()
+        if not name:
+            raise ValueError("Location name is empty")
+        if name in self.entries:
+            raise ValueError(f"Location {name!r} already exists")
+        slug = re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-") or "location"
+        folder = os.path.join(LOCATIONS_DIR, slug)
+        suffix = 1
+        while os.path.exists(folder):
+            suffix += 1
+            folder = os.path.join(LOCATIONS_DIR, f"{slug}-{suffix}")
+        os.makedirs(folder)
+        self.entries[name] = {"dir": folder, "totals": dict.fromkeys(TOTALS, 0)}
+        self.save()
+        return folder
+
+    # ── shards ──
+    def open(self, name, store=None):
+        """The store of location `name`, opened on first use (or `store`, if one is already open)"""
+        shard = self.shards.get(name)
+        if shard is None:
+            folder = self.directory(name)
+            if store is None:
+                store = open_store(self.backend, directory=None if folder == "." else folder)
+            shard = self.shards[name] = Shard(store)
+        return shard.store
+
+    def load(self, name):
+        """The items of location `name`, loaded on first use; raises LoadError if they cannot be read"""
+        self.open(name)
+        shard = self.shards[name]
+        if shard.inventory is None:
+            self.attach(name, shard.store.load(strict=True))
+        return shard.inventory
+
+    def load_all(self, names=None):
+        """Load several shards at once, each on its own thread; returns {location: inventory}"""
+        names = self.names() if names is None else list(names)
+        for name in names:
+            self.open(name)
+        with ThreadPoolExecutor(max_workers=max(1, min(len(names), os.cpu_count() or 1))) as pool:
+            return dict(zip(names, pool.map(self.load, names)))
+
+    def loaded(self, name):
+        shard = self.shards.get(name)
+        return shard is not None and shard.inventory is not None
+
+    def attach(self, name, inventory, stats=None):
+        """Take over the loaded items of `name`, and the running stats if the caller keeps them"""
+        shard = self.shards[name]
+        shard.inventory = inventory
+        shard.stats = stats if stats is not None else StatsTracker(inventory)
+
+    def changed(self, name, item):
+        """Catch up the stats of `name` after one of its items changed"""
+        shard = self.shards[name]
+        d = shard.inventory.get(item)
+        if d is None:
+            shard.stats.discard(item)
+        else:
+            shard.stats.update(item, d)
+
+    # ── totals ──
+    def totals(self, name):
+        """The totals of one location: live if it is loaded, else as last saved (None if never)"""
+        shard = self.shards.get(name)
+        if shard is not None and shard.stats is not None:
+            stats = shard.stats
+            return {"items": len(shard.inventory), "value": round(stats.total_value, 2),
+                    "low": stats.low_count, "zero": stats.zero_count, "updated": int(time.time())}
+        return self.entries[name].get("totals")
+
+    def combined(self):
+        """The per-location totals added up; returns (totals, locations whose totals are unknown)"""
+        combined = dict.fromkeys(TOTALS, 0)
+        unknown = []
+        for name in self.entries:
+            totals = self.totals(name)
+            if totals is None:
+                unknown.append(name)
+                continue
+            for key in TOTALS:
+                combined[key] += totals.get(key, 0)
+        combined["value"] = round(combined["value"], 2)
+        return combined, unknown
+
+    def save(self):
+        """Write the registry, with fresh totals for the loaded shards"""
+        for name, shard in self.shards.items():
+            if shard.stats is not None and name in self.entries:
+                self.entries[name]["totals"] = self.totals(name)
+        if len(self.entries) == 1 and not os.path.exists(self.path):
+            return      # a single location needs no registry
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"locations": [{"name": name, **entry} for name, entry in self.entries.items()]},
+                      f, indent=1)
+        os.replace(tmp, self.path)
+
+    def save_loaded(self, skip=None):
+        """Bring the files of every loaded shard but `skip` fully up to date (store.save())"""
+        for name, shard in self.shards.items():
+            if name != skip and shard.inventory is not None:
+                shard.store.save()
+
+    def close(self, keep=None):
+        """Save the registry and close the shards' stores, except that of location `keep`"""
+        self.save()
+        for name, shard in self.shards.items():
+            if name != keep:
+                shard.store.close()
+        self.shards.clear()
@@ -0,0 +1,127 @@
+"""Items and their movement history."""
+from array import array
+from datetime import datetime
+
+from .config import HISTORY_LIMIT
+
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1    # quantities and changes are kept as signed 64-bit ints
+SNAPSHOT_INFO = ""      # key of an inventory.json snapshot's own details; no item has an empty name
+
+class NoteTable:
+    """Interns history notes: each distinct text is stored once and referred to by number"""
+
+    def __init__(self):
+        self.ids = {"": 0}
+        self.texts = [""]
+
+    def id(self, text):
+        i = self.ids.get(text)
+        if i is None:
+            i = self.ids[text] = len(self.texts)
+            self.texts.append(text)
+        return i
+
+NOTES = NoteTable()
+
+class History:
+    """The last HISTORY_LIMIT movements of one item, oldest first.
+
+    Entries live in one array of 64-bit ints, four per entry (epoch seconds,
+    change, new quantity, note id), used as a ring buffer once it is full.
+    """
+
+    __slots__ = ("_data", "_start")
+
+    def __init__(self):
+        self._data = array("q")
+        self._start = 0
+
+    def __len__(self):
+        return len(self._data) // 4
+
+    def append(self, ts, change, new_qty, note=""):
+        row = (int(ts), int(change), int(new_qty), NOTES.id(note))
+        if len(self._data) < HISTORY_LIMIT * 4:
+            self._data.extend(row)
+        else:
+            i = self._start * 4
+            self._data[i:i + 4] = array("q", row)
+            self._start = (self._start + 1) % HISTORY_LIMIT
+
+    def entries(self):
+        """Yield (ts, change, new_qty, note) from oldest to newest"""
+        data, n, texts = self._data, len(self), NOTES.texts
+        for k in range(n):
+            i = (self._start + k) % n * 4
+            yield data[i], data[i + 1], data[i + 2], texts[data[i + 3]]
+
+    def last(self, count):
+        """The newest `count` entries, oldest first"""
+        data, n, texts = self._data, len(self), NOTES.texts
+        rows = []
+        for k in range(max(0, n - count), n):
+            i = (self._start + k) % n * 4
+            rows.append((data[i], data[i + 1], data[i + 2], texts[data[i + 3]]))
+        return rows
+
+    def raw(self):
+        """The backing array: (ts, change, new_qty, note id) per entry, in ring order"""
+        return self._data
+
+    def copy(self):
+        history = History()
+        history._data = array("q", self._data)
+        history._start = self._start
+        return history
+
+    def last_ts(self):
+        n = len(self)
+        return self._data[(self._start + n - 1) % n * 4] if n else None
+
+    def to_list(self):
+        return [{"date": format_history_date(ts), "change": change, "new_qty": new_qty, "note": note}
+                for ts, change, new_qty, note in self.entries()]
+
+    @classmethod
+    def from_list(cls, entries):
+        history = cls()
+        for entry in entries:
+            history.append(parse_history_date(entry["date"]), entry["change"],
+                           entry["new_qty"], entry.get("note", ""))
+        return history
+
+class Item:
+    """One inventory line.
+
+    Converts to and from the inventory.json shape: {"quantity", "price",
+    "low_threshold", "history": [{"date", "change", "new_qty", "note"}]}.
+    """
+
+    __slots__ = ("quantity", "price", "low_threshold", "history")
+
+    def __init__(self, quantity=0, price=0.0, low_threshold=5, history=None):
+        self.quantity = quantity
+        self.price = price
+        self.low_threshold = low_threshold
+        self.history = History() if history is None else history
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["quantity"], d["price"], d.get("low_threshold", 5),
+                   History.from_list(d.get("history", ())))
+
+    def copy(self):
+        return Item(self.quantity, self.price, self.low_threshold, self.history.copy())
+
+    def to_dict(self):
+        return {"quantity": self.quantity, "price": self.price,
+                "low_threshold": self.low_threshold, "history": self.history.to_list()}
+
+def items_from_json(data):
+    return {name: Item.from_dict(d) for name, d in data.items() if name != SNAPSHOT_INFO}
+
+def parse_history_date(text):
+    return int(datetime.fromisoformat(text).timestamp())
+
+def format_history_date(ts):
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
@@ -0,0 +1,88 @@
+"""Changes to the inventory, applied to the in-memory items and the store together."""
+import time
+
+from .model import INT64_MAX, INT64_MIN, Item
+
+def check_range(value, what):
+    """Raise ValueError unless `value` fits the signed 64-bit ints that items and history keep"""
+    if not INT64_MIN <= value <= INT64_MAX:
+        raise ValueError(f"{what} is out of range: {value}")
+
+def record_movement(inventory, store, name, change, new_qty, note="", ts=None):
+    """Append a movement to the item's history and the store; returns its timestamp"""
+    ts = int(time.time()) if ts is None else ts
+    note = note.strip()
+    inventory[name].history.append(ts, change, new_qty, note)
+    store.add_history(name, ts, change, new_qty, note)
+    return ts
+
+def create_item(inventory, store, name, quantity=0, price=0.0, low_threshold=5):
+    """Add a new item with an "Item created" movement; raises KeyError if it exists"""
+    name = name.strip()
+    if not name:
+        raise ValueError("Item name is empty")
+    if name in inventory:
+        raise KeyError(name)
+    check_range(quantity, "Quantity")
+    check_range(low_threshold, "Low threshold")
+    d = inventory[name] = Item(quantity=quantity, price=price, low_threshold=low_threshold)
+    store.put_item(name, d)
+    record_movement(inventory, store, name, quantity, quantity, "Item created")
+    return d
+
+def adjust_quantity(inventory, store, name, delta, note=""):
+    """Change an item's quantity by `delta`, never below zero; returns (change, new_qty)"""
+    d = inventory[name]
+    check_range(delta, "Change")
+    new_qty = max(0, d.quantity + delta)
+    check_range(new_qty, "New quantity")
+    change = new_qty - d.quantity
+    d.quantity = new_qty
+    store.put_item(name, d)
+    record_movement(inventory, store, name, change, new_qty, note)
+    return change, new_qty
+
+def update_item(inventory, store, name, quantity, price, low_threshold, note=""):
+    """Overwrite an item's fields, recording a movement if the quantity changed"""
+    d = inventory[name]
+    change = quantity - d.quantity
+    check_range(quantity, "Quantity")
+    check_range(low_threshold, "Low threshold")
+    check_range(change, "Change")
+    d.quantity = quantity
+    d.price = price
+    d.low_threshold = low_threshold
+    store.put_item(name, d)
+    if change != 0:
+        record_movement(inventory, store, name, change, quantity, note or "Manual update")
+    return change
+
+def delete_item(inventory, store, name):
+    del inventory[name]
+    store.delete_item(name)
+
+def transfer_stock(source, destination, name, quantity, note=""):
+    """Move `quantity` of an item between locations, each given as (location, inventory, store).
+
+    The item is created at the destination, with the source's price and low
+    threshold, if it is not stocked there yet. Returns the new quantities
+    at the source and at the destination.
+    """
+    (src, src_inventory, src_store), (dst, dst_inventory, dst_store) = source, destination
+    if src == dst:
+        raise ValueError("Source and destination are the same location")
+    if quantity <= 0:
+        raise ValueError("Transfer quantity must be positive")
+    d = src_inventory[name]
+    if quantity > d.quantity:
+        raise ValueError(f"Only {d.quantity} of {name} at {src}")
+    if name in dst_inventory:
+        check_range(dst_inventory[name].quantity + quantity, f"Quantity at {dst}")
+    else:
+        create_item(dst_inventory, dst_store, name, price=d.price, low_threshold=d.low_threshold)
+    note = note.strip()
+    _, src_qty = adjust_quantity(src_inventory, src_store, name, -quantity,
+                                 f"Transfer to {dst}" + (f": {note}" if note else ""))
+    _, dst_qty = adjust_quantity(dst_inventory, dst_store, name, quantity,
+                                 f"Transfer from {src}" + (f": {note}" if note else ""))
+    return src_qty, dst_qty
@@ -0,0 +1,206 @@
+"""Use an inventory served by `python -m smart_inventory serve` as a store."""
+import http.client
+import itertools
+import json
+import uuid
+from contextlib import contextmanager
+from urllib.parse import urlencode, urlsplit
+
+from .config import HISTORY_PAGE, LOAD_BATCH
+from .model import Item
+from .storage import InventoryStore
+
+class RemoteStore(InventoryStore):
+    """The inventory of an API server, seen through a local working copy.
+
+    Local changes are queued and sent together as one POST /batch on sync().
+    Quantity changes travel as deltas, so they add up with what other clients
+    do at the same time. Price, threshold and delete carry the version last
+    seen; if another client changed the item first the server keeps its copy,
+    the item is listed in `conflicts`, and the next pull brings the newer
+    version in. pull_changes() sends anything queued and then fetches
+    everything other clients changed since the last pull.
+    """
+
+    SHARED = True
+    LOAD_ERRORS = (OSError, ValueError)
+
+    def __init__(self, url, timeout=10):
+        parts = urlsplit(url if "//" in url else f"http://{url}")
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self.conn = None
+        self.data = {}
+        self.versions = {}      # name -> version the server last reported
+        self.known = {}         # name -> (price, low_threshold) the server last reported
+        self.seq = 0
+        self.pending = []
+        self.touched = set()    # names with a queued op: later ops on them must not carry a version
+        self._created = None    # item whose creation movement the server records itself
+        self._client = uuid.uuid4().hex
+        self._batches = itertools.count(1)
+        self._inflight = None   # (id, ops) of a batch whose response never arrived
+        self.conflicts = []
+
+    def request(self, method, path, body=None, conn=None):
+        """Send one request; returns (status, payload), raising OSError if the server is unreachable"""
+        c = conn or self.conn or http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            c.request(method, self.prefix + path, body=None if body is None else json.dumps(body),
+                      headers={"Content-Type": "application/json"})
+            response = c.getresponse()
+            payload = json.loads(response.read() or b"null")
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            c.close()
+            if conn is None:
+                self.conn = None
+            raise OSError(f"inventory server at {self.host}:{self.port}: {e}") from e
+        if conn is None:
+            self.conn = c
+        if response.status >= 400 and response.status != 409:
+            raise ValueError(payload.get("error") if isinstance(payload, dict) else response.reason)
+        return response.status, payload
+
+    def _remember(self, item):
+        name = item["name"]
+        if item.get("deleted"):
+            self.versions.pop(name, None)
+            self.known.pop(name, None)
+            return name, None
+        self.versions[name] = item["version"]
+        self.known[name] = (item["price"], item["low_threshold"])
+        return name, Item.from_dict(item)
+
+    def _pages(self, since, conn=None, limit=LOAD_BATCH):
+        """Yield (page of items, payload) from /changes until caught up"""
+        while True:
+            _, page = self.request("GET", f"/changes?since={since}&limit={limit}", conn=conn)
+            yield page["items"], page
+            since = page["seq"]
+            if not page["more"]:
+                return
+
+    def iter_load(self, batch_size=LOAD_BATCH):
+        # Runs on the loader thread, so it gets a connection of its own
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            _, stats = self.request("GET", "/stats", conn=conn)
+            total = max(stats["items"], 1)
+            done = 0
+            for items, page in self._pages(0, conn, batch_size):
+                batch = [pair for pair in map(self._remember, items) if pair[1] is not None]
+                done += len(batch)
+                self.seq = page["seq"]
+                yield batch, min(done / total, 1.0)
+        finally:
+            conn.close()
+
+    def finish_load(self, data):
+        self.data = data
+        return data
+
+    def put_item(self, name, d):
+        if name not in self.versions and name not in self.touched:
+            self._queue({"op": "put", "name": name, "quantity": d.quantity, "price": d.price,
+                         "low_threshold": d.low_threshold, "version": 0})
+            self._created = name
+            return
+        if self.known.get(name) == (d.price, d.low_threshold):
+            return      # quantity changes are sent as deltas by add_history
+        self.known[name] = (d.price, d.low_threshold)
+        self._queue({"op": "put", "name": name, "price": d.price, "low_threshold": d.low_threshold})
+
+    def add_history(self, name, ts, change, new_qty, note):
+        if self._created == name:
+            self._created = None    # the server writes its own "Item created" movement
+            return
+        self._queue({"op": "adjust", "name": name, "change": change, "note": note})
+
+    def delete_item(self, name):
+        self._queue({"op": "delete", "name": name})
+
+    def _queue(self, op):
+        name = op["name"]
+        if op.get("version") is None and name not in self.touched and name in self.versions:
+            op["version"] = self.versions[name]
+        if op["op"] == "adjust":
+            op.pop("version", None)     # deltas always apply
+        self.touched.add(name)
+        self._created = None
+        self.pending.append(op)
+
+    @contextmanager
+    def batch(self):
+        yield       # everything is queued until sync() anyway
+
+    def replace_all(self, data):
+        raise ValueError("Restoring a backup is not available while attached to a server")
+
+    def sync(self):
+        if self._inflight is None:
+            if not self.pending:
+                return
+            self._inflight = (f"{self._client}:{next(self._batches)}", self.pending)
+            self.pending = []
+            self.touched = set()
+        batch_id, ops = self._inflight
+        # Resent with the same id after a failure, so the server applies it at most once
+        try:
+            _, payload = self.request("POST", "/batch", {"id": batch_id, "ops": ops})
+        except ValueError:
+            self._inflight = None       # refused by the server; sending it again cannot help
+            raise
+        self._inflight = None
+        for op, result in zip(ops, payload["results"]):
+            if result["status"] == 200:
+                if result.get("deleted"):
+                    self.versions.pop(op["name"], None)
+                else:
+                    self.versions[op["name"]] = result["version"]
+            elif result["status"] == 409:
+                self.conflicts.append(op["name"])
+
+    def pull_changes(self):
+        self.sync()
+        names = set()
+        for items, page in self._pages(self.seq):
+            for item in items:
+                name, d = self._remember(item)
+                if d is None:
+                    self.data.pop(name, None)
+                else:
+                    self.data[name] = d
+                names.add(name)
+            self.seq = page["seq"]
+        return names
+
+    def movements(self, name=None, since=None, until=None, offset=0, limit=HISTORY_PAGE):
+        self.sync()
+        params = {key: value for key, value in (("name", name), ("since", since), ("until", until),
+                                                ("offset", offset), ("limit", limit)) if value is not None}
+        _, payload = self.request("GET", f"/movements?{urlencode(params)}")
+        return [(m["name"], m["ts"], m["change"], m["new_qty"], m["note"]) for m in payload["movements"]]
+
+    def save(self):
+        self.sync()
+
+    def close(self):
+        try:
+            self.sync()
+        finally:
+            if self.conn is not None:
+                self.conn.close()
+
+    def query(self, mode="all", search="", order="name", descending=False):
+        return [row[0] for row in self.report_rows(mode, search, order, descending)]
+
+    def report_rows(self, mode="all", search="", order="name", descending=False):
+        self.sync()
+        params = urlencode({"filter": mode, "search": search, "sort": order, "desc": int(descending)})
+        _, payload = self.request("GET", f"/items?{params}")
+        return iter([(r["name"], r["quantity"], r["low_threshold"], r["price"], r["total"])
+                     for r in payload["items"]])
+
+    def prepare_queries(self):
+        pass    # the server answers queries
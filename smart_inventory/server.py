@@ -0,0 +1,436 @@
+"""Local HTTP API so several clients (scanners, scripts, attached GUIs) share one inventory.
+
+    python -m smart_inventory [--backend sqlite] serve [--host 127.0.0.1] [--port 8765]
+
+JSON over HTTP/1.1 with keep-alive, served by asyncio. Requests are handled on
+the event loop thread and no handler awaits while it changes the model, so
+writes are serialized without locks and a read never sees half an update.
+
+Every change gets the next number of a global sequence, and an item's version
+is the sequence number of its last change. A write that names a "version" is
+applied only if the item is still at that version (409 otherwise); a write
+without one is simply applied in arrival order. Quantity changes are deltas,
+so concurrent scanners never overwrite each other.
+
+    GET    /items?filter=&search=&sort=&desc=&offset=&limit=
+    GET    /items/<name>
+    PUT    /items/<name>          {"quantity"?, "price"?, "low_threshold"?, "note"?, "version"?}
+    POST   /items/<name>/adjust   {"change", "note"?, "version"?}
+    DELETE /items/<name>?version=
+    POST   /batch                 {"ops": [{"op": "adjust" | "put" | "delete", "name", ...}],
+                                   "atomic"?, "id"?}
+    GET    /changes?since=&limit= items changed (or deleted) after sequence number `since`
+    GET    /movements?name=&since=&until=&offset=&limit=
+                                  full movement history, newest first (times in epoch seconds)
+    GET    /stats
+
+A batch runs as one store transaction. With "atomic" every op is checked
+first and nothing is applied unless all of them can be; otherwise each op
+gets its own status. A batch "id" makes retries safe: a repeated id gets the
+first response back instead of being applied twice.
+"""
+import asyncio
+import bisect
+import itertools
+import json
+import math
+import re
+import signal
+from collections import OrderedDict
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from . import operations
+from .config import JOURNAL_SYNC_MS
+from .indexes import StatsTracker
+from .model import INT64_MAX, INT64_MIN
+
+DEFAULT_PORT = 8765
+MAX_BODY = 8 << 20          # largest request body accepted
+CHANGES_LIMIT = 5000        # items returned by one /changes page unless asked for fewer
+MOVEMENTS_LIMIT = 5000      # most movements returned by one /movements page
+REMEMBERED_BATCHES = 1024   # batch ids kept for retries
+
+FILTERS = ("all", "low", "zero", "recent")
+SORT_KEYS = ("name", "quantity", "low_threshold", "price", "total")
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+class ApiError(Exception):
+    def __init__(self, status, message, **details):
+        super().__init__(message)
+        self.status = status
+        self.details = details
+
+def whole(value, key):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) \
+            or not math.isfinite(value) or value != int(value):
+        raise ApiError(400, f"{key} must be a whole number")
+    if not INT64_MIN <= value <= INT64_MAX:
+        raise ApiError(400, f"{key} is out of range")
+    return int(value)
+
+def amount(value, key):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value < 0:
+        raise ApiError(400, f"{key} must be a non-negative number")
+    return float(value)
+
+def parse_op(op):
+    """Check one batch op's shape; returns (kind, name, fields, version)"""
+    if not isinstance(op, dict):
+        raise ApiError(400, "each op must be an object")
+    kind, name = op.get("op"), op.get("name")
+    if not isinstance(name, str) or not name.strip():
+        raise ApiError(400, "op needs a name")
+    version = op.get("version")
+    if version is not None:
+        version = whole(version, "version")
+    if kind == "adjust":
+        fields = {"change": whole(op.get("change"), "change"), "note": str(op.get("note") or "")}
+    elif kind == "put":
+        fields = {"note": str(op.get("note") or "")}
+        if "quantity" in op:
+            fields["quantity"] = whole(op["quantity"], "quantity")
+            if fields["quantity"] < 0:
+                raise ApiError(400, "quantity cannot be negative")
+        if "price" in op:
+            fields["price"] = amount(op["price"], "price")
+        if "low_threshold" in op:
+            fields["low_threshold"] = whole(op["low_threshold"], "low_threshold")
+    elif kind == "delete":
+        fields = {}
+    else:
+        raise ApiError(400, f"unknown op: {kind!r}")
+    return kind, name.strip(), fields, version
+
+class InventoryService:
+    """The shared inventory behind the API; every method runs on the event loop thread"""
+
+    def __init__(self, store):
+        self.store = store
+        self.inventory = store.load(strict=True)
+        self.stats = StatsTracker(self.inventory)
+        self.seq = 0
+        self.latest = {}        # name -> seq of its last change; deleted names stay as tombstones
+        self.log = []           # (seq, name) in order; entries no longer in `latest` are skipped
+        self.batches = OrderedDict()
+        self.dirty = False
+        for name in sorted(self.inventory):
+            self._log(name)
+
+    def _log(self, name):
+        self.seq += 1
+        self.latest[name] = self.seq
+        self.log.append((self.seq, name))
+        if len(self.log) > 2 * len(self.latest) + 1024:
+            self.log = sorted((seq, name) for name, seq in self.latest.items())
+
+    def _changed(self, name):
+        if name in self.inventory:
+            self.stats.update(name, self.inventory[name])
+        else:
+            self.stats.discard(name)
+        self._log(name)
+        self.dirty = True
+
+    def version(self, name):
+        return self.latest[name] if name in self.inventory else 0
+
+    def item_json(self, name):
+        if name not in self.inventory:
+            return {"name": name, "deleted": True, "version": self.latest.get(name, 0)}
+        d = self.inventory[name].to_dict()
+        d["name"] = name
+        d["version"] = self.latest[name]
+        return d
+
+    # ── reads ──
+    def get_item(self, name):
+        if name not in self.inventory:
+            raise ApiError(404, f"No such item: {name}")
+        return self.item_json(name)
+
+    def list_items(self, mode="all", search="", order="name", descending=False, offset=0, limit=None):
+        if mode not in FILTERS or order not in SORT_KEYS:
+            raise ApiError(400, "unknown filter or sort key")
+        rows = self.store.report_rows(mode, search, order, descending)
+        rows = itertools.islice(rows, offset, None if limit is None else offset + limit)
+        return {"items": [{"name": name, "quantity": qty, "low_threshold": low, "price": price,
+                           "total": round(total, 2), "version": self.latest[name]}
+                          for name, qty, low, price, total in rows]}
+
+    def changes(self, since=0, limit=CHANGES_LIMIT):
+        """Items changed after `since`, oldest change first; "seq" is where to continue from"""
+        items = []
+        seq = since
+        start = bisect.bisect_left(self.log, (since + 1,))
+        for seq, name in itertools.islice(self.log, start, None):
+            if self.latest.get(name) != seq:
+                continue
+            items.append(self.item_json(name))
+            if len(items) >= limit:
+                break
+        else:
+            seq = self.seq
+        return {"seq": seq, "more": seq < self.seq, "items": items}
+
+    def movements(self, name=None, since=None, until=None, offset=0, limit=MOVEMENTS_LIMIT):
+        rows = self.store.movements(name, since, until, offset, limit)
+        return {"movements": [{"name": name, "ts": ts, "change": change, "new_qty": new_qty, "note": note}
+                              for name, ts, change, new_qty, note in rows]}
+
+    def stats_json(self):
+        return {"items": len(self.inventory), "total_value": round(self.stats.total_value, 2),
+                "low_stock": self.stats.low_count, "out_of_stock": self.stats.zero_count, "seq": self.seq}
+
+    # ── writes ──
+    def check(self, kind, name, version, exists):
+        if version is not None and version != (self.latest[name] if exists else 0):
+            raise ApiError(409, f"{name} is at version {self.latest.get(name, 0) if exists else 0}, "
+                                f"not {version}", name=name)
+        if kind != "put" and not exists:
+            raise ApiError(404, f"No such item: {name}", name=name)
+
+    @staticmethod
+    def new_quantity(kind, name, fields, quantity):
+        """The item's quantity after the op; raises ApiError(400) if it leaves the 64-bit range"""
+        if kind == "delete":
+            return 0
+        if kind == "put":
+            return fields.get("quantity", quantity)
+        new_qty = max(0, quantity + fields["change"])
+        if new_qty > INT64_MAX:
+            raise ApiError(400, f"{name}: quantity would be out of range", name=name)
+        return new_qty
+
+    def apply(self, kind, name, fields, version):
+        """Apply one parsed op; everything is checked before the inventory, stats or store change"""
+        exists = name in self.inventory
+        self.check(kind, name, version, exists)
+        self.new_quantity(kind, name, fields, self.inventory[name].quantity if exists else 0)
+        if kind == "adjust":
+            change, quantity = operations.adjust_quantity(self.inventory, self.store, name,
+                                                          fields["change"], fields["note"])
+            self._changed(name)
+            return {"name": name, "change": change, "quantity": quantity, "version": self.seq}
+        if kind == "delete":
+            operations.delete_item(self.inventory, self.store, name)
+            self._changed(name)
+            return {"name": name, "deleted": True, "version": self.seq}
+        if name in self.inventory:
+            d = self.inventory[name]
+            operations.update_item(self.inventory, self.store, name,
+                                   fields.get("quantity", d.quantity), fields.get("price", d.price),
+                                   fields.get("low_threshold", d.low_threshold), fields["note"])
+        else:
+            operations.create_item(self.inventory, self.store, name, fields.get("quantity", 0),
+                                   fields.get("price", 0.0), fields.get("low_threshold", 5))
+        self._changed(name)
+        return self.item_json(name)
+
+    def batch(self, ops, atomic=False, batch_id=None):
+        if batch_id is not None and batch_id in self.batches:
+            return self.batches[batch_id]
+        if not isinstance(ops, list):
+            raise ApiError(400, "ops must be a list")
+        parsed = [parse_op(op) for op in ops]
+        if atomic:
+            # Walk the batch against a scratch view of existence, versions and quantities first
+            state = {}
+            seq = self.seq
+            errors = []
+            for i, (kind, name, fields, version) in enumerate(parsed):
+                exists, current, quantity = state.get(name) or (
+                    name in self.inventory, self.version(name),
+                    self.inventory[name].quantity if name in self.inventory else 0)
+                if version is not None and version != current:
+                    errors.append({"index": i, "status": 409, "error": f"{name} is at version {current}"})
+                elif kind != "put" and not exists:
+                    errors.append({"index": i, "status": 404, "error": f"No such item: {name}"})
+                else:
+                    try:
+                        quantity = self.new_quantity(kind, name, fields, quantity)
+                    except ApiError as e:
+                        errors.append({"index": i, "status": e.status, "error": str(e)})
+                seq += 1
+                state[name] = (kind != "delete", seq if kind != "delete" else 0, quantity)
+            if errors:
+                raise ApiError(409, "batch not applied", errors=errors)
+
+        results = []
+        with self.store.batch():
+            for kind, name, fields, version in parsed:
+                try:
+                    result = self.apply(kind, name, fields, version)
+                    result["status"] = 200
+                except ApiError as e:
+                    result = {"name": name, "status": e.status, "error": str(e)}
+                results.append(result)
+        response = {"results": results, "seq": self.seq}
+        if batch_id is not None:
+            self.batches[batch_id] = response
+            if len(self.batches) > REMEMBERED_BATCHES:
+                self.batches.popitem(last=False)
+        return response
+
+    def sync(self):
+        if self.dirty:
+            self.dirty = False
+            self.store.sync()
+
+class ApiServer:
+    """HTTP front end for an InventoryService"""
+
+    ROUTES = [
+        ("GET", re.compile(r"/items"), "get_items"),
+        ("GET", re.compile(r"/items/(?P<name>[^/]+)"), "get_item"),
+        ("PUT", re.compile(r"/items/(?P<name>[^/]+)"), "put_item"),
+        ("DELETE", re.compile(r"/items/(?P<name>[^/]+)"), "delete_item"),
+        ("POST", re.compile(r"/items/(?P<name>[^/]+)/adjust"), "adjust_item"),
+        ("POST", re.compile(r"/batch"), "post_batch"),
+        ("GET", re.compile(r"/changes"), "get_changes"),
+        ("GET", re.compile(r"/movements"), "get_movements"),
+        ("GET", re.compile(r"/stats"), "get_stats"),
+    ]
+
+    def __init__(self, service):
+        self.service = service
+
+    # ── handlers: (query params, parsed body, path groups) -> payload ──
+    def get_items(self, params, body):
+        return self.service.list_items(params.get("filter", "all"), params.get("search", ""),
+                                       params.get("sort", "name"), params.get("desc") in ("1", "true"),
+                                       int(params.get("offset", 0)),
+                                       int(params["limit"]) if "limit" in params else None)
+
+    def get_item(self, params, body, name):
+        return self.service.get_item(name)
+
+    def put_item(self, params, body, name):
+        return self.write("put", name, body)
+
+    def delete_item(self, params, body, name):
+        return self.write("delete", name, {"version": int(params["version"])} if "version" in params else {})
+
+    def adjust_item(self, params, body, name):
+        return self.write("adjust", name, body)
+
+    def write(self, kind, name, body):
+        if not isinstance(body, dict):
+            raise ApiError(400, "expected a JSON object")
+        return self.service.apply(*parse_op(dict(body, op=kind, name=name)))
+
+    def post_batch(self, params, body):
+        if not isinstance(body, dict):
+            raise ApiError(400, "expected a JSON object")
+        return self.service.batch(body.get("ops"), bool(body.get("atomic")), body.get("id"))
+
+    def get_changes(self, params, body):
+        limit = min(int(params.get("limit", CHANGES_LIMIT)), CHANGES_LIMIT)
+        return self.service.changes(int(params.get("since", 0)), max(1, limit))
+
+    def get_movements(self, params, body):
+        limit = min(int(params.get("limit", MOVEMENTS_LIMIT)), MOVEMENTS_LIMIT)
+        since, until = params.get("since"), params.get("until")
+        return self.service.movements(params.get("name"), None if since is None else int(since),
+                                      None if until is None else int(until),
+                                      int(params.get("offset", 0)), max(1, limit))
+
+    def get_stats(self, params, body):
+        return self.service.stats_json()
+
+    def dispatch(self, method, target, raw):
+        url = urlsplit(target)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        allowed = False
+        for route_method, pattern, handler in self.ROUTES:
+            match = pattern.fullmatch(url.path)
+            if match is None:
+                continue
+            allowed = True
+            if route_method != method:
+                continue
+            try:
+                body = json.loads(raw) if raw else None
+                groups = [unquote(g) for g in match.groups()]
+                return 200, getattr(self, handler)(params, body, *groups)
+            except ApiError as e:
+                return e.status, dict(e.details, error=str(e))
+            except ValueError as e:
+                return 400, {"error": str(e)}
+        return (405, {"error": "method not allowed"}) if allowed else (404, {"error": "no such endpoint"})
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                request_line, *lines = head.decode("latin-1").rstrip("\r\n").split("\r\n")
+                try:
+                    method, target, version = request_line.split(" ", 2)
+                    headers = {}
+                    for line in lines:
+                        key, _, value = line.partition(":")
+                        headers[key.strip().lower()] = value.strip()
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    break
+                if length > MAX_BODY:
+                    status, payload = 413, {"error": "request body too large"}
+                    keep_alive = False
+                else:
+                    raw = await reader.readexactly(length) if length else b""
+                    try:
+                        status, payload = self.dispatch(method, target, raw)
+                    except Exception as e:      # keep serving; report the failure to this client
+                        status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+                    keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                data = json.dumps(payload).encode()
+                writer.write(b"HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n%s\r\n"
+                             % (status, REASONS.get(status, "").encode(), len(data),
+                                b"" if keep_alive else b"Connection: close\r\n") + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def sync_loop(self):
+        # Group commit: one fsync / database commit covers everything changed in the interval
+        while True:
+            await asyncio.sleep(JOURNAL_SYNC_MS / 1000)
+            self.service.sync()
+
+    async def serve(self, host="127.0.0.1", port=DEFAULT_PORT, ready=None):
+        server = await asyncio.start_server(self.handle, host, port, limit=64 * 1024)
+        syncer = asyncio.ensure_future(self.sync_loop())
+        loop = asyncio.get_running_loop()
+        stopped = loop.create_future()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, lambda: stopped.done() or stopped.set_result(None))
+            except (NotImplementedError, RuntimeError):
+                pass    # Windows: Ctrl+C still arrives as KeyboardInterrupt
+        if ready is not None:
+            ready(server.sockets[0].getsockname())
+        try:
+            async with server:
+                await stopped
+        finally:
+            syncer.cancel()
+
+def serve(store, host="127.0.0.1", port=DEFAULT_PORT):
+    """Run the API until interrupted, then save and close the store"""
+    service = InventoryService(store)
+
+    def ready(address):
+        print(f"Serving {len(service.inventory):,} items on http://{address[0]}:{address[1]}", flush=True)
+    try:
+        asyncio.run(ApiServer(service).serve(host, port, ready))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        store.save()
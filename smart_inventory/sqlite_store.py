@@ -0,0 +1,219 @@
+"""SQLite storage backend."""
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+
+from .config import (DATABASE_FILE, HISTORY_FILE, HISTORY_LIMIT, HISTORY_PAGE, INVENTORY_FILE, JOURNAL_FILE,
+                     LOAD_BATCH, RECENT_DAYS)
+from .model import Item
+from .storage import InventoryStore, JsonStore, LoadError
+
+def connect(path, **options):
+    """Open `path` with py_lower(), Python's Unicode str.lower(), as SQLite's lower() folds only ASCII"""
+    db = sqlite3.connect(path, **options)
+    db.create_function("py_lower", 1, str.lower, deterministic=True)
+    return db
+
+class SqliteStore(InventoryStore):
+    """Local SQLite database with items and history in separate, indexed tables.
+
+    The history table keeps every movement, also of deleted items; only the
+    newest ones are loaded onto the items.
+
+    Runs in WAL mode; changes accumulate in one transaction that sync()
+    commits, so a burst of edits costs a single commit. Statements are
+    module-level constants, so sqlite3's statement cache prepares each once.
+    """
+
+    LOAD_ERRORS = (OSError, ValueError, sqlite3.Error)
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS items (
+            name TEXT PRIMARY KEY,
+            quantity INTEGER NOT NULL,
+            price REAL NOT NULL,
+            low_threshold INTEGER NOT NULL DEFAULT 5,
+            updated_at REAL
+        );
+        CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            ts REAL NOT NULL,
+            change INTEGER NOT NULL,
+            new_qty INTEGER NOT NULL,
+            note TEXT NOT NULL DEFAULT ''
+        );
+        CREATE INDEX IF NOT EXISTS items_name_nocase ON items(name COLLATE NOCASE);
+        CREATE INDEX IF NOT EXISTS items_stock ON items(quantity - low_threshold);
+        CREATE INDEX IF NOT EXISTS items_quantity ON items(quantity);
+        CREATE INDEX IF NOT EXISTS items_updated ON items(updated_at);
+        CREATE INDEX IF NOT EXISTS history_name_ts ON history(name, ts);
+        CREATE INDEX IF NOT EXISTS history_ts ON history(ts);
+    """
+    UPSERT_ITEM = ("INSERT INTO items (name, quantity, price, low_threshold) VALUES (?, ?, ?, ?) "
+                   "ON CONFLICT(name) DO UPDATE SET quantity = excluded.quantity, "
+                   "price = excluded.price, low_threshold = excluded.low_threshold")
+    INSERT_HISTORY = "INSERT INTO history (name, ts, change, new_qty, note) VALUES (?, ?, ?, ?, ?)"
+    RESTORE_ITEM = "INSERT INTO items (name, quantity, price, low_threshold, updated_at) VALUES (?, ?, ?, ?, ?)"
+    TOUCH_ITEM = "UPDATE items SET updated_at = ? WHERE name = ?"
+    DELETE_ITEM = "DELETE FROM items WHERE name = ?"
+    SELECT_ITEMS = "SELECT name, quantity, price, low_threshold FROM items"
+    # The newest movements of each item, read through history_name_ts: loading costs the same
+    # however long the full history has grown
+    SELECT_RECENT_HISTORY = f"""
+        SELECT h.name, h.ts, h.change, h.new_qty, h.note FROM items AS i JOIN history AS h ON h.id IN (
+            SELECT id FROM history WHERE name = i.name ORDER BY ts DESC, id DESC LIMIT {HISTORY_LIMIT}
+        ) ORDER BY h.name, h.ts, h.id
+    """
+    FILTERS = {
+        "all": "1",
+        "low": "quantity - low_threshold <= 0",
+        "zero": "quantity = 0",
+        "recent": "updated_at > ?",
+    }
+    ORDER_COLUMNS = {
+        "name": "name", "quantity": "quantity", "low_threshold": "low_threshold",
+        "price": "price", "total": "quantity * price",
+    }
+
+    def __init__(self, path=DATABASE_FILE, import_from=INVENTORY_FILE):
+        self.path = path
+        fresh = not os.path.exists(path)
+        self.db = connect(path, cached_statements=256)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(self.SCHEMA)
+        folder = os.path.dirname(import_from or "")
+        journal = os.path.join(folder, JOURNAL_FILE)
+        if fresh and import_from and (os.path.exists(import_from) or os.path.exists(journal)):
+            # First run on SQLite: carry over what the JSON backend had, history included. Changes
+            # may still be only in the journal, before the snapshot was ever written
+            source = JsonStore(import_from, journal, os.path.join(folder, HISTORY_FILE))
+            try:
+                self.replace_all(source.load(strict=True))
+                with self.db:
+                    self.db.executemany(self.INSERT_HISTORY, source.history)
+            except LoadError:
+                # Leave no database behind, or the next start would skip the import and open it empty
+                self.db.close()
+                for suffix in ("", "-wal", "-shm"):
+                    if os.path.exists(path + suffix):
+                        os.remove(path + suffix)
+                raise
+            finally:
+                source.close()
+
+    def iter_load(self, batch_size=LOAD_BATCH):
+        # Own connection, so this can run on the loader thread; WAL lets it read alongside
+        db = sqlite3.connect(self.path)
+        try:
+            total = db.execute("SELECT COUNT(*) FROM items").fetchone()[0] or 1
+            history = db.execute(self.SELECT_RECENT_HISTORY)
+            pending = history.fetchone()
+            items = db.execute(self.SELECT_ITEMS + " ORDER BY name")
+            done = 0
+            while True:
+                rows = items.fetchmany(batch_size)
+                if not rows:
+                    break
+                batch = []
+                for name, qty, price, low in rows:
+                    d = Item(qty, price, low)
+                    # Both cursors are ordered by name, so history merges in one pass
+                    while pending is not None and pending[0] < name:
+                        pending = history.fetchone()
+                    while pending is not None and pending[0] == name:
+                        d.history.append(*pending[1:])
+                        pending = history.fetchone()
+                    batch.append((name, d))
+                done += len(rows)
+                yield batch, done / total
+        finally:
+            db.close()
+
+    def put_item(self, name, d):
+        self.db.execute(self.UPSERT_ITEM, (name, d.quantity, d.price, d.low_threshold))
+
+    def add_history(self, name, ts, change, new_qty, note):
+        self.db.execute(self.INSERT_HISTORY, (name, ts, change, new_qty, note))
+        self.db.execute(self.TOUCH_ITEM, (ts, name))
+
+    def delete_item(self, name):
+        self.db.execute(self.DELETE_ITEM, (name,))
+
+    def movements(self, name=None, since=None, until=None, offset=0, limit=HISTORY_PAGE):
+        where, params = ["1"], []
+        for clause, value in (("name = ?", name), ("ts >= ?", since), ("ts < ?", until)):
+            if value is not None:
+                where.append(clause)
+                params.append(value)
+        rows = self.db.execute("SELECT name, ts, change, new_qty, note FROM history "
+                               f"WHERE {' AND '.join(where)} ORDER BY ts DESC, id DESC LIMIT ? OFFSET ?",
+                               params + [-1 if limit is None else limit, offset])
+        return [(name, int(ts), change, new_qty, note) for name, ts, change, new_qty, note in rows]
+
+    @contextmanager
+    def batch(self):
+        self.db.commit()
+        with self.db:       # one transaction: committed at the end, rolled back on error
+            yield
+
+    def replace_all(self, data):
+        self.check_loaded()
+        with self.db:
+            self.db.execute("DELETE FROM items")
+            self.db.executemany(self.RESTORE_ITEM, (
+                (name, d.quantity, d.price, d.low_threshold, d.history.last_ts()) for name, d in data.items()))
+
+    def sync(self):
+        self.db.commit()
+
+    def save(self):
+        self.check_loaded()
+        self.db.commit()
+        self.db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+    def _where(self, mode, search):
+        where = [self.FILTERS[mode]]
+        params = []
+        if mode == "recent":
+            params.append(datetime.now().timestamp() - (RECENT_DAYS + 1) * 86400)
+        for token in search.lower().split():
+            where.append("instr(py_lower(name), ?) > 0")       # the same matches as the JSON backend
+            params.append(token)
+        return " AND ".join(where), params
+
+    def _order(self, order, descending):
+        return f"ORDER BY {self.ORDER_COLUMNS[order]} {'DESC' if descending else 'ASC'}, name"
+
+    def query(self, mode="all", search="", order="name", descending=False):
+        where, params = self._where(mode, search)
+        sql = f"SELECT name FROM items WHERE {where} {self._order(order, descending)}"
+        return [name for (name,) in self.db.execute(sql, params)]
+
+    def report_rows(self, mode="all", search="", order="name", descending=False):
+        where, params = self._where(mode, search)
+        return self.db.execute("SELECT name, quantity, low_threshold, price, quantity * price "
+                               f"FROM items WHERE {where} {self._order(order, descending)}", params)
+
+    def prepare_queries(self):
+        pass    # queries read the database directly
+
+    def snapshot_rows(self, mode="all", search=""):
+        self.db.commit()    # the reader's own connection only sees committed rows
+        where, params = self._where(mode, search)
+        count = self.db.execute(f"SELECT COUNT(*) FROM items WHERE {where}", params).fetchone()[0]
+
+        def rows():
+            db = connect(self.path)
+            try:
+                yield from db.execute("SELECT name, quantity, low_threshold, price, quantity * price "
+                                      f"FROM items WHERE {where} ORDER BY name", params)
+            finally:
+                db.close()
+        return count, rows()
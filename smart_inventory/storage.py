@@ -0,0 +1,489 @@
+"""Durable storage: the journal, the store interface and the JSON backend."""
+import codecs
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from .config import (DATABASE_FILE, HISTORY_FILE, HISTORY_PAGE, INVENTORY_FILE, JOURNAL_FILE, JOURNAL_COMPACT_AT,
+                     LOAD_BATCH, RECENT_DAYS, STORAGE_BACKEND)
+from .history import MovementLog
+from .indexes import matches_filter
+from .model import SNAPSHOT_INFO, Item, format_history_date, parse_history_date
+
+class InventoryJournal:
+    """Append-only log of item changes written next to the inventory.json snapshot.
+
+    Every mutation is written as one compact JSON line and flushed right away, so
+    a crash of the app loses nothing; fsync is batched by the caller through
+    sync(). compact() folds the log into a fresh snapshot and empties it;
+    compact_in_background() does the same on a worker thread.
+
+    Each fold is numbered. Its number goes into the snapshot and, as a "fold"
+    record, at the end of the log it folds, so replay() skips the records a
+    snapshot already holds even if the log outlived a crash.
+    """
+
+    def __init__(self, path, snapshot_path):
+        self.path = path
+        self.snapshot_path = snapshot_path
+        self.folding_path = path + ".folding"   # the log set aside while a background compaction runs
+        self.records = 0
+        self.generation = 0     # number of the newest fold, in the snapshot or under way
+        self.dirty = False
+        self.batching = False
+        self._file = None
+        self._folder = None
+
+    def append(self, record):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        if not self.batching:
+            self._file.flush()
+        self.records += 1
+        self.dirty = True
+
+    @contextmanager
+    def batch(self):
+        """Buffer appends and write them out together at the end"""
+        self.batching = True
+        try:
+            yield
+        finally:
+            self.batching = False
+            if self._file is not None:
+                self._file.flush()
+
+    def sync(self):
+        if self._file is not None and self.dirty:
+            os.fsync(self._file.fileno())
+        self.dirty = False
+
+    def replay(self, data):
+        """Apply the logged records on top of snapshot `data`, ignoring a torn final line"""
+        self.wait()
+        self.records = 0
+        self.generation = folded = snapshot_generation(self.snapshot_path)
+        if self._replay_file(self.folding_path, data, folded):
+            os.remove(self.folding_path)    # already in the snapshot; only its removal was missed
+        self._replay_file(self.path, data, folded)
+        return data
+
+    def _replay_file(self, path, data, folded):
+        """Apply the records of log `path` that fold `folded` left out; returns whether that was none"""
+        if not os.path.exists(path):
+            return False
+        start = end = 0
+        with open(path, 'rb') as f:
+            # Everything up to the last fold the snapshot has caught up with is in it already
+            for line in f:
+                end += len(line)
+                if line.startswith(b'{"op":"fold"') and line.endswith(b"\n"):
+                    generation = json.loads(line)["gen"]
+                    self.generation = max(self.generation, generation)
+                    if generation <= folded:
+                        start = end
+            f.seek(start)
+            good = start
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                if record["op"] != "fold":
+                    apply_journal_record(data, record)
+                    self.records += 1
+                good += len(line)
+        if good < end:
+            # Drop the partial record so new appends start on a clean line
+            with open(path, 'r+b') as f:
+                f.truncate(good)
+        return start == end
+
+    def _mark_fold(self):
+        """Number a new fold and end the current log with it; returns the number"""
+        self.generation += 1
+        if self._file is not None or os.path.exists(self.path):
+            self.append({"op": "fold", "gen": self.generation})
+            self.records -= 1       # not a change
+            self._file.flush()
+            self.sync()
+        return self.generation
+
+    def compact(self, data):
+        self.wait()
+        write_json_snapshot(data, self.snapshot_path, self._mark_fold())
+        self.reset()
+
+    def folding(self):
+        """Whether a log set aside by compact_in_background() is still waiting to be folded"""
+        return (self._folder is not None and self._folder.is_alive()) or os.path.exists(self.folding_path)
+
+    def compact_in_background(self, data):
+        """Set the log aside and write `data` as the new snapshot on a worker thread.
+
+        `data` must not change any more: pass a copy. New records start a fresh
+        log meanwhile. Until the snapshot is in place replay() still applies
+        the set-aside log, so stopping at any point loses nothing.
+        """
+        generation = self._mark_fold()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        os.replace(self.path, self.folding_path)
+        self.records = 0
+        self._folder = threading.Thread(target=self._fold, args=(data, generation), daemon=True)
+        self._folder.start()
+
+    def _fold(self, data, generation):
+        try:
+            write_json_snapshot(data, self.snapshot_path, generation)
+            os.remove(self.folding_path)
+        except OSError:
+            pass    # the set-aside log stays and is replayed; the next compact() folds it in
+
+    def wait(self):
+        """Wait for a background compaction to finish"""
+        if self._folder is not None:
+            self._folder.join()
+            self._folder = None
+
+    def reset(self):
+        self.wait()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        for path in (self.path, self.folding_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.records = 0
+        self.dirty = False
+
+    def close(self):
+        self.wait()
+        self.sync()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+def apply_journal_record(data, record):
+    op, name = record["op"], record["name"]
+    if op == "put":
+        d = data.get(name)
+        if d is None:
+            d = data[name] = Item()
+        d.quantity = record["quantity"]
+        d.price = record["price"]
+        d.low_threshold = record["low_threshold"]
+    elif op == "hist" and name in data:
+        entry = record["entry"]
+        data[name].history.append(parse_history_date(entry["date"]), entry["change"],
+                                  entry["new_qty"], entry.get("note", ""))
+    elif op == "del":
+        data.pop(name, None)
+
+NUMBER_CHARS = frozenset("+-.0123456789Ee")
+
+def iter_json_object(f, chunk_size=1 << 20):
+    """Yield the (key, value) pairs of the top-level JSON object in binary file `f`.
+
+    The file is read `chunk_size` bytes at a time and each member is decoded as
+    soon as it is complete, so only one chunk of raw text is held at once.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buf, pos, eof = "", 0, False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buf = buf[pos:] + utf8.decode(chunk, final=eof)
+        pos = 0
+
+    def peek():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buf) or eof:
+                return buf[pos] if pos < len(buf) else ""
+            fill()
+
+    def decode():
+        nonlocal pos
+        while True:
+            peek()
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+                # A number cut by the chunk end decodes as its prefix ("12." of "12.5"), so
+                # only trust a value once a character that cannot continue it follows
+                if eof or (end < len(buf) and buf[end] not in NUMBER_CHARS):
+                    pos = end
+                    return value
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            fill()
+
+    def expect(char):
+        nonlocal pos
+        if peek() != char:
+            raise ValueError(f"Expected {char!r} in JSON object")
+        pos += 1
+
+    expect("{")
+    if peek() == "}":
+        return
+    while True:
+        key = decode()
+        expect(":")
+        value = decode()
+        yield key, value
+        if peek() == "}":
+            return
+        expect(",")
+
+def snapshot_generation(path):
+    """The number of the last journal fold in snapshot `path`, or 0 if it records none"""
+    try:
+        with open(path, 'rb') as f:
+            for key, value in iter_json_object(f, chunk_size=4096):
+                return value.get("fold", 0) if key == SNAPSHOT_INFO else 0
+    except (OSError, ValueError):
+        pass    # missing or unreadable: load() reports that
+    return 0
+
+def write_json_snapshot(data, path, generation=None):
+    """Write items `data` to `path` atomically, recording journal fold `generation` if given"""
+    if generation is not None:
+        data = {SNAPSHOT_INFO: {"fold": generation}, **data}     # first, so it is cheap to read back
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, separators=(",", ":"), default=Item.to_dict)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def report_row(name, d):
+    return (name, d.quantity, d.low_threshold, d.price, d.quantity * d.price)
+
+class LoadError(ValueError):
+    """The stored inventory could not be read, so the store will not overwrite it"""
+
+class InventoryStore:
+    """Where the inventory lives on disk.
+
+    The app keeps its working copy in memory and tells the store about every
+    change; the store decides how to make it durable. query() and report_rows()
+    answer filter/search/sort questions without going through the GUI, in
+    whatever way suits the backend.
+    """
+
+    SORT_KEYS = ("name", "quantity", "low_threshold", "price", "total")
+    LOAD_ERRORS = (OSError, ValueError)     # unreadable data: start empty rather than fail
+    SHARED = False      # other clients can change the inventory; see pull_changes()
+    load_error = None   # why the last load failed; while set, the stored items are never overwritten
+
+    def load(self, strict=False):
+        """Return the whole inventory as {name: item}.
+
+        Unreadable data gives an empty inventory and sets load_error, or with
+        `strict` raises LoadError instead.
+        """
+        data = {}
+        try:
+            for batch, _ in self.iter_load():
+                data.update(batch)
+            self.load_error = None
+        except self.LOAD_ERRORS as e:
+            if strict:
+                raise LoadError(f"Could not read the inventory: {e}") from e
+            self.load_error = e
+            data = {}
+        return self.finish_load(data)
+
+    def check_loaded(self):
+        """Raise LoadError if writing now would replace stored items that could not be read"""
+        if self.load_error is not None:
+            raise LoadError(f"The inventory could not be read ({self.load_error}); "
+                            "it is left as it is on disk")
+
+    def iter_load(self, batch_size=LOAD_BATCH):
+        """Yield (list of (name, item), fraction done) while reading the stored items.
+
+        Safe to run on a worker thread: it touches nothing but the files it reads.
+        """
+        raise NotImplementedError
+
+    def finish_load(self, data):
+        """Called on the main thread with everything iter_load produced; returns the inventory"""
+        return data
+
+    def put_item(self, name, d):
+        raise NotImplementedError
+
+    def add_history(self, name, ts, change, new_qty, note):
+        raise NotImplementedError
+
+    def movements(self, name=None, since=None, until=None, offset=0, limit=HISTORY_PAGE):
+        """Recorded movements newest first as (name, ts, change, new_qty, note).
+
+        Covers the full history, including items since deleted; `name` limits it
+        to one item, since <= ts < until (epoch seconds) to a time range.
+        """
+        raise NotImplementedError
+
+    def delete_item(self, name):
+        raise NotImplementedError
+
+    def replace_all(self, data):
+        """Throw away the stored items and store `data` instead; the movement history stays"""
+        raise NotImplementedError
+
+    @contextmanager
+    def batch(self):
+        """Group the changes made inside the block into one write"""
+        yield
+
+    def sync(self):
+        """Make the changes so far durable; called in batches, not per change"""
+
+    def save(self):
+        """Bring the on-disk state fully up to date, e.g. before a backup or on exit"""
+        self.check_loaded()
+        self.sync()
+
+    def close(self):
+        self.sync()
+
+    def query(self, mode="all", search="", order="name", descending=False):
+        """Return names passing filter `mode` whose names contain every token of `search`"""
+        raise NotImplementedError
+
+    def report_rows(self, mode="all", search="", order="name", descending=False):
+        """Yield (name, qty, low, price, total) for the items query() would return, in its order"""
+        raise NotImplementedError
+
+    def prepare_queries(self):
+        """Make query() and report_rows() usable when nothing has called load()"""
+        self.load(strict=True)
+
+    def pull_changes(self):
+        """Apply other clients' changes to the loaded inventory; returns the names affected"""
+        return ()
+
+    def snapshot_rows(self, mode="all", search=""):
+        """Return (count, rows) like report_rows, where rows may be read on another thread"""
+        rows = list(self.report_rows(mode, search))
+        return len(rows), rows
+
+class JsonStore(InventoryStore):
+    """inventory.json snapshot plus the inventory.journal change log and inventory.history"""
+
+    def __init__(self, path=INVENTORY_FILE, journal_path=JOURNAL_FILE, history_path=HISTORY_FILE):
+        self.path = path
+        self.journal = InventoryJournal(journal_path, path)
+        self.history = MovementLog(history_path)
+        self.data = {}
+
+    def iter_load(self, batch_size=LOAD_BATCH):
+        self.journal.wait()     # a background compaction may be replacing the snapshot
+        if not os.path.exists(self.path):
+            return
+        total = os.path.getsize(self.path) or 1
+        batch = []
+        with open(self.path, 'rb') as f:
+            for name, item in iter_json_object(f):
+                if name == SNAPSHOT_INFO:
+                    continue
+                batch.append((name, Item.from_dict(item)))
+                if len(batch) >= batch_size:
+                    yield batch, min(1.0, f.tell() / total)
+                    batch = []
+        if batch:
+            yield batch, 1.0
+
+    def finish_load(self, data):
+        self.journal.replay(data)
+        self.data = data
+        if data and not self.history.exists():
+            # Inventories from before the history log: start it with what the items kept
+            self.history.seed((name, *entry) for name, d in data.items() for entry in d.history.entries())
+        return data
+
+    def put_item(self, name, d):
+        self.journal.append({"op": "put", "name": name, "quantity": d.quantity,
+                             "price": d.price, "low_threshold": d.low_threshold})
+
+    def add_history(self, name, ts, change, new_qty, note):
+        self.journal.append({"op": "hist", "name": name, "entry": {
+            "date": format_history_date(ts), "change": change, "new_qty": new_qty, "note": note}})
+        self.history.append(name, ts, change, new_qty, note)
+
+    def movements(self, name=None, since=None, until=None, offset=0, limit=HISTORY_PAGE):
+        return self.history.query(name, since, until, offset, limit)
+
+    def delete_item(self, name):
+        self.journal.append({"op": "del", "name": name})
+
+    @contextmanager
+    def batch(self):
+        with self.journal.batch(), self.history.batch():
+            yield
+
+    def replace_all(self, data):
+        self.check_loaded()
+        self.journal.compact(data)      # numbered, so the old log is never replayed over `data`
+        self.data = data
+
+    def sync(self):
+        self.journal.sync()
+        self.history.sync()
+        if self.journal.records >= JOURNAL_COMPACT_AT and self.load_error is None and not self.journal.folding():
+            # Serializing and fsyncing the whole catalog would stall the caller (the Tk thread):
+            # copy the items here, since they keep changing, and write them out on a worker
+            self.journal.compact_in_background({name: d.copy() for name, d in self.data.items()})
+
+    def save(self):
+        self.check_loaded()
+        self.journal.compact(self.data)
+        self.history.sync()
+
+    def close(self):
+        self.journal.close()
+        self.history.close()
+
+    def _rows(self, mode, search):
+        tokens = search.lower().split()
+        cutoff = datetime.now().timestamp() - (RECENT_DAYS + 1) * 86400
+        return [report_row(name, d) for name, d in self.data.items()
+                if matches_filter(d, mode, cutoff) and all(t in name.lower() for t in tokens)]
+
+    def query(self, mode="all", search="", order="name", descending=False):
+        return [r[0] for r in self.report_rows(mode, search, order, descending)]
+
+    def report_rows(self, mode="all", search="", order="name", descending=False):
+        rows = sorted(self._rows(mode, search), key=lambda r: r[0])
+        if order != "name" or descending:
+            key = self.SORT_KEYS.index(order)
+            rows.sort(key=lambda r: r[key], reverse=descending)     # stable: ties stay by name
+        return iter(rows)
+
+def open_store(backend=None, server=None, directory=None):
+    """The configured store, over the files in `directory` (default: the working directory)"""
+    if server:
+        from .remote import RemoteStore
+        return RemoteStore(server)
+    backend = backend or STORAGE_BACKEND
+    path = (lambda name: name) if directory is None else (lambda name: os.path.join(directory, name))
+    if backend == "sqlite":
+        from .sqlite_store import SqliteStore     # sqlite3 is only imported when it is used
+        return SqliteStore(path(DATABASE_FILE), import_from=path(INVENTORY_FILE))
+    if backend == "json":
+        return JsonStore(path(INVENTORY_FILE), path(JOURNAL_FILE), path(HISTORY_FILE))
+    raise ValueError(f"Unknown storage backend: {backend!r}")
@@ -0,0 +1,29 @@
+"""Shared fixtures. Every test runs in a scratch directory, so stores start from fresh files.
+
+    python -m pytest tests
+"""
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from smart_inventory.config import INVENTORY_FILE  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def scratch_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def broken_inventory():
+    """An inventory.json cut off partway through its 99 items; returns its bytes"""
+    items = {f"item{i}": {"quantity": i, "price": 1.0, "low_threshold": 5, "history": []} for i in range(99)}
+    data = json.dumps(items)[:-40].encode()
+    with open(INVENTORY_FILE, "wb") as f:
+        f.write(data)
+    return data
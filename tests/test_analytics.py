@@ -0,0 +1,86 @@
+"""Demand figures, and the same figures from the numpy pass as from the Python one."""
+import math
+import random
+
+import pytest
+
+from smart_inventory.analytics import DAY, Demand, StockAnalytics
+from smart_inventory.model import Item
+
+NOW = 1_700_000_000
+
+
+def item(quantity, movements):
+    """An item with movements given as (days ago, change)"""
+    d = Item(quantity=quantity, price=1.0, low_threshold=5)
+    for days_ago, change in movements:
+        d.history.append(NOW - days_ago * DAY, change, quantity, "")
+    return d
+
+
+def random_inventory(seed, count=60):
+    rng = random.Random(seed)
+    inventory = {}
+    for i in range(count):
+        movements = sorted(((rng.uniform(0, 60), rng.choice([-1, 1]) * rng.randint(1, 40))
+                            for _ in range(rng.randint(0, 30))), reverse=True)
+        inventory[f"item {i}"] = item(rng.randint(0, 200), movements)
+    return inventory
+
+
+def assert_same(got, expected):
+    assert got.keys() == expected.keys()
+    for name, figures in expected.items():
+        assert got[name].reorder_at == figures.reorder_at, name
+        for a, b in zip(got[name][:3], figures[:3]):
+            assert a == pytest.approx(b, rel=1e-9), name
+
+
+def test_figures_of_one_item():
+    inventory = {"bolt": item(70, [(10, 100), (5, -20), (1, -10)])}
+    figures = StockAnalytics(inventory, NOW, use_numpy=False).get("bolt")
+    # The window starts at the oldest movement, 10 days back: 30 units over 10 days
+    assert figures.rate == 3.0
+    assert figures.recent_rate == pytest.approx(30 / 7)
+    assert figures.cover == pytest.approx(70 / 3)
+    assert figures.reorder_at == 49      # 21 over the lead time plus 1.65 * sqrt(41) * sqrt(7)
+
+
+def test_items_without_consumption_never_need_reordering():
+    inventory = {"new": item(0, []), "restocked": item(0, [(3, 50)])}
+    analytics = StockAnalytics(inventory, NOW, use_numpy=False)
+    for name in inventory:
+        assert analytics.get(name) == Demand(0.0, 0.0, math.inf, 0)
+    assert analytics.reorder == set()
+
+
+def test_update_matches_a_full_compute():
+    inventory = random_inventory(1)
+    analytics = StockAnalytics(inventory, NOW, use_numpy=False)
+    for name in ("item 3", "item 10", "item 42"):
+        d = inventory[name]
+        d.quantity = 1
+        d.history.append(NOW - DAY, -25, 1, "")
+        analytics.update(name)
+    analytics.discard("item 7")
+    del inventory["item 7"]
+    full = StockAnalytics(inventory, NOW, use_numpy=False)
+    assert_same(analytics.demand, full.demand)
+    assert analytics.reorder == full.reorder
+    assert {"item 3", "item 10", "item 42"} <= analytics.reorder
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_numpy_gives_the_python_figures(seed):
+    pytest.importorskip("numpy")
+    inventory = random_inventory(seed)
+    fast = StockAnalytics(inventory, NOW, use_numpy=True)
+    plain = StockAnalytics(inventory, NOW, use_numpy=False)
+    assert_same(fast.demand, plain.demand)
+    assert fast.reorder == plain.reorder
+
+
+def test_numpy_handles_an_empty_inventory():
+    pytest.importorskip("numpy")
+    analytics = StockAnalytics({}, NOW, use_numpy=True)
+    assert analytics.demand == {} and analytics.reorder == set()
@@ -0,0 +1,112 @@
+"""Chunked backups restore exactly what was backed up, share unchanged chunks and prune safely."""
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from smart_inventory import operations
+from smart_inventory.backups import BackupError, BackupRepository, keep_set, restore_backup
+from smart_inventory.model import Item
+from smart_inventory.storage import JsonStore
+
+
+def catalog(count=3000):
+    inventory = {}
+    for i in range(count):
+        d = inventory[f"item{i:05d}"] = Item(i % 50, round(i * 0.37, 2), i % 7)
+        for k in range(i % 3):
+            d.history.append(1_700_000_000 + i * 60 + k, k + 1, i % 50, f"note {k}" if k else "")
+    return inventory
+
+
+def as_dicts(inventory):
+    return {name: d.to_dict() for name, d in inventory.items()}
+
+
+def test_restore_rebuilds_the_backed_up_items():
+    repository = BackupRepository()
+    inventory = catalog()
+    backup = repository.create(inventory)
+    assert backup["items"] == len(inventory) and backup["new_chunks"] == len(backup["chunks"]) > 1
+
+    data, decoded, reused = repository.restore(backup["name"])
+    assert as_dicts(data) == as_dicts(inventory)
+    assert (decoded, reused) == (len(backup["chunks"]), 0)
+
+    data, decoded, reused = repository.restore(backup["name"], current=inventory)
+    assert as_dicts(data) == as_dicts(inventory)
+    assert (decoded, reused) == (0, len(backup["chunks"]))
+
+
+def test_a_second_backup_writes_only_the_changed_chunk():
+    repository = BackupRepository()
+    inventory = catalog()
+    first = repository.create(inventory)
+    inventory["item01234"].quantity += 1
+    second = repository.create(inventory)
+    assert second["new_chunks"] == 1
+    assert len(set(c["id"] for c in second["chunks"]) - set(c["id"] for c in first["chunks"])) == 1
+    assert as_dicts(repository.restore(first["name"])[0])["item01234"]["quantity"] == 1234 % 50
+
+
+def test_a_damaged_chunk_is_reported_not_restored():
+    repository = BackupRepository()
+    backup = repository.create(catalog(500))
+    path = repository.chunk_path(backup["chunks"][0]["id"])
+    with open(path, "r+b") as f:
+        f.seek(10)
+        f.write(b"\0\0\0\0")
+    assert len(repository.verify()) == 1
+    with pytest.raises(BackupError):
+        repository.restore(backup["name"])
+
+
+def test_keep_set_keeps_the_newest_and_one_per_day_and_week():
+    start = datetime(2026, 3, 2, 18, 0)        # a Monday
+    created = [start - timedelta(hours=6 * i) for i in range(60)]       # newest first, four a day
+    keep = keep_set(created, last=3, daily=2, weekly=3)
+    # The 3 newest; the newest of Mar 2 and of Mar 1; of this ISO week, the last (from Sun Mar 1)
+    # and the one before (from Sun Feb 22, 18:00, which is 32 backups back)
+    assert keep == {0, 1, 2, 4, 32}
+
+
+def test_prune_removes_old_backups_and_the_chunks_only_they_used():
+    repository = BackupRepository()
+    old = repository.create(catalog(800), prune=False)
+    inventory = catalog(800)
+    for name in list(inventory)[:300]:
+        inventory[name].price += 1
+    new = repository.create(inventory, prune=False)
+    only_old = {c["id"] for c in old["chunks"]} - {c["id"] for c in new["chunks"]}
+    assert only_old
+
+    removed, swept = repository.prune(last=1, daily=0, weekly=0)
+    assert (removed, swept) == ([old["name"]], len(only_old))
+    assert repository.manifests() == [new["name"]]
+    assert repository.verify() == []
+    assert as_dicts(repository.restore(new["name"])[0]) == as_dicts(inventory)
+
+
+def test_prune_sweeps_nothing_while_a_manifest_is_unreadable():
+    repository = BackupRepository()
+    first = repository.create(catalog(300), prune=False)
+    repository.create(catalog(10), prune=False)
+    with open(repository.manifest_path(first["name"]), "a") as f:
+        f.write(" ")        # still JSON, but the checksum no longer matches
+    chunks = sum(len(files) for _, _, files in os.walk(repository.chunk_dir))
+    assert repository.prune(last=5) == ([], 0)
+    assert sum(len(files) for _, _, files in os.walk(repository.chunk_dir)) == chunks
+
+
+def test_restore_backup_replaces_the_stores_items():
+    store = JsonStore()
+    inventory = store.load()
+    operations.create_item(inventory, store, "Bolt", 3)
+    backup = BackupRepository().create(inventory)
+    operations.adjust_quantity(inventory, store, "Bolt", 5)
+    operations.create_item(inventory, store, "Nut", 1)
+
+    assert restore_backup(store, backup["name"], current=inventory) == 1
+    store.close()
+    loaded = JsonStore().load()
+    assert sorted(loaded) == ["Bolt"] and loaded["Bolt"].quantity == 3
@@ -0,0 +1,78 @@
+"""Headless commands, run through cli.main as the command line would."""
+import os
+import subprocess
+import sys
+
+import pytest
+
+from smart_inventory import cli
+from smart_inventory.config import DATABASE_FILE, INVENTORY_FILE, JOURNAL_FILE
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Inventory_App.py")
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("argv", [
+    ["adjust", "Bolt", "3", "--create"],
+    ["import", "movements.csv", "--create"],
+    ["query"],
+    ["stats"],
+    ["analytics"],
+    ["backup"],
+    ["--backend", "sqlite", "stats"],
+])
+def test_unreadable_inventory_fails_the_command(broken_inventory, capsys, argv):
+    with open("movements.csv", "w", encoding="utf-8") as f:
+        f.write("name,change\nBolt,1\n")
+    assert cli.main(argv) == 1
+    assert "error:" in capsys.readouterr().err
+    assert read(INVENTORY_FILE) == broken_inventory
+    assert not os.path.exists(DATABASE_FILE)
+
+
+def test_corrupt_database_is_an_error_not_a_traceback(capsys):
+    with open(DATABASE_FILE, "wb") as f:
+        f.write(b"not a database" * 100)
+    assert cli.main(["--backend", "sqlite", "query"]) == 1
+    assert "error:" in capsys.readouterr().err
+
+
+def test_adjust_create_with_padded_name_finds_the_item(capsys):
+    assert cli.main(["adjust", "Bolt", "3", "--create"]) == 0
+    assert cli.main(["adjust", " Bolt ", "2", "--create"]) == 0
+    assert capsys.readouterr().out.splitlines()[-1] == "Bolt: +2 -> 5"
+
+
+def test_adjust_appends_to_the_journal_instead_of_rewriting_the_snapshot():
+    assert cli.main(["adjust", "Bolt", "3", "--create"]) == 0
+    snapshot = read(INVENTORY_FILE) if os.path.exists(INVENTORY_FILE) else None
+    journal = read(JOURNAL_FILE)
+    assert cli.main(["adjust", "Bolt", "2"]) == 0
+    assert (read(INVENTORY_FILE) if os.path.exists(INVENTORY_FILE) else None) == snapshot
+    assert read(JOURNAL_FILE).startswith(journal) and len(read(JOURNAL_FILE)) > len(journal)
+    assert cli.main(["query", "--format", "csv"]) == 0
+
+
+@pytest.mark.parametrize("argv", [
+    ["import", "huge.csv", "--create"],         # csv.Error
+    ["history", "--days", "1e308"],             # OverflowError
+])
+def test_bad_input_is_an_error_not_a_traceback(capsys, argv):
+    with open("huge.csv", "w", encoding="utf-8") as f:
+        f.write("name,change\nBolt," + "9" * 200000 + "\n")
+    assert cli.main(argv) == 1
+    assert capsys.readouterr().err.startswith("error: ")
+
+
+def test_commands_through_the_gui_script_skip_tk():
+    assert cli.main(["adjust", "Bolt", "3", "--create"]) == 0
+    result = subprocess.run([sys.executable, "-X", "importtime", APP, "stats", "--json"],
+                            capture_output=True, text=True)
+    assert result.returncode == 0
+    assert result.stdout.startswith('{"items": 1,')
+    imported = {line.split("|")[-1].strip() for line in result.stderr.splitlines()}
+    assert "tkinter" not in imported and "sqlite3" not in imported
@@ -0,0 +1,76 @@
+"""MovementLog.query pages through the movements a plain filter and sort would give."""
+import random
+
+import pytest
+
+from smart_inventory.history import MovementLog
+from smart_inventory.sqlite_store import SqliteStore
+
+NAMES = ["Bolt", "Nut", "Washer"]
+PAGES = [(0, 5), (5, 5), (3, 7), (0, None), (12, None), (100, 5), (0, 1000)]
+RANGES = [(None, None), (1_000_050, None), (None, 1_000_050), (1_000_020, 1_000_080), (1_000_080, 1_000_020)]
+
+
+def movements(seed, count=100):
+    """(name, ts, change, new_qty, note) with repeated and out-of-order timestamps"""
+    rng = random.Random(seed)
+    return [(rng.choice(NAMES), 1_000_000 + rng.randrange(100), rng.randint(-5, 5), i, f"m{i}")
+            for i in range(count)]
+
+
+def expected(entries, name, since, until, offset, limit):
+    """Newest first; of equal times, the one recorded last comes first"""
+    kept = [(e[1], i, e) for i, e in enumerate(entries)
+            if (name is None or e[0] == name) and (since is None or e[1] >= since)
+            and (until is None or e[1] < until)]
+    rows = [e for *_, e in sorted(kept, reverse=True)]
+    return rows[offset:] if limit is None else rows[offset:offset + limit]
+
+
+def check(query, entries):
+    for name in [None] + NAMES + ["Missing"]:
+        for since, until in RANGES:
+            for offset, limit in PAGES:
+                assert query(name, since, until, offset, limit) == \
+                    expected(entries, name, since, until, offset, limit), (name, since, until, offset, limit)
+
+
+def fill(log, entries):
+    for name, ts, change, new_qty, note in entries:
+        log.append(name, ts, change, new_qty, note)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_query_matches_a_plain_filter(seed):
+    entries = movements(seed)
+    log = MovementLog("history.jsonl")
+    fill(log, entries)
+    check(log.query, entries)
+    log.close()
+
+
+def test_query_follows_appends_after_the_index_is_built():
+    entries = movements(0)
+    log = MovementLog("history.jsonl")
+    fill(log, entries[:50])
+    check(log.query, entries[:50])
+    fill(log, entries[50:])
+    check(log.query, entries)
+    log.close()
+
+    reopened = MovementLog("history.jsonl")
+    check(reopened.query, entries)
+    for name in [None] + NAMES:
+        for since, until in RANGES:
+            assert reopened.count(name, since, until) == len(expected(entries, name, since, until, 0, None))
+    reopened.close()
+
+
+def test_sqlite_pages_the_same_movements():
+    entries = movements(1)
+    store = SqliteStore(import_from=None)
+    for entry in entries:
+        store.add_history(*entry)
+    store.sync()
+    check(store.movements, entries)
+    store.close()
@@ -0,0 +1,88 @@
+"""Bulk import: validation bounds, and all-or-nothing application."""
+import sqlite3
+
+import pytest
+
+from smart_inventory import operations
+from smart_inventory.importing import import_movements, parse_movement
+from smart_inventory.model import INT64_MAX
+from smart_inventory.sqlite_store import SqliteStore
+from smart_inventory.storage import JsonStore
+
+
+def write_csv(rows, path="movements.csv"):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("name,change,quantity\n")
+        for row in rows:
+            f.write(",".join(row) + "\n")
+    return path
+
+
+@pytest.mark.parametrize("record, expected", [
+    ({"name": " Bolt ", "change": "12"}, ("Bolt", 12, None, "")),
+    ({"name": "Bolt", "change": "-3", "note": "x"}, ("Bolt", -3, None, "x")),
+    ({"name": "Bolt", "quantity": "1e3"}, ("Bolt", None, 1000, "")),
+    ({"name": "Bolt", "change": -2 ** 62}, ("Bolt", -2 ** 62, None, "")),
+    ({"name": "Bolt", "change": str(INT64_MAX)}, ("Bolt", INT64_MAX, None, "")),
+    ({"name": "Bolt", "quantity": str(INT64_MAX - 1)}, ("Bolt", None, INT64_MAX - 1, "")),
+])
+def test_parse_movement_accepts(record, expected):
+    assert parse_movement(record) == expected
+
+
+@pytest.mark.parametrize("record, message", [
+    ({"name": "Bolt", "change": "1e20"}, "out of range"),
+    ({"name": "Bolt", "change": 2 ** 63}, "out of range"),
+    ({"name": "Bolt", "change": str(INT64_MAX + 1)}, "out of range"),
+    ({"name": "Bolt", "quantity": "-1e19"}, "out of range"),
+    ({"name": "Bolt", "change": "1.5"}, "whole number"),
+    ({"name": "Bolt", "change": 1.5}, "whole number"),
+    ({"name": "Bolt", "change": "nan"}, "whole number"),
+    ({"name": "Bolt", "change": "x"}, "not a number"),
+    ({"name": "Bolt", "quantity": "-1"}, "negative"),
+    ({"name": "Bolt", "change": "1", "quantity": "1"}, "exactly one"),
+    ({"name": " ", "change": "1"}, "missing name"),
+])
+def test_parse_movement_rejects(record, message):
+    with pytest.raises(ValueError, match=message):
+        parse_movement(record)
+
+
+def test_out_of_range_rows_are_reported_and_the_rest_applied():
+    store = JsonStore()
+    inventory = store.load()
+    operations.create_item(inventory, store, "A", 1)
+    path = write_csv([("A", "5", ""), ("B", "1e20", ""), ("C", str(INT64_MAX - 10), ""),
+                      ("C", "20", ""), ("A", "-2", "")])
+    result = import_movements(path, inventory, store, create_missing=True)
+    assert result.applied == 3
+    assert [line for line, _ in result.errors] == [3, 5]
+    assert inventory["A"].quantity == 4
+    assert inventory["C"].quantity == INT64_MAX - 10
+    assert "B" not in inventory
+    store.close()
+
+
+def test_a_failing_store_leaves_the_inventory_as_it_was(monkeypatch):
+    store = SqliteStore(import_from=None)
+    inventory = store.load()
+    for name in ("A", "B"):
+        operations.create_item(inventory, store, name, 1)
+    store.sync()
+    calls = []
+    add_history = store.add_history
+
+    def failing(*args):
+        calls.append(args)
+        if len(calls) == 2:
+            raise sqlite3.OperationalError("disk I/O error")
+        add_history(*args)
+    monkeypatch.setattr(store, "add_history", failing)
+
+    with pytest.raises(sqlite3.Error):
+        import_movements(write_csv([("A", "5", ""), ("B", "3", ""), ("New", "1", "")]), inventory, store,
+                         create_missing=True)
+    assert {name: d.quantity for name, d in inventory.items()} == {"A": 1, "B": 1}
+    assert len(inventory["A"].history) == 1
+    assert store.db.execute("SELECT name, quantity FROM items ORDER BY name").fetchall() == [("A", 1), ("B", 1)]
+    store.close()
@@ -0,0 +1,143 @@
+"""The indexes give the answers a plain pass over the items would."""
+import time
+from datetime import datetime
+
+import pytest
+
+from smart_inventory.indexes import FilterIndex, SearchIndex, SortIndex
+from smart_inventory.model import Item
+
+DAY = 86400
+NOW = int(time.time())
+
+
+def item(age_days):
+    d = Item(quantity=10, price=1.0, low_threshold=2)
+    d.history.append(NOW - age_days * DAY, 1, 10, "")
+    return d
+
+
+def recent(index):
+    return sorted(index.recent(datetime.fromtimestamp(NOW)))
+
+
+def make_index():
+    inventory = {"old": item(30), "fresh": item(0), "yesterday": item(1)}
+    return inventory, FilterIndex(inventory)
+
+
+def test_recent_lists_items_moved_in_the_last_days():
+    _, index = make_index()
+    assert recent(index) == ["fresh", "yesterday"]
+
+
+def test_touch_without_a_new_movement_keeps_recent_items():
+    # A price-only edit reindexes the item with its old movement time
+    inventory, index = make_index()
+    inventory["old"].price = 9.0
+    index.update("old", inventory["old"])
+    index.touch("old", inventory["old"].history.last_ts())
+    assert recent(index) == ["fresh", "yesterday"]
+
+
+def test_touch_with_an_older_time_keeps_the_order():
+    _, index = make_index()
+    index.touch("old", NOW - 40 * DAY)
+    assert recent(index) == ["fresh", "yesterday"]
+    assert list(index.last_update.values()) == sorted(index.last_update.values())
+
+
+def test_touch_with_a_new_movement_makes_the_item_recent():
+    _, index = make_index()
+    index.touch("old", NOW)
+    assert recent(index) == ["fresh", "old", "yesterday"]
+    assert list(index.last_update)[-1] == "old"
+
+
+def test_discard_forgets_the_item():
+    _, index = make_index()
+    index.discard("fresh")
+    assert recent(index) == ["yesterday"]
+
+
+NAMES = ["Hex bolt M6", "Hex bolt M8", "Hex nut M6", "Washer M6", "Wood screw 4x40", "Bolt cutter",
+         "Écrou M6", "ÜBER-Mutter", "Cable tie 200", "Cable tie 300", "Ties", "m6"]
+QUERIES = ["bolt", "hex m6", "m6 hex", "HEX", "m", "6", "ie", "tie 3", "cable tie 300", "écrou", "über",
+           "bolt m6 hex", "zzz", "  ", "hex bolt m", "hex bolt m6"]
+
+
+def scan(names, query):
+    tokens = query.lower().split()
+    return {name for name in names if all(t in name.lower() for t in tokens)} if tokens else None
+
+
+@pytest.mark.parametrize("built", [0, 5, len(NAMES)])
+def test_search_matches_a_plain_scan(built):
+    index = SearchIndex(NAMES)
+    index.build_some(built)
+    for query in QUERIES:
+        assert index.search(query) == scan(NAMES, query), query
+
+
+def test_search_narrows_as_the_query_grows():
+    index = SearchIndex(NAMES)
+    while not index.build_some(4):
+        pass
+    for end in range(1, len("hex bolt m6") + 1):
+        query = "hex bolt m6"[:end]
+        assert index.search(query) == scan(NAMES, query), query
+
+
+def test_search_follows_added_and_removed_items():
+    index = SearchIndex(NAMES)
+    index.build_some()
+    names = list(NAMES)
+    assert index.search("hex m6") == scan(names, "hex m6")
+    for name in ("Hex key M6", "hex bolt m6 zinc"):
+        index.add(name)
+        names.append(name)
+    index.discard("Hex nut M6")
+    names.remove("Hex nut M6")
+    index.discard("Not there")
+    for query in ["hex m6", "hex bolt", "zinc", "key"]:
+        assert index.search(query) == scan(names, query), query
+    assert not any("Hex nut M6" in bucket for bucket in index.grams.values())
+
+
+def sorted_names(values, subset=None):
+    names = values if subset is None else subset
+    return sorted(names, key=lambda name: (values[name], name))
+
+
+def make_sort_index():
+    values = {"bolt": 5, "nut": 2, "washer": 5, "screw": 0, "pin": 9, "clip": 2}
+    return values, SortIndex(values.__getitem__, values)
+
+
+def test_sort_orders_by_value_then_name():
+    values, index = make_sort_index()
+    assert index.ordered() == sorted_names(values)
+    for subset in ({"bolt", "washer", "nut"}, {"pin"}, set(), set(values)):
+        assert index.ordered(subset) == sorted_names(values, subset), subset
+
+
+def test_sort_follows_changed_added_and_removed_items():
+    values, index = make_sort_index()
+    for name, value in [("bolt", 1), ("screw", 9), ("cap", 2), ("nut", 2), ("pin", -3)]:
+        values[name] = value
+        index.update(name)
+        assert index.ordered() == sorted_names(values), name
+    del values["washer"]
+    index.discard("washer")
+    index.discard("not there")
+    assert index.ordered() == sorted_names(values)
+    assert index.ordered({"cap", "nut", "bolt"}) == sorted_names(values, {"cap", "nut", "bolt"})
+    assert [name for _, name in index.entries] == index.names
+
+
+def test_sort_picks_a_subset_of_a_large_index_in_order():
+    values = {f"item {i:03}": (i * 7) % 10 for i in range(100)}
+    index = SortIndex(values.__getitem__, values)
+    subset = {"item 001", "item 050", "item 099", "item 013"}
+    assert index.ordered(subset) == sorted_names(values, subset)
+    assert index.ordered(set(values)) == sorted_names(values)
@@ -0,0 +1,78 @@
+"""Changes outside the 64-bit range are refused before the item or the store sees them."""
+import os
+
+import pytest
+
+from smart_inventory import cli, operations
+from smart_inventory.config import INVENTORY_FILE, JOURNAL_FILE
+from smart_inventory.model import INT64_MAX
+from smart_inventory.storage import JsonStore
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def saved():
+    """The inventory snapshot and journal as they are on disk"""
+    return {path: read(path) for path in (INVENTORY_FILE, JOURNAL_FILE) if os.path.exists(path)}
+
+
+@pytest.fixture
+def store():
+    store = JsonStore()
+    inventory = store.load()
+    operations.create_item(inventory, store, "Bolt", 5)
+    store.sync()
+    store.inventory = inventory
+    yield store
+    store.close()
+
+
+@pytest.mark.parametrize("change", [
+    lambda inventory, store: operations.adjust_quantity(inventory, store, "Bolt", 10 ** 20),
+    lambda inventory, store: operations.adjust_quantity(inventory, store, "Bolt", INT64_MAX),
+    lambda inventory, store: operations.update_item(inventory, store, "Bolt", 10 ** 20, 1.0, 5),
+    lambda inventory, store: operations.update_item(inventory, store, "Bolt", 5, 1.0, -10 ** 20),
+    lambda inventory, store: operations.create_item(inventory, store, "Nut", 2 ** 63),
+])
+def test_out_of_range_changes_leave_item_and_journal_alone(store, change):
+    inventory = store.inventory
+    before = saved()
+    with pytest.raises(ValueError, match="out of range"):
+        change(inventory, store)
+    store.sync()
+    assert saved() == before
+    assert sorted(inventory) == ["Bolt"]
+    assert inventory["Bolt"].quantity == 5
+    assert len(inventory["Bolt"].history) == 1
+
+
+def test_the_largest_quantity_still_works(store):
+    inventory = store.inventory
+    assert operations.adjust_quantity(inventory, store, "Bolt", INT64_MAX - 5) == (INT64_MAX - 5, INT64_MAX)
+    assert operations.adjust_quantity(inventory, store, "Bolt", -1) == (-1, INT64_MAX - 1)
+
+
+def test_transfer_that_would_overflow_the_destination_moves_nothing(store):
+    source = JsonStore("north.json", "north.journal", "north.history")
+    north = source.load()
+    operations.create_item(north, source, "Bolt", 10)
+    store.inventory["Bolt"].quantity = INT64_MAX - 3
+    with pytest.raises(ValueError, match="out of range"):
+        operations.transfer_stock(("North", north, source), ("Main", store.inventory, store), "Bolt", 5)
+    assert north["Bolt"].quantity == 10
+    assert len(north["Bolt"].history) == 1
+    source.close()
+
+
+def test_cli_adjust_out_of_range_fails_and_keeps_the_item_usable(capsys):
+    assert cli.main(["adjust", "Bolt", "5", "--create"]) == 0
+    before = saved()
+    assert cli.main(["adjust", "Bolt", "99999999999999999999"]) == 1
+    assert cli.main(["adjust", "Nut", "99999999999999999999", "--create"]) == 1
+    assert "out of range" in capsys.readouterr().err
+    assert saved() == before
+    assert cli.main(["adjust", "Bolt", "-1"]) == 0
+    assert capsys.readouterr().out == "Bolt: -1 -> 4\n"
@@ -0,0 +1,77 @@
+"""The API turns bad input into 4xx answers without touching the inventory, stats or store."""
+import json
+
+import pytest
+
+from smart_inventory.model import INT64_MAX
+from smart_inventory.server import ApiServer, InventoryService
+from smart_inventory.storage import JsonStore
+
+
+@pytest.fixture
+def api():
+    store = JsonStore()
+    service = InventoryService(store)
+    server = ApiServer(service)
+    status, _ = server.dispatch("PUT", "/items/Bolt", json.dumps({"quantity": 5, "price": 2.0}))
+    assert status == 200
+    service.sync()
+    yield server
+    store.close()
+
+
+def state(api):
+    service = api.service
+    return service.seq, service.inventory["Bolt"].quantity, service.stats.total_value, \
+        len(service.inventory["Bolt"].history), service.store.journal.records
+
+
+def call(api, method, target, body):
+    return api.dispatch(method, target, body if isinstance(body, str) else json.dumps(body))
+
+
+@pytest.mark.parametrize("method, target, body, status", [
+    ("POST", "/items/Bolt/adjust", {"change": 10 ** 19}, 400),
+    ("POST", "/items/Bolt/adjust", {"change": -10 ** 19}, 400),
+    ("POST", "/items/Bolt/adjust", {"change": INT64_MAX}, 400),     # 5 + INT64_MAX overflows
+    ("POST", "/items/Bolt/adjust", {"change": 1.5}, 400),
+    ("POST", "/items/Bolt/adjust", {"change": True}, 400),
+    ("POST", "/items/Bolt/adjust", {"change": "3"}, 400),
+    ("POST", "/items/Bolt/adjust", '{"change": Infinity}', 400),
+    ("POST", "/items/Bolt/adjust", [1], 400),
+    ("POST", "/items/Nut/adjust", {"change": 1}, 404),
+    ("PUT", "/items/Bolt", {"quantity": -1}, 400),
+    ("PUT", "/items/Bolt", {"quantity": 1e30}, 400),
+    ("PUT", "/items/Bolt", {"price": -2}, 400),
+    ("PUT", "/items/Bolt", {"low_threshold": 2 ** 64}, 400),
+    ("PUT", "/items/Bolt", {"quantity": 1, "version": 999}, 409),
+    ("POST", "/batch", {"ops": "adjust"}, 400),
+    ("POST", "/batch", {"ops": [{"op": "adjust", "name": "Bolt", "change": 1}, {"op": "melt", "name": "Bolt"}]},
+     400),
+    ("POST", "/batch", {"atomic": True, "ops": [{"op": "adjust", "name": "Bolt", "change": 3},
+                                                {"op": "adjust", "name": "Bolt", "change": INT64_MAX - 5}]}, 409),
+    ("POST", "/items/Bolt/adjust", "{not json", 400),
+])
+def test_bad_writes_change_nothing(api, method, target, body, status):
+    before = state(api)
+    got, payload = call(api, method, target, body)
+    assert got == status, payload
+    assert "error" in payload
+    assert state(api) == before
+
+
+def test_an_overflowing_op_in_a_plain_batch_fails_alone(api):
+    status, payload = call(api, "POST", "/batch", {"ops": [
+        {"op": "adjust", "name": "Bolt", "change": 3},
+        {"op": "adjust", "name": "Bolt", "change": INT64_MAX - 5},
+    ]})
+    assert status == 200
+    assert [result["status"] for result in payload["results"]] == [200, 400]
+    assert api.service.inventory["Bolt"].quantity == 8
+    assert api.service.stats.total_value == 16.0
+
+
+def test_the_largest_quantity_is_accepted(api):
+    status, payload = call(api, "PUT", "/items/Bolt", {"quantity": INT64_MAX})
+    assert status == 200
+    assert payload["quantity"] == INT64_MAX
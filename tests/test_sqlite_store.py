@@ -0,0 +1,67 @@
+"""SqliteStore loads what the JSON backend would: the same items, movements and search results."""
+import os
+
+import pytest
+
+from smart_inventory import operations
+from smart_inventory.config import HISTORY_LIMIT, INVENTORY_FILE
+from smart_inventory.sqlite_store import SqliteStore
+from smart_inventory.storage import JsonStore
+
+
+def test_load_keeps_the_newest_movements_of_each_item():
+    store = SqliteStore(import_from=None)
+    inventory = store.load()
+    operations.create_item(inventory, store, "A", 0)
+    operations.create_item(inventory, store, "B", 0)
+    for i in range(HISTORY_LIMIT + 5):
+        operations.adjust_quantity(inventory, store, "A", 1, note=f"a{i}")
+    operations.adjust_quantity(inventory, store, "B", 2)
+    operations.create_item(inventory, store, "Gone", 1)
+    operations.delete_item(inventory, store, "Gone")
+    store.sync()
+    store.close()
+
+    store = SqliteStore(import_from=None)
+    loaded = store.load()
+    assert sorted(loaded) == ["A", "B"]
+    for name in ("A", "B"):
+        assert list(loaded[name].history.entries()) == list(inventory[name].history.entries())
+    assert [note for *_, note in loaded["A"].history.entries()][-1] == f"a{HISTORY_LIMIT + 4}"
+    assert len(loaded["B"].history) == 2
+    store.close()
+
+
+def test_first_run_imports_changes_that_are_only_journalled():
+    json_store = JsonStore()
+    inventory = json_store.load()
+    operations.create_item(inventory, json_store, "Bolt", 4)
+    json_store.close()
+    assert not os.path.exists(INVENTORY_FILE)     # as after `adjust Bolt 4 --create`
+
+    store = SqliteStore()
+    loaded = store.load()
+    assert loaded["Bolt"].quantity == 4
+    assert len(loaded["Bolt"].history) == 1
+    store.close()
+
+
+@pytest.mark.parametrize("search, expected", [
+    ("é", ["Écrou", "écrou M6"]),
+    ("ÉCROU m6", ["écrou M6"]),
+    ("über", ["ÜBER-Mutter"]),
+    ("ß", ["Fußplatte"]),
+    ("bolt", ["Bolt"]),
+])
+def test_search_matches_the_json_backend(search, expected):
+    names = ["Bolt", "Écrou", "écrou M6", "ÜBER-Mutter", "Fußplatte"]
+    results = []
+    for store in (JsonStore(), SqliteStore(import_from=None)):
+        inventory = store.load()
+        for name in names:
+            operations.create_item(inventory, store, name, 1)
+        store.sync()
+        results.append((store.query(search=search), [row[0] for row in store.report_rows(search=search)],
+                        [row[0] for row in store.snapshot_rows(search=search)[1]]))
+        store.close()
+    assert results[0] == results[1] == (expected, expected, expected)
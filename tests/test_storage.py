@@ -0,0 +1,213 @@
+"""Stores read back what they wrote, never overwrite an inventory they could not read,
+and lose or repeat nothing when the journal is compacted."""
+import io
+import json
+import os
+
+import pytest
+
+from smart_inventory import operations, storage
+from smart_inventory.backups import restore_backup
+from smart_inventory.config import DATABASE_FILE, INVENTORY_FILE, JOURNAL_FILE
+from smart_inventory.model import Item
+from smart_inventory.sqlite_store import SqliteStore
+from smart_inventory.storage import JsonStore, LoadError, iter_json_object
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_failed_load_starts_empty_and_remembers_why(broken_inventory):
+    store = JsonStore()
+    assert store.load() == {}
+    assert isinstance(store.load_error, ValueError)
+    store.close()
+
+
+def test_strict_load_raises(broken_inventory):
+    store = JsonStore()
+    with pytest.raises(LoadError):
+        store.load(strict=True)
+    store.close()
+
+
+def test_failed_load_blocks_save_and_replace_all(broken_inventory):
+    store = JsonStore()
+    inventory = store.load()
+    operations.create_item(inventory, store, "Bolt", 3)
+    with pytest.raises(LoadError):
+        store.save()
+    with pytest.raises(LoadError):
+        store.replace_all({"Nut": Item(1)})
+    store.close()
+    assert read(INVENTORY_FILE) == broken_inventory
+
+
+def test_failed_load_never_compacts_the_journal(broken_inventory, monkeypatch):
+    monkeypatch.setattr(storage, "JOURNAL_COMPACT_AT", 1)
+    store = JsonStore()
+    inventory = store.load()
+    operations.create_item(inventory, store, "Bolt", 3)
+    store.sync()
+    store.close()
+    assert read(INVENTORY_FILE) == broken_inventory
+    assert os.path.exists(JOURNAL_FILE)
+
+
+def test_a_successful_load_clears_the_failure(broken_inventory):
+    store = JsonStore()
+    store.load()
+    os.remove(INVENTORY_FILE)
+    store.load()
+    assert store.load_error is None
+    store.save()
+    store.close()
+
+
+def test_sqlite_does_not_import_an_unreadable_inventory(broken_inventory):
+    with pytest.raises(LoadError):
+        SqliteStore()
+    assert not os.path.exists(DATABASE_FILE)
+    assert read(INVENTORY_FILE) == broken_inventory
+
+
+def test_background_compaction_keeps_changes_made_meanwhile(monkeypatch):
+    monkeypatch.setattr(storage, "JOURNAL_COMPACT_AT", 5)
+    store = JsonStore()
+    inventory = store.load()
+    for i in range(6):
+        operations.create_item(inventory, store, f"item{i}", i)
+    store.sync()
+    assert store.journal.folding()
+    operations.adjust_quantity(inventory, store, "item1", 10)
+    store.journal.wait()
+    assert not os.path.exists(store.journal.folding_path)
+    store.close()
+
+    loaded = JsonStore().load()
+    assert {name: d.quantity for name, d in loaded.items()} == {name: d.quantity for name, d in inventory.items()}
+    assert len(loaded["item1"].history) == 2
+
+
+def test_a_set_aside_journal_is_replayed_until_the_snapshot_has_it():
+    store = JsonStore()
+    inventory = store.load()
+    operations.create_item(inventory, store, "Bolt", 1)
+    store.save()
+    operations.adjust_quantity(inventory, store, "Bolt", 4)
+    store.close()
+    os.replace(JOURNAL_FILE, store.journal.folding_path)    # stopped before the snapshot was written
+
+    store = JsonStore()
+    assert store.load()["Bolt"].quantity == 5
+    store.save()
+    store.close()
+    assert not os.path.exists(store.journal.folding_path)
+    assert JsonStore().load()["Bolt"].quantity == 5
+
+
+def stopped(*args, **kwargs):
+    raise OSError("stopped")
+
+
+def interrupted_fold(monkeypatch, stop):
+    """Run a background compaction that fails at `stop`; returns the store's items, closed"""
+    store = JsonStore()
+    inventory = store.load()
+    operations.create_item(inventory, store, "Bolt", 1)
+    operations.adjust_quantity(inventory, store, "Bolt", 4)
+    with monkeypatch.context() as patch:
+        patch.setattr(storage, "JOURNAL_COMPACT_AT", 2)
+        patch.setattr(*stop, stopped)
+        store.sync()
+        store.journal.wait()
+    operations.adjust_quantity(inventory, store, "Bolt", 2)
+    store.close()
+    assert os.path.exists(store.journal.folding_path)
+    return inventory
+
+
+@pytest.mark.parametrize("stop, snapshot_written", [
+    ((storage, "write_json_snapshot"), False),
+    ((os, "remove"), True),         # only the set-aside log's removal failed
+])
+def test_a_set_aside_log_is_replayed_only_if_the_snapshot_lacks_it(monkeypatch, stop, snapshot_written):
+    inventory = interrupted_fold(monkeypatch, stop)
+    assert os.path.exists(INVENTORY_FILE) == snapshot_written
+    # Timestamps play no part: a set-aside log "newer" than the snapshot is still recognised
+    os.utime(JsonStore().journal.folding_path, ns=(2 ** 62, 2 ** 62))
+    loaded = JsonStore().load()
+    assert loaded["Bolt"].quantity == 7
+    assert list(loaded["Bolt"].history.entries()) == list(inventory["Bolt"].history.entries())
+    assert os.path.exists(JsonStore().journal.folding_path) != snapshot_written
+
+
+def test_a_log_that_outlived_compact_is_not_replayed_twice(monkeypatch):
+    store = JsonStore()
+    inventory = store.load()
+    operations.create_item(inventory, store, "Bolt", 1)
+    operations.adjust_quantity(inventory, store, "Bolt", 4)
+    monkeypatch.setattr(store.journal, "reset", lambda: None)     # stopped before the log was removed
+    store.save()
+    store.close()
+
+    store = JsonStore()
+    loaded = store.load()
+    assert loaded["Bolt"].quantity == 5
+    assert len(loaded["Bolt"].history) == 2
+    operations.adjust_quantity(loaded, store, "Bolt", 1)    # appended after the fold record
+    store.close()
+    assert len(JsonStore().load()["Bolt"].history) == 3
+
+
+def test_snapshots_without_a_fold_number_replay_the_whole_log():
+    store = JsonStore()
+    inventory = store.load()
+    operations.create_item(inventory, store, "Bolt", 1)
+    store.close()
+    storage.write_json_snapshot({"Nut": Item(2)}, INVENTORY_FILE)     # as older versions wrote it
+    loaded = JsonStore().load()
+    assert sorted(loaded) == ["Bolt", "Nut"]
+
+
+def test_restoring_a_snapshot_file_skips_its_fold_number():
+    other = JsonStore("other.json", "other.journal", "other.history")
+    operations.create_item(other.load(), other, "Bolt", 3)
+    other.save()
+    other.close()
+    assert storage.snapshot_generation("other.json") == 1
+
+    store = JsonStore()
+    store.load()
+    assert restore_backup(store, "other.json") == 1
+    store.close()
+    assert sorted(JsonStore().load()) == ["Bolt"]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 64, 1 << 20])
+def test_iter_json_object_yields_every_member_whatever_the_chunk_size(chunk_size):
+    data = {"Bolt": {"quantity": 3, "history": [{"note": "x" * 50}]}, "Écrou ✓": [1, 2.5, None, True],
+            'quote " and } and ,': "}{", "": {}, "n": -1e-5}
+    text = json.dumps(data, ensure_ascii=False, indent=1).encode()
+    assert list(iter_json_object(io.BytesIO(text), chunk_size)) == list(data.items())
+
+
+@pytest.mark.parametrize("text", [b"{}", b"  {  }  ", b"{\n}\n"])
+def test_iter_json_object_of_an_empty_object(text):
+    assert list(iter_json_object(io.BytesIO(text), 2)) == []
+
+
+@pytest.mark.parametrize("text", [b"", b"[]", b'{"a": 1', b'{"a": 1,}', b'{"a" 1}', b'{"a": 1 "b": 2}', b'{"a": tru}'])
+def test_iter_json_object_rejects_malformed_input(text):
+    with pytest.raises(ValueError):
+        list(iter_json_object(io.BytesIO(text), 4))
+
+
+def test_load_reads_a_snapshot_in_batches():
+    storage.write_json_snapshot({f"item{i}": Item(i, 1.0) for i in range(25)}, INVENTORY_FILE)
+    batches = list(JsonStore().iter_load(batch_size=10))
+    assert [len(batch) for batch, _ in batches] == [10, 10, 5]
+    assert batches[-1][1] == 1.0
+    assert JsonStore().load()["item24"].quantity == 24